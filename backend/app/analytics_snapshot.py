@@ -0,0 +1,326 @@
+"""Memory-mapped columnar snapshot of normalized assessment metrics and stored productivity scores.
+
+The snapshot lives in ``settings.analytics_snapshot_dir``::
+
+    manifest.json              generation, row count and the updated_at watermark it is synced through
+    gen-000003/<column>.npy    one array per column, aligned by row
+
+Readers open it with ``open_analytics_snapshot``, which ``np.load``s every column with ``mmap_mode='r'``;
+workers on one host share the pages through the OS page cache instead of each decrypting
+``habits_assessment`` into its own copy. The normalized export reads its values from here.
+
+``refresh_analytics_snapshot`` decrypts only assessments updated since the watermark: rows already in
+the snapshot are patched in place and new ones appended. Stored scores are re-synced from one plaintext
+scan, since a score backfill does not touch ``updated_at``. A fresh generation is only written when
+assessments were deleted. The manifest is replaced atomically and is the source of truth for the row
+count, so readers never see a partial append.
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import cached_property
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+from .habits_storage import (
+    DEFAULT_READ_CHUNK_SIZE,
+    NORMALIZATION_RANGES,
+    AssessmentColumns,
+    load_assessment_columns,
+    normalize_column,
+)
+from .models import HabitsAssessment
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows runs a single refresher
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+LOCK_NAME = 'refresh.lock'
+SNAPSHOT_FORMAT_VERSION = 2
+ID_COLUMNS = ('assessment_id', 'user_id')
+METRIC_COLUMNS = tuple(NORMALIZATION_RANGES)
+SCORE_COLUMN = 'productivity_score'
+SNAPSHOT_COLUMNS = (*ID_COLUMNS, *METRIC_COLUMNS, SCORE_COLUMN)
+
+
+@dataclass(frozen=True)
+class AnalyticsSnapshot:
+    directory: Path
+    generation: int
+    built_at: datetime
+    synced_through: datetime
+    # Read-only memory maps; normalized metrics and scores are NaN where the assessment has no value.
+    columns: dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.columns['assessment_id'])
+
+    def matrix(self, names: tuple[str, ...] | list[str]) -> np.ndarray:
+        return np.column_stack([self.columns[name] for name in names]).reshape(len(self), len(names))
+
+    @cached_property
+    def _id_order(self) -> np.ndarray:
+        # Appended rows are not in id order, so lookups go through a sorted permutation.
+        return np.argsort(self.columns['assessment_id'], kind='stable')
+
+    def positions(self, assessment_ids: np.ndarray) -> np.ndarray:
+        """Row of each assessment id in the snapshot, or -1 where it is not in the snapshot."""
+        assessment_ids = np.asarray(assessment_ids, dtype=np.int64)
+        if not len(self):
+            return np.full(len(assessment_ids), -1, dtype=np.int64)
+        sorted_ids = self.columns['assessment_id'][self._id_order]
+        found = np.minimum(np.searchsorted(sorted_ids, assessment_ids), len(self) - 1)
+        return np.where(sorted_ids[found] == assessment_ids, self._id_order[found], -1)
+
+
+@dataclass(frozen=True)
+class SnapshotRefresh:
+    generation: int
+    rows: int
+    appended: int
+    patched: int
+    rebuilt: bool
+    seconds: float
+
+
+def _snapshot_dir(directory: Path | str | None) -> Path:
+    return Path(directory if directory is not None else get_settings().analytics_snapshot_dir)
+
+
+def _generation_dir(directory: Path, generation: int) -> Path:
+    return directory / f'gen-{generation:06d}'
+
+
+def _read_manifest(directory: Path) -> dict | None:
+    try:
+        manifest = json.loads((directory / MANIFEST_NAME).read_text())
+    except FileNotFoundError:
+        return None
+    if manifest.get('format') != SNAPSHOT_FORMAT_VERSION or tuple(manifest.get('columns', ())) != SNAPSHOT_COLUMNS:
+        return None
+    return manifest
+
+
+def _write_manifest(directory: Path, manifest: dict) -> None:
+    temporary = directory / f'{MANIFEST_NAME}.tmp'
+    temporary.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(temporary, directory / MANIFEST_NAME)
+
+
+def open_analytics_snapshot(directory: Path | str | None = None) -> AnalyticsSnapshot | None:
+    """Memory-map the current snapshot generation, or return ``None`` when none was built yet."""
+    directory = _snapshot_dir(directory)
+    manifest = _read_manifest(directory)
+    if manifest is None:
+        return None
+    generation_dir = _generation_dir(directory, manifest['generation'])
+    rows = manifest['rows']
+    return AnalyticsSnapshot(
+        directory=generation_dir,
+        generation=manifest['generation'],
+        built_at=datetime.fromisoformat(manifest['built_at']),
+        synced_through=datetime.fromisoformat(manifest['synced_through']),
+        # Files can run ahead of the manifest while an append is in progress; the manifest row count wins.
+        columns={name: np.load(generation_dir / f'{name}.npy', mmap_mode='r')[:rows] for name in SNAPSHOT_COLUMNS},
+    )
+
+
+@contextmanager
+def _refresh_lock(directory: Path) -> Iterator[None]:
+    with (directory / LOCK_NAME).open('a') as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        yield
+
+
+def _snapshot_block(columns: AssessmentColumns) -> dict[str, np.ndarray]:
+    return {
+        'assessment_id': columns.assessment_ids,
+        'user_id': columns.user_ids,
+        **{name: normalize_column(name, columns.values[name], missing=np.nan) for name in METRIC_COLUMNS},
+        SCORE_COLUMN: columns.productivity_scores,
+    }
+
+
+def _append_npy(path: Path, values: np.ndarray, rows: int) -> None:
+    """Write ``values`` after the first ``rows`` rows of a 1-d ``.npy`` file and rewrite its header shape.
+
+    Writing at ``rows`` rather than at the end of the file overwrites whatever an interrupted append left
+    past the manifest's row count.
+    """
+    with path.open('r+b') as handle:
+        version = np.lib.format.read_magic(handle)
+        if version == (1, 0):
+            _, fortran_order, dtype = np.lib.format.read_array_header_1_0(handle)
+        else:
+            _, fortran_order, dtype = np.lib.format.read_array_header_2_0(handle)
+        data_offset = handle.tell()
+        handle.seek(data_offset + rows * dtype.itemsize)
+        handle.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        handle.truncate()
+        handle.flush()
+        handle.seek(0)
+        header = {
+            'descr': np.lib.format.dtype_to_descr(dtype),
+            'fortran_order': fortran_order,
+            'shape': (rows + len(values),),
+        }
+        if version == (1, 0):
+            np.lib.format.write_array_header_1_0(handle, header)
+        else:
+            np.lib.format.write_array_header_2_0(handle, header)
+        if handle.tell() != data_offset:
+            raise RuntimeError(f'Header of {path} changed size while appending')
+
+
+def _patch_rows(generation_dir: Path, rows: int, positions: np.ndarray, block: dict[str, np.ndarray]) -> None:
+    for name, values in block.items():
+        column = np.load(generation_dir / f'{name}.npy', mmap_mode='r+')
+        column[:rows][positions] = values
+        column.flush()
+        del column
+
+
+def _rebuild(db: Session, directory: Path, generation: int, chunk_size: int) -> int:
+    block = _snapshot_block(load_assessment_columns(db, NORMALIZATION_RANGES, chunk_size=chunk_size))
+    generation_dir = _generation_dir(directory, generation)
+    shutil.rmtree(generation_dir, ignore_errors=True)
+    generation_dir.mkdir()
+    for name in SNAPSHOT_COLUMNS:
+        np.save(generation_dir / f'{name}.npy', block[name])
+    return len(block['assessment_id'])
+
+
+def _sync_scores(db: Session, snapshot: AnalyticsSnapshot) -> int | None:
+    """Copy changed stored scores into the snapshot; ``None`` when snapshot rows were deleted."""
+    stored = db.execute(select(HabitsAssessment.assessment_id, HabitsAssessment.productivity_score)).all()
+    ids = np.fromiter((row[0] for row in stored), dtype=np.int64, count=len(stored))
+    scores = np.fromiter((np.nan if row[1] is None else row[1] for row in stored), dtype=np.float64, count=len(stored))
+    positions = snapshot.positions(ids)
+    present = positions >= 0
+    if int(present.sum()) != len(snapshot):
+        return None
+    positions, scores = positions[present], scores[present]
+    current = snapshot.columns[SCORE_COLUMN][positions]
+    changed = ~((current == scores) | (np.isnan(current) & np.isnan(scores)))
+    if changed.any():
+        _patch_rows(snapshot.directory, len(snapshot), positions[changed], {SCORE_COLUMN: scores[changed]})
+    return int(changed.sum())
+
+
+def refresh_analytics_snapshot(
+    db: Session,
+    directory: Path | str | None = None,
+    *,
+    settled_before: datetime | None = None,
+    full: bool = False,
+    chunk_size: int = DEFAULT_READ_CHUNK_SIZE,
+) -> SnapshotRefresh:
+    """Bring the snapshot up to date with assessments last updated at or before ``settled_before``.
+
+    ``settled_before`` defaults to now minus ``habits_export_settle_seconds``, for the same reason the
+    normalized export lags its watermark. ``full`` writes a new generation from every assessment.
+    """
+    started = time.perf_counter()
+    directory = _snapshot_dir(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    if settled_before is None:
+        settled_before = datetime.now(timezone.utc) - timedelta(seconds=get_settings().habits_export_settle_seconds)
+    table = HabitsAssessment.__table__
+
+    with _refresh_lock(directory):
+        manifest = _read_manifest(directory)
+        reason = 'requested' if full else 'missing' if manifest is None else None
+        appended = patched = 0
+        if reason is None:
+            snapshot = open_analytics_snapshot(directory)
+            generation, rows = manifest['generation'], manifest['rows']
+            synced = _sync_scores(db, snapshot)
+            if synced is None:
+                reason = 'deleted_rows'
+            else:
+                patched = synced
+                changed_ids = db.scalars(
+                    select(table.c.assessment_id)
+                    .where(
+                        table.c.updated_at > datetime.fromisoformat(manifest['synced_through']),
+                        table.c.updated_at <= settled_before,
+                    )
+                    .order_by(table.c.assessment_id.asc())
+                ).all()
+                for start in range(0, len(changed_ids), chunk_size):
+                    columns = load_assessment_columns(
+                        db,
+                        NORMALIZATION_RANGES,
+                        assessment_ids=changed_ids[start:start + chunk_size],
+                        chunk_size=chunk_size,
+                    )
+                    positions = snapshot.positions(columns.assessment_ids)
+                    present = positions >= 0
+                    if present.any():
+                        block = _snapshot_block(columns.take(present))
+                        _patch_rows(snapshot.directory, rows, positions[present], block)
+                        patched += int(present.sum())
+                    if not present.all():
+                        block = _snapshot_block(columns.take(~present))
+                        for name in SNAPSHOT_COLUMNS:
+                            _append_npy(snapshot.directory / f'{name}.npy', block[name], rows)
+                        rows += len(block['assessment_id'])
+                        appended += len(block['assessment_id'])
+        if reason is not None:
+            generation = manifest['generation'] + 1 if manifest is not None else 1
+            rows = appended = _rebuild(db, directory, generation, chunk_size)
+        _write_manifest(
+            directory,
+            {
+                'format': SNAPSHOT_FORMAT_VERSION,
+                'generation': generation,
+                'columns': list(SNAPSHOT_COLUMNS),
+                'rows': rows,
+                'synced_through': settled_before.isoformat(),
+                'built_at': datetime.now(timezone.utc).isoformat(),
+            },
+        )
+        if reason is not None:
+            _prune_generations(directory, generation)
+
+    refresh = SnapshotRefresh(
+        generation=generation,
+        rows=rows,
+        appended=appended,
+        patched=patched,
+        rebuilt=reason is not None,
+        seconds=time.perf_counter() - started,
+    )
+    logger.info(
+        'analytics.snapshot.refreshed generation=%s rows=%s appended=%s patched=%s rebuild_reason=%s seconds=%.3f',
+        refresh.generation,
+        refresh.rows,
+        refresh.appended,
+        refresh.patched,
+        reason,
+        refresh.seconds,
+    )
+    return refresh
+
+
+def _prune_generations(directory: Path, current: int) -> None:
+    # Readers that still map an older generation keep their pages after the files are unlinked.
+    for path in directory.glob('gen-*'):
+        if path.is_dir() and path.name != _generation_dir(directory, current).name:
+            shutil.rmtree(path, ignore_errors=True)
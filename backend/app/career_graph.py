@@ -0,0 +1,279 @@
+"""Read-only, pre-indexed career catalog: career -> skill areas -> subjects -> resources.
+
+The catalog only changes when ``seed_career_metadata`` runs, which stamps a new
+``career_catalog_version`` row whenever it adds or updates anything. ``get_career_graph`` reads that
+single row per call; when the version matches the graph already in memory it is returned as is,
+otherwise one caller reloads the six catalog tables and the new graph is swapped in with a single
+reference assignment. Nodes are frozen and shared by every request, so callers must not mutate them.
+"""
+
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from threading import Lock
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .models import (
+    Career,
+    CareerCatalogVersion,
+    CareerSkill,
+    SkillArea,
+    SkillSubject,
+    Subject,
+    SubjectResource,
+)
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_ID = 1
+
+IMPORTANCE_WEIGHTS = {
+    'critical': 1.0,
+    'high': 0.8,
+    'moderate': 0.6,
+}
+DEFAULT_IMPORTANCE_WEIGHT = 0.6
+
+
+@dataclass(frozen=True)
+class SubjectResourceDTO:
+    id: int
+    title: str
+    url: str
+    provider: str
+
+
+@dataclass(frozen=True)
+class SubjectNode:
+    id: int
+    name: str
+    field_of_study: str
+    description: str
+    resources: tuple[SubjectResourceDTO, ...]
+
+
+@dataclass(frozen=True)
+class SubjectLink:
+    subject: SubjectNode
+    relevance_indicator: str
+    relevance_weight: float
+
+
+@dataclass(frozen=True)
+class SkillNode:
+    id: int
+    name: str
+    description: str
+    importance_level: str
+    importance_weight: float
+    # Ordered by subject name.
+    subjects: tuple[SubjectLink, ...]
+
+
+@dataclass(frozen=True)
+class CareerNode:
+    id: int
+    name: str
+    slug: str
+    description: str
+    # Ordered by skill name.
+    skills: tuple[SkillNode, ...]
+    skill_ids: frozenset[int]
+    # Distinct linked subjects, in first-link order, and the sorted names of the skills linking each.
+    subjects: tuple[SubjectNode, ...]
+    subject_skill_names: tuple[tuple[str, ...], ...]
+    # Flattened skill -> subject links (skills in order, each skill's subjects in order) as parallel
+    # read-only arrays: position in ``skills``, position in ``subjects``, importance x relevance weight.
+    links: tuple[SubjectLink, ...]
+    link_skills: np.ndarray
+    link_subjects: np.ndarray
+    link_weights: np.ndarray
+
+
+@dataclass(frozen=True)
+class CareerGraph:
+    version: str | None
+    # Ordered by career name.
+    careers: tuple[CareerNode, ...]
+    careers_by_id: dict[int, CareerNode]
+    # Lower-cased name and slug -> career.
+    careers_by_key: dict[str, CareerNode]
+    skills_by_id: dict[int, SkillNode]
+    subjects_by_id: dict[int, SubjectNode]
+    fields_of_study: frozenset[str]
+
+    def resolve(self, career_name: str) -> CareerNode | None:
+        return self.careers_by_key.get(career_name.strip().lower())
+
+
+def _importance_weight(level: str) -> float:
+    return IMPORTANCE_WEIGHTS.get(level, DEFAULT_IMPORTANCE_WEIGHT)
+
+
+def _read_only(values: list, dtype: type) -> np.ndarray:
+    array = np.array(values, dtype=dtype)
+    array.setflags(write=False)
+    return array
+
+
+def _career_node(row: Career, skills: tuple[SkillNode, ...]) -> CareerNode:
+    subject_positions: dict[int, int] = {}
+    subjects: list[SubjectNode] = []
+    subject_skill_names: list[set[str]] = []
+    links: list[SubjectLink] = []
+    link_skills: list[int] = []
+    link_subjects: list[int] = []
+    link_weights: list[float] = []
+    for skill_position, skill in enumerate(skills):
+        for link in skill.subjects:
+            subject_position = subject_positions.setdefault(link.subject.id, len(subjects))
+            if subject_position == len(subjects):
+                subjects.append(link.subject)
+                subject_skill_names.append(set())
+            subject_skill_names[subject_position].add(skill.name)
+            links.append(link)
+            link_skills.append(skill_position)
+            link_subjects.append(subject_position)
+            link_weights.append(skill.importance_weight * link.relevance_weight)
+    return CareerNode(
+        id=row.id,
+        name=row.name,
+        slug=row.slug,
+        description=row.description,
+        skills=skills,
+        skill_ids=frozenset(skill.id for skill in skills),
+        subjects=tuple(subjects),
+        subject_skill_names=tuple(tuple(sorted(names)) for names in subject_skill_names),
+        links=tuple(links),
+        link_skills=_read_only(link_skills, np.int64),
+        link_subjects=_read_only(link_subjects, np.int64),
+        link_weights=_read_only(link_weights, np.float64),
+    )
+
+
+def catalog_version(db: Session) -> str | None:
+    return db.scalar(select(CareerCatalogVersion.version).where(CareerCatalogVersion.id == CATALOG_VERSION_ID))
+
+
+def bump_catalog_version(db: Session) -> str:
+    """Stamp a new catalog version in the caller's transaction."""
+    version = uuid.uuid4().hex
+    row = db.get(CareerCatalogVersion, CATALOG_VERSION_ID)
+    if row is None:
+        db.add(CareerCatalogVersion(id=CATALOG_VERSION_ID, version=version))
+    else:
+        row.version = version
+    return version
+
+
+def build_career_graph(db: Session, version: str | None) -> CareerGraph:
+    resources: dict[int, list[SubjectResourceDTO]] = {}
+    resource_rows = select(SubjectResource).order_by(SubjectResource.subject_id.asc(), SubjectResource.id.asc())
+    for row in db.scalars(resource_rows):
+        resources.setdefault(row.subject_id, []).append(
+            SubjectResourceDTO(id=row.id, title=row.title, url=row.url, provider=row.provider)
+        )
+    subjects_by_id = {
+        row.id: SubjectNode(
+            id=row.id,
+            name=row.name,
+            field_of_study=row.field_of_study,
+            description=row.description,
+            resources=tuple(resources.get(row.id, ())),
+        )
+        for row in db.scalars(select(Subject).order_by(Subject.name.asc(), Subject.id.asc()))
+    }
+
+    links: dict[int, list[SubjectLink]] = {}
+    for row in db.scalars(select(SkillSubject)):
+        subject = subjects_by_id.get(row.subject_id)
+        if subject is None:
+            continue
+        links.setdefault(row.skill_area_id, []).append(
+            SubjectLink(
+                subject=subject,
+                relevance_indicator=row.relevance_indicator,
+                relevance_weight=_importance_weight(row.relevance_indicator),
+            )
+        )
+    skills_by_id = {
+        row.id: SkillNode(
+            id=row.id,
+            name=row.name,
+            description=row.description,
+            importance_level=row.importance_level,
+            importance_weight=_importance_weight(row.importance_level),
+            subjects=tuple(sorted(links.get(row.id, ()), key=lambda link: (link.subject.name, link.subject.id))),
+        )
+        for row in db.scalars(select(SkillArea).order_by(SkillArea.name.asc(), SkillArea.id.asc()))
+    }
+
+    career_skills: dict[int, list[SkillNode]] = {}
+    for row in db.scalars(select(CareerSkill)):
+        skill = skills_by_id.get(row.skill_area_id)
+        if skill is not None:
+            career_skills.setdefault(row.career_id, []).append(skill)
+    careers = [
+        _career_node(row, tuple(sorted(career_skills.get(row.id, ()), key=lambda skill: (skill.name, skill.id))))
+        for row in db.scalars(select(Career).order_by(Career.name.asc()))
+    ]
+
+    careers_by_key: dict[str, CareerNode] = {}
+    # Slugs first so an exact name match wins when a name happens to equal another career's slug.
+    for career in careers:
+        careers_by_key.setdefault(career.slug, career)
+    for career in careers:
+        careers_by_key[career.name.lower()] = career
+
+    return CareerGraph(
+        version=version,
+        careers=tuple(careers),
+        careers_by_id={career.id: career for career in careers},
+        careers_by_key=careers_by_key,
+        skills_by_id=skills_by_id,
+        subjects_by_id=subjects_by_id,
+        fields_of_study=frozenset(subject.field_of_study for subject in subjects_by_id.values()),
+    )
+
+
+class CareerGraphCache:
+    def __init__(self) -> None:
+        self._graph: CareerGraph | None = None
+        self._lock = Lock()
+
+    def get(self, db: Session) -> CareerGraph:
+        # A database that was never seeded has no version row; None then stays valid until a seed stamps one.
+        version = catalog_version(db)
+        graph = self._graph
+        if graph is not None and graph.version == version:
+            return graph
+        with self._lock:
+            graph = self._graph
+            if graph is not None and graph.version == version:
+                return graph
+            started = time.perf_counter()
+            graph = build_career_graph(db, version)
+            self._graph = graph
+        logger.info(
+            'career.graph.built version=%s careers=%s skills=%s subjects=%s build_ms=%.1f',
+            version,
+            len(graph.careers),
+            len(graph.skills_by_id),
+            len(graph.subjects_by_id),
+            (time.perf_counter() - started) * 1000,
+        )
+        return graph
+
+    def clear(self) -> None:
+        self._graph = None
+
+
+career_graph_cache = CareerGraphCache()
+
+
+def get_career_graph(db: Session) -> CareerGraph:
+    return career_graph_cache.get(db)
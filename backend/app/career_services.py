@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import logging
+from collections.abc import Mapping, Sequence
 from dataclasses import dataclass
+from functools import lru_cache
 
-from sqlalchemy import select
+import numpy as np
+from sqlalchemy import func, or_, select
 from sqlalchemy.orm import Session
 
 from .career_catalog import (
@@ -13,8 +17,21 @@ from .career_catalog import (
     SKILL_TO_SUBJECTS,
     SUBJECT_DEFINITIONS,
     SUBJECT_RESOURCES,
+    SkillMetricRule,
     slugify_name,
 )
+from .career_graph import (
+    CareerGraph,
+    CareerNode,
+    SkillNode,
+    SubjectResourceDTO,
+    bump_catalog_version,
+    career_graph_cache,
+    catalog_version,
+    get_career_graph,
+)
+from .habits_storage import AssessmentColumns, what_if_columns
+from .productivity_model import predict_user_productivity_scores_for_columns
 from .models import (
     Career,
     CareerSkill,
@@ -26,6 +43,8 @@ from .models import (
     User,
 )
 
+logger = logging.getLogger(__name__)
+
 HIGHER_IS_BETTER_DEFAULTS = {
     'study_hours': True,
     'sleep_hours': True,
@@ -58,11 +77,8 @@ NORMALIZATION_RANGES = {
     'final_grade': (0.0, 100.0),
 }
 
-IMPORTANCE_WEIGHTS = {
-    'critical': 1.0,
-    'high': 0.8,
-    'moderate': 0.6,
-}
+# Distinct (course, catalog fields) pairs whose matching field set is kept.
+COURSE_FIELD_CACHE_SIZE = 1024
 
 FIELD_ALIASES = {
     'computer science': {
@@ -104,14 +120,6 @@ FIELD_ALIASES = {
 }
 
 
-@dataclass(frozen=True)
-class SubjectResourceDTO:
-    id: int
-    title: str
-    url: str
-    provider: str
-
-
 @dataclass(frozen=True)
 class CareerSkillAreaDTO:
     id: int
@@ -144,64 +152,81 @@ class CareerAlignedRecommendationDTO:
     resources: list[SubjectResourceDTO]
 
 
-@dataclass
-class _SubjectAccumulator:
-    subject: Subject
-    relevance_indicator: str
-    current_score: float
-    baseline_score: float
-    importance_level: str
-    supporting_skills: set[str]
-
-
-def _normalize(metric_name: str, value: float | None) -> float:
-    if value is None:
-        return 0.5
-    min_value, max_value = NORMALIZATION_RANGES.get(metric_name, (0.0, 1.0))
-    if max_value == min_value:
-        return 0.5
-    clamped = max(min(value, max_value), min_value)
-    return (clamped - min_value) / (max_value - min_value)
-
-
-def _is_higher_better(metric_name: str) -> bool:
-    return HIGHER_IS_BETTER_DEFAULTS.get(metric_name, True)
+@dataclass(frozen=True)
+class SimulationSubjectDTO:
+    subject_id: int
+    subject_name: str
+    weakness_score: float
+    baseline_weakness_score: float
+    gap_closure_percent: float
 
 
-def _get_metric_value(
-    assessment: HabitsAssessment,
-    metric_name: str,
-    simulated_metrics: dict[str, float] | None,
-) -> float | None:
-    if simulated_metrics and metric_name in simulated_metrics:
-        return simulated_metrics[metric_name]
-    value = getattr(assessment, metric_name, None)
-    if value is None:
-        return None
-    return float(value)
+@dataclass(frozen=True)
+class SimulationScenarioDTO:
+    metrics: dict[str, float]
+    predicted_productivity_score: float | None
+    items: list[SimulationSubjectDTO]
 
 
-def _skill_weakness_score(
-    assessment: HabitsAssessment,
-    skill_name: str,
-    simulated_metrics: dict[str, float] | None = None,
-) -> float:
-    rules = SKILL_METRIC_RULES.get(skill_name)
-    if not rules:
-        return 0.5
+@dataclass(frozen=True)
+class CareerSimulationDTO:
+    career: CareerNode | None
+    baseline_productivity_score: float | None
+    scenarios: list[SimulationScenarioDTO]
+
+
+class SkillWeaknessModel:
+    """``SKILL_METRIC_RULES`` compiled into a skills x metrics weight matrix and a higher-is-better vector.
+
+    Each row holds one skill's rule weights divided by their sum, so a skill's weakness is the dot
+    product of its row with the metrics oriented so that 1 means weak. Skills without rules score 0.5.
+    """
+
+    def __init__(self, rules: dict[str, list[SkillMetricRule]]) -> None:
+        self.skills = tuple(rules)
+        self.skill_index = {skill: index for index, skill in enumerate(self.skills)}
+        self.metrics = tuple(dict.fromkeys(rule.metric_name for skill_rules in rules.values() for rule in skill_rules))
+        metric_index = {metric: index for index, metric in enumerate(self.metrics)}
+
+        higher_is_better: dict[str, bool] = {}
+        # One extra all-zero row stands in for skills that have no rules.
+        weights = np.zeros((len(self.skills) + 1, len(self.metrics)), dtype=np.float64)
+        for row, skill_rules in enumerate(rules.values()):
+            for rule in skill_rules:
+                if higher_is_better.setdefault(rule.metric_name, rule.higher_is_better) != rule.higher_is_better:
+                    raise ValueError(f'Skill rules disagree on the direction of {rule.metric_name!r}')
+                weights[row, metric_index[rule.metric_name]] += rule.weight
+        totals = weights.sum(axis=1, keepdims=True)
+        self.weights = np.divide(weights, totals, out=np.zeros_like(weights), where=totals != 0)
+        self.unscored = totals[:, 0] == 0
+        self.higher_is_better = np.array([higher_is_better[metric] for metric in self.metrics], dtype=bool)
+        ranges = np.array([NORMALIZATION_RANGES.get(metric, (0.0, 1.0)) for metric in self.metrics], dtype=np.float64)
+        self.lower = ranges[:, 0]
+        self.span = ranges[:, 1] - ranges[:, 0]
+
+    def rows(self, skill_names: list[str] | tuple[str, ...]) -> np.ndarray:
+        return np.array([self.skill_index.get(name, len(self.skills)) for name in skill_names], dtype=np.int64)
+
+    def metric_values(self, columns: AssessmentColumns) -> np.ndarray:
+        """Metrics x rows matrix of the raw values in ``columns``, NaN where missing."""
+        return np.stack([columns.values[metric] for metric in self.metrics])
+
+    def weakness(self, rows: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """Weakness in [0, 1] of the skills at ``rows`` for each column of ``values``."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            normalized = np.clip((values - self.lower[:, None]) / self.span[:, None], 0.0, 1.0)
+        normalized[np.isnan(normalized) | (self.span == 0)[:, None]] = 0.5
+        oriented = np.where(self.higher_is_better[:, None], 1.0 - normalized, normalized)
+        scores = np.clip(self.weights[rows] @ oriented, 0.0, 1.0)
+        scores[self.unscored[rows]] = 0.5
+        return scores
+
+
+SKILL_WEAKNESS_MODEL = SkillWeaknessModel(SKILL_METRIC_RULES)
 
-    weighted_total = 0.0
-    weight_sum = 0.0
-    for rule in rules:
-        raw_value = _get_metric_value(assessment, rule.metric_name, simulated_metrics)
-        normalized = _normalize(rule.metric_name, raw_value)
-        weakness = (1 - normalized) if rule.higher_is_better else normalized
-        weighted_total += weakness * rule.weight
-        weight_sum += rule.weight
 
-    if weight_sum == 0:
-        return 0.5
-    return max(0.0, min(1.0, weighted_total / weight_sum))
+def _is_higher_better(metric_name: str) -> bool:
+    return HIGHER_IS_BETTER_DEFAULTS.get(metric_name, True)
 
 
 def _is_cross_disciplinary(field: str) -> bool:
@@ -234,6 +259,22 @@ def course_matches_field(course: str, field: str) -> bool:
     return False
 
 
+@lru_cache(maxsize=COURSE_FIELD_CACHE_SIZE)
+def _matching_fields(course: str, fields: frozenset[str]) -> frozenset[str]:
+    return frozenset(field for field in fields if course_matches_field(course, field))
+
+
+def course_fields(graph: CareerGraph, course: str | None) -> frozenset[str] | None:
+    """The catalog's ``field_of_study`` values that ``course`` matches; ``None`` when no course filters.
+
+    Each distinct course is resolved against the catalog's field set once and then answered from a
+    bounded LRU cache, so subject filtering is a set-membership test.
+    """
+    if not course:
+        return None
+    return _matching_fields(course.strip().lower(), graph.fields_of_study)
+
+
 def _find_by_name_ci(items: list[dict[str, str]], name: str) -> dict[str, str] | None:
     target = name.strip().lower()
     for item in items:
@@ -243,6 +284,8 @@ def _find_by_name_ci(items: list[dict[str, str]], name: str) -> dict[str, str] |
 
 
 def seed_career_metadata(db: Session) -> None:
+    """Insert missing catalog rows and stamp a new catalog version when anything changed."""
+    changed = False
     existing_careers = {career.name: career for career in db.scalars(select(Career)).all()}
     existing_skills = {skill.name: skill for skill in db.scalars(select(SkillArea)).all()}
     existing_subjects = {
@@ -254,11 +297,16 @@ def seed_career_metadata(db: Session) -> None:
         if career is None:
             career = Career(
                 name=career_data['name'],
+                slug=slugify_name(career_data['name']),
                 description=career_data['description'],
             )
             db.add(career)
             db.flush()
+            changed = True
             existing_careers[career.name] = career
+        elif career.slug != slugify_name(career.name):
+            career.slug = slugify_name(career.name)
+            changed = True
 
     for skill_data in SKILL_AREA_DEFINITIONS:
         skill = existing_skills.get(skill_data['name'])
@@ -270,6 +318,7 @@ def seed_career_metadata(db: Session) -> None:
             )
             db.add(skill)
             db.flush()
+            changed = True
             existing_skills[skill.name] = skill
 
     for subject_data in SUBJECT_DEFINITIONS:
@@ -283,6 +332,7 @@ def seed_career_metadata(db: Session) -> None:
             )
             db.add(subject)
             db.flush()
+            changed = True
             existing_subjects[key] = subject
 
     existing_career_skill_pairs = {
@@ -302,6 +352,7 @@ def seed_career_metadata(db: Session) -> None:
                 continue
             db.add(CareerSkill(career_id=career.id, skill_area_id=skill.id))
             existing_career_skill_pairs.add(pair_key)
+            changed = True
 
     existing_skill_subject_pairs = {
         (pair.skill_area_id, pair.subject_id): pair
@@ -328,9 +379,11 @@ def seed_career_metadata(db: Session) -> None:
                         relevance_indicator=relevance_indicator,
                     )
                 )
+                changed = True
                 continue
             if existing.relevance_indicator != relevance_indicator:
                 existing.relevance_indicator = relevance_indicator
+                changed = True
 
     existing_resources_by_subject: dict[int, dict[str, SubjectResource]] = {}
     for resource in db.scalars(select(SubjectResource)).all():
@@ -353,41 +406,53 @@ def seed_career_metadata(db: Session) -> None:
             )
             db.add(resource)
             existing_urls[resource.url] = resource
+            changed = True
 
+    if changed or catalog_version(db) is None:
+        version = bump_catalog_version(db)
+        logger.info('career.catalog.seeded version=%s', version)
     db.commit()
 
 
-def resolve_career_by_name(db: Session, career_name: str) -> Career | None:
-    normalized = career_name.strip().lower()
-    careers = list(db.scalars(select(Career)).all())
-    for career in careers:
-        if career.name.lower() == normalized:
-            return career
-        if slugify_name(career.name) == normalized:
-            return career
-    return None
+def resolve_career_by_name(db: Session, career_name: str) -> CareerNode | None:
+    """Find a career by slug or case-insensitive name.
+
+    Hot lookups are served from the graph's slug/name map. A miss costs one indexed point query, so a
+    career inserted without re-seeding still resolves (and rebuilds the graph) instead of a 404.
+    """
+    graph = get_career_graph(db)
+    career = graph.resolve(career_name)
+    if career is not None:
+        return career
+    key = career_name.strip().lower()
+    career_id = db.scalar(
+        select(Career.id).where(or_(Career.slug == key, func.lower(Career.name) == key)).limit(1)
+    )
+    if career_id is None:
+        return None
+    logger.info('career.graph.stale career_id=%s version=%s', career_id, graph.version)
+    career_graph_cache.clear()
+    return get_career_graph(db).careers_by_id.get(career_id)
 
 
-def list_careers(db: Session) -> list[Career]:
-    return list(db.scalars(select(Career).order_by(Career.name.asc())).all())
+def list_careers(db: Session) -> list[CareerNode]:
+    return list(get_career_graph(db).careers)
+
+
+def _skill_area_dto(skill: SkillNode) -> CareerSkillAreaDTO:
+    return CareerSkillAreaDTO(
+        id=skill.id,
+        name=skill.name,
+        description=skill.description,
+        importance_level=skill.importance_level,
+    )
 
 
 def get_career_skill_areas(db: Session, career_id: int) -> list[CareerSkillAreaDTO]:
-    rows = db.execute(
-        select(SkillArea)
-        .join(CareerSkill, CareerSkill.skill_area_id == SkillArea.id)
-        .where(CareerSkill.career_id == career_id)
-        .order_by(SkillArea.name.asc())
-    ).scalars().all()
-    return [
-        CareerSkillAreaDTO(
-            id=row.id,
-            name=row.name,
-            description=row.description,
-            importance_level=row.importance_level,
-        )
-        for row in rows
-    ]
+    career = get_career_graph(db).careers_by_id.get(career_id)
+    if career is None:
+        return []
+    return [_skill_area_dto(skill) for skill in career.skills]
 
 
 def get_subjects_for_skill(
@@ -396,164 +461,129 @@ def get_subjects_for_skill(
     *,
     user_course: str | None = None,
 ) -> list[CareerSubjectDTO]:
-    rows = db.execute(
-        select(SkillSubject, Subject)
-        .join(Subject, Subject.id == SkillSubject.subject_id)
-        .where(SkillSubject.skill_area_id == skill_id)
-        .order_by(Subject.name.asc())
-    ).all()
-
-    filtered: list[CareerSubjectDTO] = []
-    for link, subject in rows:
-        if user_course and not course_matches_field(user_course, subject.field_of_study):
-            continue
-        filtered.append(
-            CareerSubjectDTO(
-                id=subject.id,
-                name=subject.name,
-                field_of_study=subject.field_of_study,
-                description=subject.description,
-                relevance_indicator=link.relevance_indicator,
-            )
+    graph = get_career_graph(db)
+    skill = graph.skills_by_id.get(skill_id)
+    if skill is None:
+        return []
+    fields = course_fields(graph, user_course)
+    return [
+        CareerSubjectDTO(
+            id=link.subject.id,
+            name=link.subject.name,
+            field_of_study=link.subject.field_of_study,
+            description=link.subject.description,
+            relevance_indicator=link.relevance_indicator,
         )
-    return filtered
+        for link in skill.subjects
+        if fields is None or link.subject.field_of_study in fields
+    ]
 
 
-def _score_subjects_for_skills(
-    db: Session,
+def _subject_scores(career: CareerNode, columns: AssessmentColumns) -> tuple[np.ndarray, np.ndarray]:
+    """Subjects x rows and links x rows weakness; a subject scores as its strongest link."""
+    values = SKILL_WEAKNESS_MODEL.metric_values(columns)
+    weakness = SKILL_WEAKNESS_MODEL.weakness(SKILL_WEAKNESS_MODEL.rows([skill.name for skill in career.skills]), values)
+    link_scores = weakness[career.link_skills] * career.link_weights[:, None]
+    scores = np.full((len(career.subjects), len(columns)), -np.inf)
+    np.maximum.at(scores, career.link_subjects, link_scores)
+    return scores, link_scores
+
+
+def _eligible_subjects(career: CareerNode, fields: frozenset[str] | None) -> np.ndarray:
+    return np.flatnonzero([fields is None or subject.field_of_study in fields for subject in career.subjects])
+
+
+def _top_subjects(scores: np.ndarray, limit: int) -> np.ndarray:
+    """Row indexes of the ``limit`` highest scores of each column, best first, ties in row order."""
+    if len(scores) > limit:
+        top = np.sort(np.argpartition(-scores, limit - 1, axis=0)[:limit], axis=0)
+    else:
+        top = np.broadcast_to(np.arange(len(scores))[:, None], scores.shape)
+    order = np.argsort(-np.take_along_axis(scores, top, axis=0), axis=0, kind='stable')
+    return np.take_along_axis(top, order, axis=0)
+
+
+def _gap_closure(baseline_score: float, current_score: float) -> float:
+    return max(0.0, min(100.0, (baseline_score - current_score) * 100))
+
+
+def _rank_career_subjects(
+    career: CareerNode,
     assessment: HabitsAssessment,
-    skills: list[CareerSkillAreaDTO],
     *,
-    user_course: str,
+    fields: frozenset[str] | None,
     simulated_metrics: dict[str, float] | None,
-) -> dict[int, _SubjectAccumulator]:
-    skill_ids = [skill.id for skill in skills]
-    if not skill_ids:
-        return {}
-
-    rows = db.execute(
-        select(SkillSubject, Subject)
-        .join(Subject, Subject.id == SkillSubject.subject_id)
-        .where(SkillSubject.skill_area_id.in_(skill_ids))
-    ).all()
-
-    skill_by_id = {skill.id: skill for skill in skills}
-    accumulators: dict[int, _SubjectAccumulator] = {}
-
-    for link, subject in rows:
-        skill = skill_by_id.get(link.skill_area_id)
-        if skill is None:
-            continue
-        if user_course and not course_matches_field(user_course, subject.field_of_study):
-            continue
+    limit: int,
+) -> list[CareerAlignedRecommendationDTO]:
+    eligible = _eligible_subjects(career, fields)
+    if not len(eligible):
+        return []
 
-        skill_weakness = _skill_weakness_score(
-            assessment,
-            skill.name,
-            simulated_metrics=simulated_metrics,
-        )
-        baseline_weakness = _skill_weakness_score(assessment, skill.name, simulated_metrics=None)
-        importance_weight = IMPORTANCE_WEIGHTS.get(skill.importance_level, 0.6)
-        relevance_weight = IMPORTANCE_WEIGHTS.get(link.relevance_indicator, 0.6)
+    # Row 0 is the (possibly simulated) current state, row 1 the stored baseline.
+    columns = what_if_columns(
+        assessment,
+        {metric: np.array([value, np.nan]) for metric, value in (simulated_metrics or {}).items()},
+        2,
+    )
+    scores, link_scores = _subject_scores(career, columns)
+    ranked = eligible[_top_subjects(scores[eligible, :1], limit)[:, 0]]
 
-        current_score = skill_weakness * importance_weight * relevance_weight
-        baseline_score = baseline_weakness * importance_weight * relevance_weight
+    # The first link reaching its subject's score supplies the relevance and importance labels.
+    best_link: dict[int, int] = {}
+    for link in np.flatnonzero(link_scores[:, 0] == scores[career.link_subjects, 0]).tolist():
+        best_link.setdefault(int(career.link_subjects[link]), link)
 
-        existing = accumulators.get(subject.id)
-        if existing is None:
-            accumulators[subject.id] = _SubjectAccumulator(
-                subject=subject,
+    recommendations: list[CareerAlignedRecommendationDTO] = []
+    for position in ranked.tolist():
+        subject = career.subjects[position]
+        link = career.links[best_link[position]]
+        importance_level = career.skills[career.link_skills[best_link[position]]].importance_level
+        current_score, baseline_score = scores[position].tolist()
+        recommendations.append(
+            CareerAlignedRecommendationDTO(
+                subject_id=subject.id,
+                subject_name=subject.name,
+                field_of_study=subject.field_of_study,
+                description=subject.description,
                 relevance_indicator=link.relevance_indicator,
-                current_score=current_score,
-                baseline_score=baseline_score,
-                importance_level=skill.importance_level,
-                supporting_skills={skill.name},
-            )
-            continue
-
-        existing.supporting_skills.add(skill.name)
-        if current_score > existing.current_score:
-            existing.current_score = current_score
-            existing.relevance_indicator = link.relevance_indicator
-            existing.importance_level = skill.importance_level
-        if baseline_score > existing.baseline_score:
-            existing.baseline_score = baseline_score
-
-    return accumulators
-
-
-def _load_resources(db: Session, subject_ids: list[int]) -> dict[int, list[SubjectResourceDTO]]:
-    if not subject_ids:
-        return {}
-    rows = db.scalars(
-        select(SubjectResource)
-        .where(SubjectResource.subject_id.in_(subject_ids))
-        .order_by(SubjectResource.subject_id.asc(), SubjectResource.id.asc())
-    ).all()
-
-    grouped: dict[int, list[SubjectResourceDTO]] = {}
-    for row in rows:
-        grouped.setdefault(row.subject_id, []).append(
-            SubjectResourceDTO(
-                id=row.id,
-                title=row.title,
-                url=row.url,
-                provider=row.provider,
+                weakness_score=round(current_score, 4),
+                baseline_weakness_score=round(baseline_score, 4),
+                gap_closure_percent=round(_gap_closure(baseline_score, current_score), 2),
+                career_relevance_context=f'{importance_level.capitalize()} for career readiness',
+                supporting_skills=list(career.subject_skill_names[position]),
+                resources=list(subject.resources),
             )
         )
-    return grouped
+    return recommendations
 
 
-def get_weak_subjects_for_skills(
+def _latest_assessment(db: Session, user_id: int) -> HabitsAssessment | None:
+    return db.scalar(
+        select(HabitsAssessment)
+        .where(HabitsAssessment.user_id == user_id)
+        .order_by(HabitsAssessment.created_at.desc())
+    )
+
+
+def get_weak_subjects_for_career(
     db: Session,
     user_id: int,
-    skill_areas: list[CareerSkillAreaDTO],
+    career: CareerNode,
     *,
     user_course: str,
     simulated_metrics: dict[str, float] | None = None,
     limit: int = 10,
 ) -> list[CareerAlignedRecommendationDTO]:
-    latest_assessment = db.scalar(
-        select(HabitsAssessment)
-        .where(HabitsAssessment.user_id == user_id)
-        .order_by(HabitsAssessment.created_at.desc())
-    )
+    latest_assessment = _latest_assessment(db, user_id)
     if latest_assessment is None:
         return []
-
-    scored = _score_subjects_for_skills(
-        db,
+    return _rank_career_subjects(
+        career,
         latest_assessment,
-        skill_areas,
-        user_course=user_course,
+        fields=course_fields(get_career_graph(db), user_course),
         simulated_metrics=simulated_metrics,
+        limit=limit,
     )
-    if not scored:
-        return []
-
-    ranked = sorted(scored.values(), key=lambda item: item.current_score, reverse=True)[:limit]
-    resources_by_subject = _load_resources(db, [entry.subject.id for entry in ranked])
-
-    recommendations: list[CareerAlignedRecommendationDTO] = []
-    for entry in ranked:
-        gap_closure = max(0.0, min(100.0, (entry.baseline_score - entry.current_score) * 100))
-        relevance_label = entry.importance_level.capitalize()
-        recommendations.append(
-            CareerAlignedRecommendationDTO(
-                subject_id=entry.subject.id,
-                subject_name=entry.subject.name,
-                field_of_study=entry.subject.field_of_study,
-                description=entry.subject.description,
-                relevance_indicator=entry.relevance_indicator,
-                weakness_score=round(entry.current_score, 4),
-                baseline_weakness_score=round(entry.baseline_score, 4),
-                gap_closure_percent=round(gap_closure, 2),
-                career_relevance_context=f'{relevance_label} for career readiness',
-                supporting_skills=sorted(entry.supporting_skills),
-                resources=resources_by_subject.get(entry.subject.id, []),
-            )
-        )
-    return recommendations
 
 
 def get_user_career_aligned_recommendations(
@@ -562,19 +592,18 @@ def get_user_career_aligned_recommendations(
     *,
     simulated_metrics: dict[str, float] | None = None,
     limit: int = 3,
-) -> tuple[Career | None, list[CareerAlignedRecommendationDTO]]:
+) -> tuple[CareerNode | None, list[CareerAlignedRecommendationDTO]]:
     if user.career_id is None:
         return None, []
 
-    career = db.scalar(select(Career).where(Career.id == user.career_id))
+    career = get_career_graph(db).careers_by_id.get(user.career_id)
     if career is None:
         return None, []
 
-    skill_areas = get_career_skill_areas(db, career.id)
-    recommendations = get_weak_subjects_for_skills(
+    recommendations = get_weak_subjects_for_career(
         db,
         user.id,
-        skill_areas,
+        career,
         user_course=user.course,
         simulated_metrics=simulated_metrics,
         limit=limit,
@@ -601,6 +630,101 @@ def get_user_career_aligned_recommendations(
     return career, with_career_context
 
 
+def expand_simulation_scenarios(
+    grid: Mapping[str, Sequence[float]] | None = None,
+    scenarios: Sequence[Mapping[str, float]] | None = None,
+) -> tuple[dict[str, np.ndarray], int]:
+    """Scenario columns (metric -> one value per scenario, NaN when not overridden) and the scenario count.
+
+    A ``grid`` expands to the cartesian product of its axes, the last axis varying fastest.
+    """
+    if grid is not None:
+        mesh = np.meshgrid(*(np.asarray(points, dtype=np.float64) for points in grid.values()), indexing='ij')
+        return {metric: values.ravel() for metric, values in zip(grid, mesh, strict=True)}, mesh[0].size
+    scenarios = scenarios or []
+    metrics = dict.fromkeys(metric for scenario in scenarios for metric in scenario)
+    return {
+        metric: np.array([scenario.get(metric, np.nan) for scenario in scenarios], dtype=np.float64)
+        for metric in metrics
+    }, len(scenarios)
+
+
+def simulate_career_scenarios(
+    db: Session,
+    user: User,
+    scenarios: Mapping[str, np.ndarray],
+    count: int,
+    *,
+    limit: int = 3,
+) -> CareerSimulationDTO:
+    """Evaluate ``count`` what-if variants of the user's latest assessment in one pass.
+
+    Every scenario and the unmodified baseline become rows of one set of assessment columns. Those rows
+    are scored by a single productivity ``predict`` call and a single skill weakness evaluation; each
+    scenario then keeps its ``limit`` weakest career subjects.
+    """
+    graph = get_career_graph(db)
+    career = graph.careers_by_id.get(user.career_id) if user.career_id is not None else None
+    overrides: list[dict[str, float]] = [{} for _ in range(count)]
+    for metric, values in scenarios.items():
+        for index in np.flatnonzero(~np.isnan(values)).tolist():
+            overrides[index][metric] = float(values[index])
+    assessment = _latest_assessment(db, user.id)
+    if assessment is None:
+        return CareerSimulationDTO(
+            career=career,
+            baseline_productivity_score=None,
+            scenarios=[
+                SimulationScenarioDTO(metrics=metrics, predicted_productivity_score=None, items=[])
+                for metrics in overrides
+            ],
+        )
+
+    # The last row is the baseline.
+    columns = what_if_columns(
+        assessment,
+        {metric: np.append(values, np.nan) for metric, values in scenarios.items()},
+        count + 1,
+    )
+    productivity = [
+        None if np.isnan(score) else score
+        for score in predict_user_productivity_scores_for_columns(columns, user).tolist()
+    ]
+
+    items: list[list[SimulationSubjectDTO]] = [[] for _ in range(count)]
+    eligible = (
+        _eligible_subjects(career, course_fields(graph, user.course))
+        if career is not None
+        else np.empty(0, dtype=np.int64)
+    )
+    if len(eligible):
+        scores = _subject_scores(career, columns)[0][eligible]
+        baseline = scores[:, count].tolist()
+        top = _top_subjects(scores[:, :count], limit)
+        for scenario, rows in enumerate(top.T.tolist()):
+            for row in rows:
+                current_score = float(scores[row, scenario])
+                subject = career.subjects[eligible[row]]
+                items[scenario].append(
+                    SimulationSubjectDTO(
+                        subject_id=subject.id,
+                        subject_name=subject.name,
+                        weakness_score=round(current_score, 4),
+                        baseline_weakness_score=round(baseline[row], 4),
+                        gap_closure_percent=round(_gap_closure(baseline[row], current_score), 2),
+                    )
+                )
+
+    return CareerSimulationDTO(
+        career=career,
+        baseline_productivity_score=productivity[count],
+        scenarios=[
+            SimulationScenarioDTO(metrics=metrics, predicted_productivity_score=score, items=scenario_items)
+            for metrics, score, scenario_items in zip(overrides, productivity[:count], items, strict=True)
+        ],
+    )
+
+
 def parse_simulation_metrics(params: dict[str, str | float | int | None]) -> dict[str, float]:
     parsed: dict[str, float] = {}
     for key, value in params.items():
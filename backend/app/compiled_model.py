@@ -0,0 +1,139 @@
+"""Fold a trained productivity pipeline into a single weight vector and bias.
+
+``train_productivity_models.py`` saves ``Pipeline(ColumnTransformer -> LinearRegression)`` where
+numeric columns are median-imputed and standard-scaled and categorical columns are
+most-frequent-imputed and one-hot encoded. Every step is affine, so the whole pipeline reduces to
+
+    prediction = bias + numeric @ weights + sum(category weight of each categorical column)
+
+with NaN numeric inputs replaced by the training medians before the dot product.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CompiledCategorical:
+    feature: str
+    fill_value: object
+    # Unknown categories contribute nothing, matching OneHotEncoder(handle_unknown='ignore').
+    weights: dict[object, float]
+
+
+@dataclass(frozen=True)
+class CompiledLinearModel:
+    numeric_features: tuple[str, ...]
+    numeric_fill: np.ndarray
+    weights: np.ndarray
+    categorical: tuple[CompiledCategorical, ...]
+    bias: float
+
+    @property
+    def feature_names(self) -> tuple[str, ...]:
+        return self.numeric_features + tuple(item.feature for item in self.categorical)
+
+    def predict(self, features: Mapping[str, object]) -> np.ndarray:
+        """Predict from a DataFrame or any mapping of feature name to a column of values."""
+        numeric = np.column_stack(
+            [np.asarray(features[name], dtype=np.float64).reshape(-1) for name in self.numeric_features]
+        )
+        numeric = np.where(np.isnan(numeric), self.numeric_fill, numeric)
+        predictions = numeric @ self.weights + self.bias
+        for item in self.categorical:
+            values = np.asarray(features[item.feature], dtype=object).reshape(-1)
+            predictions += np.fromiter(
+                (item.weights.get(item.fill_value if _is_missing(value) else value, 0.0) for value in values),
+                dtype=np.float64,
+                count=len(predictions),
+            )
+        return predictions
+
+
+def _is_missing(value: object) -> bool:
+    # SimpleImputer only treats NaN as missing; None falls through to the encoder as an unknown category.
+    return isinstance(value, float) and value != value
+
+
+def _step(pipeline, name: str, expected: str):
+    step = pipeline.named_steps.get(name)
+    if step is None or type(step).__name__ != expected:
+        raise ValueError(f'Expected a {expected} step named {name!r}')
+    return step
+
+
+def compile_linear_pipeline(pipeline) -> CompiledLinearModel:
+    """Compile a fitted training pipeline; raises ``ValueError`` for any other structure."""
+    preprocessor = _step(pipeline, 'preprocessor', 'ColumnTransformer')
+    model = _step(pipeline, 'model', 'LinearRegression')
+    coefficients = np.asarray(model.coef_, dtype=np.float64)
+    if coefficients.ndim != 1:
+        raise ValueError('Only single-target regressions can be compiled')
+
+    numeric_features: list[str] = []
+    numeric_fill: list[float] = []
+    numeric_weights: list[float] = []
+    categorical: list[CompiledCategorical] = []
+    bias = float(model.intercept_)
+    offset = 0
+    for name, transformer, columns in preprocessor.transformers_:
+        if isinstance(transformer, str) and transformer == 'drop' or not len(columns):
+            continue
+        if name == 'num':
+            imputer = _step(transformer, 'imputer', 'SimpleImputer')
+            scaler = _step(transformer, 'scaler', 'StandardScaler')
+            mean = scaler.mean_ if scaler.with_mean else np.zeros(len(columns))
+            scale = scaler.scale_ if scaler.with_std else np.ones(len(columns))
+            weights = coefficients[offset:offset + len(columns)] / scale
+            numeric_features.extend(columns)
+            numeric_fill.extend(np.asarray(imputer.statistics_, dtype=np.float64).tolist())
+            numeric_weights.extend(weights.tolist())
+            bias -= float(weights @ mean)
+            offset += len(columns)
+        elif name == 'cat':
+            imputer = _step(transformer, 'imputer', 'SimpleImputer')
+            encoder = _step(transformer, 'onehot', 'OneHotEncoder')
+            if encoder.drop_idx_ is not None or encoder.handle_unknown != 'ignore':
+                raise ValueError('Only OneHotEncoder(handle_unknown="ignore") without drop can be compiled')
+            if encoder.min_frequency is not None or encoder.max_categories is not None:
+                raise ValueError('Infrequent category grouping cannot be compiled')
+            for column, fill_value, categories in zip(columns, imputer.statistics_, encoder.categories_, strict=True):
+                category_weights = coefficients[offset:offset + len(categories)]
+                categorical.append(
+                    CompiledCategorical(
+                        feature=column,
+                        fill_value=fill_value,
+                        weights=dict(zip(categories.tolist(), category_weights.tolist(), strict=True)),
+                    )
+                )
+                offset += len(categories)
+        else:
+            raise ValueError(f'Unknown preprocessing step {name!r}')
+
+    if offset != len(coefficients):
+        raise ValueError(f'Compiled {offset} features but the regression has {len(coefficients)} coefficients')
+    return CompiledLinearModel(
+        numeric_features=tuple(numeric_features),
+        numeric_fill=np.asarray(numeric_fill, dtype=np.float64),
+        weights=np.asarray(numeric_weights, dtype=np.float64),
+        categorical=tuple(categorical),
+        bias=bias,
+    )
+
+
+def compile_or_keep(pipeline, source: object = ''):
+    """Return the compiled fast path when possible, otherwise the pipeline itself."""
+    try:
+        compiled = compile_linear_pipeline(pipeline)
+    except (AttributeError, ValueError) as exc:
+        logger.warning('productivity.model.compile_skipped source=%s reason=%s', source, exc)
+        return pipeline
+    logger.info('productivity.model.compiled source=%s features=%s', source, len(compiled.feature_names))
+    return compiled
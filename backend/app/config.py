@@ -1,6 +1,8 @@
 from functools import lru_cache
+from typing import Annotated, Literal
+
 from pydantic import Field, field_validator
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 
 
 class Settings(BaseSettings):
@@ -15,15 +17,49 @@ class Settings(BaseSettings):
     cookie_secure: bool = False
     cookie_samesite: str = 'lax'
     allowed_origins: list[str] = Field(default_factory=lambda: ['http://localhost:4200'])
+    # Accounts allowed to use the /api/admin endpoints; comma separated in the environment.
+    admin_emails: Annotated[list[str], NoDecode] = Field(default_factory=list)
     habits_encryption_key: str = ''
+    habits_encryption_keyring: str = ''
+    habits_encryption_active_key_id: int = 0
+    habits_storage_mode: Literal['columns', 'sealed'] = 'columns'
+    # How often the model registry checks artifacts for a retrained version; negative disables reloads.
+    model_reload_interval_seconds: float = 30.0
+    # Submits within this window share one queued correlation recompute.
+    jobs_coalesce_seconds: float = 5.0
+    jobs_poll_interval_seconds: float = 1.0
+    # A running job renews its lease while it runs; one not renewed for this long is handed to another worker.
+    jobs_lease_seconds: int = 900
+    # Cohort correlations (per course, year level, career) are only published from this many pairs.
+    habits_segment_min_sample_size: int = 30
+    # Rolling correlation windows in days (comma separated in the environment) and the half-life of the
+    # exponentially decayed correlations.
+    habits_correlation_window_days: Annotated[list[int], NoDecode] = Field(default_factory=lambda: [30, 90, 365])
+    habits_correlation_half_life_days: float = 90.0
+    # JSON file with the recommendation rule table; empty uses the built-in rules.
+    habits_recommendation_rules_path: str = ''
+    # Snapshots published within this window share one recommendation refresh over all users.
+    habits_recommendation_refresh_delay_seconds: float = 300.0
+    # The normalized export only reads assessments last updated at least this long ago. A submit stamps
+    # updated_at before its transaction commits, so newer rows may still be joined by earlier-stamped ones.
+    habits_export_settle_seconds: float = 60.0
+    # Directory of the memory-mapped analytics snapshot, relative to the working directory.
+    analytics_snapshot_dir: str = './analytics_snapshot'
 
-    @field_validator('allowed_origins', mode='before')
+    @field_validator('allowed_origins', 'admin_emails', mode='before')
     @classmethod
     def parse_allowed_origins(cls, value: str | list[str]) -> list[str]:
         if isinstance(value, str):
             return [origin.strip() for origin in value.split(',') if origin.strip()]
         return value
 
+    @field_validator('habits_correlation_window_days', mode='before')
+    @classmethod
+    def parse_window_days(cls, value: str | list[int]) -> list[int]:
+        if isinstance(value, str):
+            return [int(days) for days in value.split(',') if days.strip()]
+        return value
+
 
 @lru_cache
 def get_settings() -> Settings:
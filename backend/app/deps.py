@@ -2,6 +2,7 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
 
+from .config import get_settings
 from .database import get_db
 from .models import User
 from .security import get_user_from_token
@@ -16,3 +17,10 @@ def get_current_user(
     if credentials is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Unauthorized')
     return get_user_from_token(db, token=credentials.credentials, token_type='access')
+
+
+def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+    admin_emails = {email.lower() for email in get_settings().admin_emails}
+    if current_user.email.lower() not in admin_emails:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Forbidden')
+    return current_user
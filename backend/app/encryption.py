@@ -1,40 +1,172 @@
 import base64
+import math
+import struct
+from collections.abc import Sequence
+from functools import lru_cache
 from hashlib import sha256
 from secrets import token_bytes
 
+from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
 from .config import get_settings
 
+# Ciphertexts written by the keyring start with this marker followed by a one-byte key id.
+# Values stored before the keyring existed are bare ``nonce + ciphertext`` under key id 0.
+KEYED_CIPHERTEXT_MAGIC = b'SPK1'
+LEGACY_KEY_ID = 0
+NONCE_SIZE = 12
+_HEADER_SIZE = len(KEYED_CIPHERTEXT_MAGIC) + 1
+
+# Sealed records pack a whole row of numbers into one AEAD message:
+#   b'SR' | format version (1 byte) | key id (1 byte) | nonce | ciphertext + tag
+# Version 1 stores little-endian float64 values with NaN standing in for missing values.
+SEALED_RECORD_MAGIC = b'SR'
+SEALED_RECORD_VERSION = 1
+_SEALED_HEADER_SIZE = len(SEALED_RECORD_MAGIC) + 2
+_SEALED_VALUE = struct.Struct('<d')
+
+
+def _decode_key(configured_key: str) -> bytes:
+    try:
+        decoded = base64.urlsafe_b64decode(configured_key.encode('utf-8'))
+        if len(decoded) == 32:
+            return decoded
+    except Exception:
+        pass
+    if len(configured_key) == 64:
+        try:
+            return bytes.fromhex(configured_key)
+        except ValueError:
+            pass
+    return sha256(configured_key.encode('utf-8')).digest()
+
 
 def _build_key_bytes() -> bytes:
     settings = get_settings()
     configured_key = settings.habits_encryption_key.strip()
     if configured_key:
-        try:
-            decoded = base64.urlsafe_b64decode(configured_key.encode('utf-8'))
-            if len(decoded) == 32:
-                return decoded
-        except Exception:
-            pass
-        if len(configured_key) == 64:
-            try:
-                return bytes.fromhex(configured_key)
-            except ValueError:
-                pass
-        return sha256(configured_key.encode('utf-8')).digest()
+        return _decode_key(configured_key)
     return sha256(settings.jwt_secret_key.encode('utf-8')).digest()
 
 
+def _parse_keyring_entries(value: str) -> dict[int, bytes]:
+    keys: dict[int, bytes] = {}
+    for entry in value.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        key_id, separator, configured_key = entry.partition(':')
+        if not separator or not key_id.strip().isdigit() or not configured_key.strip():
+            raise ValueError('Keyring entries must use the form "<key id>:<key>"')
+        parsed_id = int(key_id)
+        if not 0 < parsed_id <= 255:
+            raise ValueError('Keyring key ids must be between 1 and 255')
+        keys[parsed_id] = _decode_key(configured_key.strip())
+    return keys
+
+
+class Keyring:
+    """Ready-to-use AES-GCM ciphers indexed by the key id embedded in each ciphertext."""
+
+    def __init__(self, keys: dict[int, bytes], active_key_id: int) -> None:
+        if active_key_id not in keys:
+            raise ValueError(f'Active habits encryption key id {active_key_id} is not configured')
+        self._ciphers = {key_id: AESGCM(key) for key_id, key in keys.items()}
+        self.active_key_id = active_key_id
+
+    @property
+    def key_ids(self) -> tuple[int, ...]:
+        return tuple(sorted(self._ciphers))
+
+    def encrypt(self, plaintext: bytes, prefix: bytes = KEYED_CIPHERTEXT_MAGIC) -> bytes:
+        header = prefix + bytes([self.active_key_id])
+        nonce = token_bytes(NONCE_SIZE)
+        return header + nonce + self._ciphers[self.active_key_id].encrypt(nonce, plaintext, header)
+
+    def decrypt_with_header(self, value: bytes, header_size: int) -> bytes:
+        """Decrypt a ciphertext whose ``header_size``-byte header ends with the key id."""
+        cipher = self._ciphers.get(value[header_size - 1])
+        if cipher is None:
+            raise ValueError(f'Habits encryption key id {value[header_size - 1]} is not configured')
+        return cipher.decrypt(
+            value[header_size:header_size + NONCE_SIZE],
+            value[header_size + NONCE_SIZE:],
+            value[:header_size],
+        )
+
+    def decrypt(self, value: bytes) -> bytes:
+        if value[: len(KEYED_CIPHERTEXT_MAGIC)] == KEYED_CIPHERTEXT_MAGIC and len(value) > _HEADER_SIZE:
+            key_id = self.key_id_of(value)
+            if key_id in self._ciphers:
+                try:
+                    return self.decrypt_with_header(value, _HEADER_SIZE)
+                except InvalidTag:
+                    # A legacy nonce can start with the marker bytes by chance; fall through.
+                    pass
+            else:
+                # Same chance here; only a value that is not legacy either names a missing key.
+                try:
+                    return self._decrypt_legacy(value)
+                except InvalidTag:
+                    raise ValueError(f'Habits encryption key id {key_id} is not configured') from None
+        return self._decrypt_legacy(value)
+
+    def _decrypt_legacy(self, value: bytes) -> bytes:
+        return self._ciphers[LEGACY_KEY_ID].decrypt(value[:NONCE_SIZE], value[NONCE_SIZE:], None)
+
+    def key_id_of(self, value: bytes) -> int:
+        if value[: len(KEYED_CIPHERTEXT_MAGIC)] == KEYED_CIPHERTEXT_MAGIC and len(value) > _HEADER_SIZE:
+            return value[_HEADER_SIZE - 1]
+        return LEGACY_KEY_ID
+
+    def needs_rotation(self, value: bytes) -> bool:
+        return bool(value) and self.key_id_of(value) != self.active_key_id
+
+    def rewrap(self, value: bytes) -> bytes:
+        return self.encrypt(self.decrypt(value))
+
+
+@lru_cache(maxsize=1)
+def get_keyring() -> Keyring:
+    settings = get_settings()
+    keys = {LEGACY_KEY_ID: _build_key_bytes()}
+    keys.update(_parse_keyring_entries(settings.habits_encryption_keyring))
+    return Keyring(keys, settings.habits_encryption_active_key_id)
+
+
 def encrypt_number(value: float) -> bytes:
-    plaintext = f'{value:.8f}'.encode('utf-8')
-    nonce = token_bytes(12)
-    ciphertext = AESGCM(_build_key_bytes()).encrypt(nonce, plaintext, None)
-    return nonce + ciphertext
+    return get_keyring().encrypt(f'{value:.8f}'.encode('utf-8'))
 
 
 def decrypt_number(value: bytes) -> float:
-    nonce = value[:12]
-    ciphertext = value[12:]
-    plaintext = AESGCM(_build_key_bytes()).decrypt(nonce, ciphertext, None)
-    return float(plaintext.decode('utf-8'))
+    return float(get_keyring().decrypt(value))
+
+
+def seal_record(values: Sequence[float | None]) -> bytes:
+    plaintext = b''.join(_SEALED_VALUE.pack(math.nan if value is None else float(value)) for value in values)
+    return get_keyring().encrypt(plaintext, SEALED_RECORD_MAGIC + bytes([SEALED_RECORD_VERSION]))
+
+
+def _sealed_record_plaintext(value: bytes) -> bytes:
+    if value[: len(SEALED_RECORD_MAGIC)] != SEALED_RECORD_MAGIC or len(value) <= _SEALED_HEADER_SIZE + NONCE_SIZE:
+        raise ValueError('Value is not a sealed habits record')
+    version = value[len(SEALED_RECORD_MAGIC)]
+    if version != SEALED_RECORD_VERSION:
+        raise ValueError(f'Unsupported sealed habits record version {version}')
+    return get_keyring().decrypt_with_header(value, _SEALED_HEADER_SIZE)
+
+
+def unseal_record(value: bytes) -> tuple[float | None, ...]:
+    return tuple(
+        None if math.isnan(number) else number
+        for (number,) in _SEALED_VALUE.iter_unpack(_sealed_record_plaintext(value))
+    )
+
+
+def sealed_record_key_id(value: bytes) -> int:
+    return value[_SEALED_HEADER_SIZE - 1]
+
+
+def rewrap_sealed_record(value: bytes) -> bytes:
+    return get_keyring().encrypt(_sealed_record_plaintext(value), value[: _SEALED_HEADER_SIZE - 1])
@@ -1,19 +1,41 @@
 import logging
 import math
+import time
+from collections.abc import Iterable, Mapping
 from dataclasses import dataclass
-from datetime import datetime, timezone
-from pathlib import Path
-from threading import Lock
+from datetime import date, datetime, timedelta, timezone
+from hashlib import sha256
 
-import joblib
-import pandas as pd
-from sqlalchemy import delete, func, select
+import numpy as np
+from sqlalchemy import and_, bindparam, delete, func, insert, or_, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
-from .models import HabitsAssessment, HabitsCorrelation, HabitsNormalizedExport, HabitsRecommendation
+from .analytics_snapshot import AnalyticsSnapshot, open_analytics_snapshot, refresh_analytics_snapshot
+from .config import get_settings
+from .habits_storage import NORMALIZATION_RANGES, AssessmentColumns, load_assessment_columns, normalize_column
+from .jobs import enqueue_job, register_job_handler
+from .models import (
+    BackgroundJob,
+    HabitsAssessment,
+    HabitsCorrelation,
+    HabitsCorrelationAccumulator,
+    HabitsCorrelationSnapshot,
+    HabitsDailyAccumulator,
+    HabitsNormalizedExport,
+    HabitsSegmentAccumulator,
+    HabitsRecommendation,
+    PipelineWatermark,
+    User,
+)
+from .productivity_model import (
+    current_model_version,
+    predict_productivity_score,
+    productivity_scores_for_columns,
+)
+from .recommendation_rules import DEFAULT_PRIORITY, RuleSet, load_recommendation_rules
 
 logger = logging.getLogger(__name__)
-MODEL_PATH = Path(__file__).resolve().parents[1] / 'artifacts' / 'productivity_detection_model.pkl'
 
 METRIC_NAMES = [
     'study_hours',
@@ -29,22 +51,33 @@ METRIC_NAMES = [
     'attendance_percentage',
     'assignments_completed_per_week',
 ]
+PERFORMANCE_METRICS = ('predicted_productivity_score', 'final_grade', 'assignments_completed_per_week')
+CORRELATION_PAIRS = [
+    (metric_name, performance_metric)
+    for performance_metric in PERFORMANCE_METRICS
+    for metric_name in METRIC_NAMES
+]
+RECOMPUTE_CORRELATIONS_JOB = 'habits.recompute_correlations'
+CORRELATION_BATCH_JOB = 'habits.correlation_batch'
+# Handled in ``recommendation_refresh``; queued whenever a new correlation snapshot is published.
+RECOMMENDATION_REFRESH_JOB = 'habits.refresh_recommendations'
+NORMALIZED_EXPORT_JOB = 'habits.normalized_export'
+NORMALIZED_EXPORT_WATERMARK = 'habits_normalized_exports'
+NORMALIZED_EXPORT_CHUNK_SIZE = 2000
+# Older snapshots kept so readers that pinned one just before a publish can finish.
+SNAPSHOT_RETENTION = 3
+POPULATION_SEGMENT = 'all'
+SEGMENT_TYPES = ('course', 'year_level', 'career')
+PEARSON = 'pearson'
+SPEARMAN = 'spearman'
+# Partial correlation of a habit with a performance metric, controlling for study hours.
+PARTIAL_STUDY_HOURS = 'partial_study_hours'
+CORRELATION_METHODS = (PEARSON, SPEARMAN, PARTIAL_STUDY_HOURS)
+PARTIAL_CONTROL_METRIC = 'study_hours'
+ALL_TIME_WINDOW = 'all'
+DECAYED_WINDOW = 'decayed'
+SUM_FIELDS = ('sample_size', 'sum_x', 'sum_y', 'sum_x_squared', 'sum_y_squared', 'sum_xy')
 NEGATIVE_METRICS = {'phone_usage_hours', 'social_media_hours', 'gaming_hours', 'stress_level'}
-NORMALIZATION_RANGES = {
-    'study_hours': (0.0, 12.0),
-    'sleep_hours': (0.0, 12.0),
-    'phone_usage_hours': (0.0, 12.0),
-    'social_media_hours': (0.0, 10.0),
-    'gaming_hours': (0.0, 10.0),
-    'breaks_per_day': (0.0, 20.0),
-    'coffee_intake': (0.0, 10.0),
-    'exercise_minutes': (0.0, 180.0),
-    'stress_level': (1.0, 10.0),
-    'focus_score': (0.0, 100.0),
-    'attendance_percentage': (0.0, 100.0),
-    'assignments_completed_per_week': (0.0, 20.0),
-    'final_grade': (0.0, 100.0),
-}
 
 
 @dataclass
@@ -59,7 +92,53 @@ class CorrelationStat:
     p_value: float
 
 
+@dataclass
+class CorrelationSums:
+    sample_size: np.ndarray
+    sum_x: np.ndarray
+    sum_y: np.ndarray
+    sum_x_squared: np.ndarray
+    sum_y_squared: np.ndarray
+    sum_xy: np.ndarray
+
+
+@dataclass
+class CorrelationMatrix:
+    correlation_coefficient: np.ndarray
+    sample_size: np.ndarray
+    confidence_interval_low: np.ndarray
+    confidence_interval_high: np.ndarray
+    p_value: np.ndarray
+    confidence_level: float
+
+    def stat(
+        self,
+        index: int | tuple[int, ...],
+        metric_name: str = '',
+        performance_metric: str = '',
+    ) -> CorrelationStat | None:
+        r = float(self.correlation_coefficient[index])
+        if math.isnan(r):
+            return None
+        return CorrelationStat(
+            metric_name=metric_name,
+            performance_metric=performance_metric,
+            correlation_coefficient=r,
+            sample_size=int(self.sample_size[index]),
+            confidence_interval_low=float(self.confidence_interval_low[index]),
+            confidence_interval_high=float(self.confidence_interval_high[index]),
+            confidence_level=self.confidence_level,
+            p_value=float(self.p_value[index]),
+        )
+
+
+_erfc = np.vectorize(math.erfc, otypes=[np.float64])
+
+
 class PearsonCorrelationCalculator:
+    # Relative tolerance below which a centred sum of squares is treated as zero variance.
+    VARIANCE_TOLERANCE = 1e-12
+
     @staticmethod
     def _mean(values: list[float]) -> float:
         return sum(values) / len(values)
@@ -85,8 +164,114 @@ class PearsonCorrelationCalculator:
 
         covariance = sum((xv - x_mean) * (yv - y_mean) for xv, yv in zip(x, y, strict=True)) / (len(x) - 1)
         r = max(min(covariance / (x_std * y_std), 1.0), -1.0)
-        n = len(x)
+        return self._from_coefficient(r, len(x), confidence_level)
+
+    @staticmethod
+    def matrix_sums(x: np.ndarray, y: np.ndarray) -> CorrelationSums:
+        """Pairwise-complete sufficient statistics for every column of ``x`` against every column of ``y``.
+
+        ``x`` is rows x metrics and ``y`` is rows x performance metrics; NaN marks a missing value and
+        drops the row only for the pairs that involve that column.
+        """
+        x_present = ~np.isnan(x)
+        y_present = ~np.isnan(y)
+        x_values = np.where(x_present, x, 0.0)
+        y_values = np.where(y_present, y, 0.0)
+        x_weights = x_present.astype(np.float64)
+        y_weights = y_present.astype(np.float64)
+        return CorrelationSums(
+            sample_size=x_weights.T @ y_weights,
+            sum_x=x_values.T @ y_weights,
+            sum_y=x_weights.T @ y_values,
+            sum_x_squared=(x_values * x_values).T @ y_weights,
+            sum_y_squared=x_weights.T @ (y_values * y_values),
+            sum_xy=x_values.T @ y_values,
+        )
+
+    @staticmethod
+    def grouped_matrix_sums(x: np.ndarray, y: np.ndarray, groups: np.ndarray, group_count: int) -> CorrelationSums:
+        """``matrix_sums`` for every group in one pass; arrays are shaped group x metric x performance metric.
+
+        ``groups`` holds each row's group index in ``range(group_count)``. Rows are sorted by group once
+        and every statistic is a single ``np.add.reduceat`` over the per-row products.
+        """
+        order = np.argsort(groups, kind='stable')
+        sorted_groups = groups[order]
+        starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]]) if len(groups) else []
+        present_groups = sorted_groups[starts]
+        x_present = ~np.isnan(x[order])
+        y_present = ~np.isnan(y[order])
+        x_values = np.where(x_present, x[order], 0.0)
+        y_values = np.where(y_present, y[order], 0.0)
+        x_weights = x_present.astype(np.float64)
+        y_weights = y_present.astype(np.float64)
+
+        def _grouped(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+            totals = np.zeros((group_count, x.shape[1], y.shape[1]))
+            if len(starts):
+                totals[present_groups] = np.add.reduceat(left[:, :, None] * right[:, None, :], starts, axis=0)
+            return totals
+
+        return CorrelationSums(
+            sample_size=_grouped(x_weights, y_weights),
+            sum_x=_grouped(x_values, y_weights),
+            sum_y=_grouped(x_weights, y_values),
+            sum_x_squared=_grouped(x_values * x_values, y_weights),
+            sum_y_squared=_grouped(x_weights, y_values * y_values),
+            sum_xy=_grouped(x_values, y_values),
+        )
+
+    def calculate_from_sums(self, sums: CorrelationSums, confidence_level: float = 95.0) -> CorrelationMatrix:
+        n = np.asarray(sums.sample_size, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            safe_n = np.where(n > 0, n, 1.0)
+            centred_xx = sums.sum_x_squared - sums.sum_x * sums.sum_x / safe_n
+            centred_yy = sums.sum_y_squared - sums.sum_y * sums.sum_y / safe_n
+            centred_xy = sums.sum_xy - sums.sum_x * sums.sum_y / safe_n
+            valid = (
+                (n >= 4)
+                & (centred_xx > self.VARIANCE_TOLERANCE * sums.sum_x_squared)
+                & (centred_yy > self.VARIANCE_TOLERANCE * sums.sum_y_squared)
+            )
+            r = np.where(valid, np.clip(centred_xy / np.sqrt(centred_xx * centred_yy), -1.0, 1.0), np.nan)
+        return self.coefficient_matrix(r, n, confidence_level)
+
+    @staticmethod
+    def coefficient_matrix(
+        r: np.ndarray,
+        n: np.ndarray,
+        confidence_level: float = 95.0,
+        controls: int = 0,
+    ) -> CorrelationMatrix:
+        """p-values and Fisher confidence intervals for coefficients; ``controls`` partialled-out variables."""
+        n = np.asarray(n, dtype=np.float64)
+        effective_n = n - controls
+        with np.errstate(divide='ignore', invalid='ignore'):
+            perfect = np.abs(r) == 1.0
+
+            t_stat = np.abs(r) * np.sqrt((effective_n - 2) / (1 - r**2))
+            # Same normal approximation as the scalar path: 2 * (1 - Phi(t)) == erfc(t / sqrt(2)).
+            p_value = np.where(perfect, 0.0, _erfc(t_stat / math.sqrt(2)))
+
+            z = np.arctanh(r)
+            z_delta = 1.96 / np.sqrt(effective_n - 3)
+            ci_low = np.where(perfect, r, np.tanh(z - z_delta))
+            ci_high = np.where(perfect, r, np.tanh(z + z_delta))
+
+        return CorrelationMatrix(
+            correlation_coefficient=r,
+            sample_size=n.astype(np.int64),
+            confidence_interval_low=ci_low,
+            confidence_interval_high=ci_high,
+            p_value=p_value,
+            confidence_level=confidence_level,
+        )
+
+    def calculate_matrix(self, x: np.ndarray, y: np.ndarray, confidence_level: float = 95.0) -> CorrelationMatrix:
+        return self.calculate_from_sums(self.matrix_sums(x, y), confidence_level)
 
+    @staticmethod
+    def _from_coefficient(r: float, n: int, confidence_level: float) -> CorrelationStat:
         if abs(r) == 1.0:
             p_value = 0.0
             ci_low = r
@@ -113,22 +298,109 @@ class PearsonCorrelationCalculator:
         )
 
 
-class CorrelationCache:
-    def __init__(self) -> None:
-        self._lock = Lock()
-        self._state: tuple[int, int] | None = None
+def average_ranks(values: np.ndarray) -> np.ndarray:
+    """1-based ranks of a 1-d array with ties sharing their average rank; NaN stays NaN."""
+    ranks = np.full(len(values), np.nan)
+    present = np.flatnonzero(~np.isnan(values))
+    order = present[np.argsort(values[present], kind='stable')]
+    sorted_values = values[order]
+    bounds = np.flatnonzero(np.r_[True, sorted_values[1:] != sorted_values[:-1], True])
+    ranks[order] = np.repeat((bounds[:-1] + bounds[1:] + 1) / 2.0, np.diff(bounds))
+    return ranks
 
-    def should_recompute(self, signature: tuple[int, int]) -> bool:
-        with self._lock:
-            if self._state == signature:
-                return False
-            self._state = signature
-            return True
 
+class SpearmanCorrelationCalculator:
+    """Spearman's rho as Pearson over average ranks, pairwise complete like the Pearson matrix mode.
 
-correlation_cache = CorrelationCache()
-_model_lock = Lock()
-_detection_model = None
+    Rankings depend on which rows are kept, so metric ranks are cached per distinct row subset and
+    shared by every pair ranked over that subset. Each performance metric ranks the metrics over the
+    rows where it is present; fully observed performance metrics all reuse that ranking. A metric
+    with missing values inside the subset is re-ranked, together with the performance metric, over
+    the rows where both are present.
+    """
+
+    def calculate_matrix(self, x: np.ndarray, y: np.ndarray, confidence_level: float = 95.0) -> CorrelationMatrix:
+        rank_cache: dict[bytes, dict[int, np.ndarray]] = {}
+        per_metric: list[CorrelationSums] = []
+        for performance_index in range(y.shape[1]):
+            rows = ~np.isnan(y[:, performance_index])
+            x_ranks = self._metric_ranks(rank_cache, x, rows, range(x.shape[1]))
+            y_ranks = average_ranks(y[rows, performance_index])[:, None]
+            sums = PearsonCorrelationCalculator.matrix_sums(x_ranks, y_ranks)
+            for metric_index in np.flatnonzero(np.isnan(x_ranks).any(axis=0)):
+                pair_rows = rows & ~np.isnan(x[:, metric_index])
+                pair = PearsonCorrelationCalculator.matrix_sums(
+                    self._metric_ranks(rank_cache, x, pair_rows, [metric_index]),
+                    average_ranks(y[pair_rows, performance_index])[:, None],
+                )
+                for field in SUM_FIELDS:
+                    getattr(sums, field)[metric_index] = getattr(pair, field)[0]
+            per_metric.append(sums)
+        sums = CorrelationSums(
+            **{
+                field: np.concatenate([getattr(item, field) for item in per_metric], axis=1)
+                for field in SUM_FIELDS
+            }
+        )
+        return PearsonCorrelationCalculator().calculate_from_sums(sums, confidence_level)
+
+    @staticmethod
+    def _metric_ranks(
+        cache: dict[bytes, dict[int, np.ndarray]],
+        x: np.ndarray,
+        rows: np.ndarray,
+        metric_indices: Iterable[int],
+    ) -> np.ndarray:
+        """Rows x metrics average ranks of ``x`` over ``rows``, ranking each column once per row subset."""
+        ranked = cache.setdefault(np.packbits(rows).tobytes(), {})
+        metric_indices = list(metric_indices)
+        for metric_index in metric_indices:
+            if metric_index not in ranked:
+                ranked[metric_index] = average_ranks(x[rows, metric_index])
+        ranks = np.column_stack([ranked[index] for index in metric_indices])
+        return ranks.reshape(int(rows.sum()), len(metric_indices))
+
+
+class PartialCorrelationCalculator:
+    """Correlation of every metric with every performance metric, controlling for one metric.
+
+    For each performance metric a single covariance matrix of all metrics plus that performance
+    metric is built over the complete rows. Every (metric, performance, control) 3x3 block is cut
+    from it and the whole stack is inverted in one batched call; the partial correlation is
+    ``-P[0, 1] / sqrt(P[0, 0] * P[1, 1])`` of each inverted block ``P``.
+    """
+
+    # Blocks whose determinant is this small relative to their diagonal are treated as singular.
+    SINGULAR_TOLERANCE = 1e-10
+
+    def calculate_matrix(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        control_index: int,
+        confidence_level: float = 95.0,
+    ) -> CorrelationMatrix:
+        metric_count = x.shape[1]
+        r = np.full((metric_count, y.shape[1]), np.nan)
+        n = np.zeros((metric_count, y.shape[1]))
+        others = np.array([index for index in range(metric_count) if index != control_index])
+        blocks_index = np.column_stack(
+            [others, np.full(len(others), metric_count), np.full(len(others), control_index)]
+        )
+        for performance_index in range(y.shape[1]):
+            rows = ~np.isnan(y[:, performance_index]) & ~np.isnan(x).any(axis=1)
+            if rows.sum() < 5:
+                continue
+            covariance = np.cov(np.column_stack([x[rows], y[rows, performance_index]]), rowvar=False)
+            blocks = covariance[blocks_index[:, :, None], blocks_index[:, None, :]]
+            scale = np.prod(np.diagonal(blocks, axis1=1, axis2=2), axis=1)
+            valid = np.linalg.det(blocks) > self.SINGULAR_TOLERANCE * np.maximum(scale, np.finfo(float).tiny)
+            if valid.any():
+                precision = np.linalg.inv(blocks[valid])
+                partial = -precision[:, 0, 1] / np.sqrt(precision[:, 0, 0] * precision[:, 1, 1])
+                r[others[valid], performance_index] = np.clip(partial, -1.0, 1.0)
+            n[:, performance_index] = rows.sum()
+        return PearsonCorrelationCalculator.coefficient_matrix(r, n, confidence_level, controls=1)
 
 
 def _normalize(metric_name: str, value: float | None) -> float:
@@ -145,291 +417,881 @@ def _extract_assessment_metric(assessment: HabitsAssessment, metric_name: str) -
     return getattr(assessment, metric_name)
 
 
-def _load_detection_model():
-    global _detection_model
-    with _model_lock:
-        if _detection_model is not None:
-            return _detection_model
-        if not MODEL_PATH.exists():
-            logger.warning('Productivity detection model not found at %s', MODEL_PATH)
-            return None
-        try:
-            _detection_model = joblib.load(MODEL_PATH)
-            return _detection_model
-        except Exception:
-            logger.exception('Failed to load productivity detection model at %s', MODEL_PATH)
-            return None
+def _write_normalized_exports(db: Session, payloads: list[dict[str, float | int]]) -> None:
+    """Upsert export rows with one ``INSERT ... ON CONFLICT(assessment_id) DO UPDATE`` statement."""
+    if not payloads:
+        return
+    statement = sqlite_insert(HabitsNormalizedExport.__table__)
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[HabitsNormalizedExport.assessment_id],
+            set_={name: statement.excluded[name] for name in ('user_id', *NORMALIZATION_RANGES)},
+        ),
+        payloads,
+    )
+
+
+def update_normalized_exports(db: Session, assessments: list[HabitsAssessment]) -> None:
+    _write_normalized_exports(
+        db,
+        [
+            {
+                'assessment_id': assessment.assessment_id,
+                'user_id': assessment.user_id,
+                **{
+                    metric_name: _normalize(metric_name, _extract_assessment_metric(assessment, metric_name))
+                    for metric_name in NORMALIZATION_RANGES
+                },
+            }
+            for assessment in assessments
+        ],
+    )
+
+
+def _write_normalized_export_columns(
+    db: Session,
+    assessment_ids: np.ndarray,
+    user_ids: np.ndarray,
+    normalized: dict[str, list[float]],
+) -> None:
+    _write_normalized_exports(
+        db,
+        [
+            {
+                'assessment_id': assessment_id,
+                'user_id': user_id,
+                **{metric_name: normalized[metric_name][index] for metric_name in NORMALIZATION_RANGES},
+            }
+            for index, (assessment_id, user_id) in enumerate(
+                zip(assessment_ids.tolist(), user_ids.tolist(), strict=True)
+            )
+        ],
+    )
 
 
-def _assessment_to_model_features(assessment: HabitsAssessment) -> pd.DataFrame:
-    # Fill missing features with neutral defaults so we can score existing assessment records.
-    # The training pipeline can handle unknown categories through OneHotEncoder(handle_unknown="ignore").
-    features = {
-        'age': 20,
-        'gender': 'Other',
-        'study_hours_per_day': float(assessment.study_hours),
-        'sleep_hours': float(assessment.sleep_hours),
-        'phone_usage_hours': float(assessment.phone_usage_hours),
-        'social_media_hours': float(assessment.social_media_hours),
-        'youtube_hours': 0.0,
-        'gaming_hours': float(assessment.gaming_hours),
-        'breaks_per_day': float(assessment.breaks_per_day),
-        'coffee_intake_mg': float(assessment.coffee_intake) * 95.0,
-        'exercise_minutes': float(assessment.exercise_minutes),
-        'assignments_completed': float(assessment.assignments_completed_per_week),
-        'attendance_percentage': float(assessment.attendance_percentage),
-        'stress_level': float(assessment.stress_level),
-        'focus_score': float(assessment.focus_score),
-        'final_grade': float(assessment.final_grade) if assessment.final_grade is not None else math.nan,
+def update_normalized_exports_from_columns(db: Session, columns: AssessmentColumns) -> None:
+    normalized = {
+        metric_name: normalize_column(metric_name, columns.values[metric_name]).tolist()
+        for metric_name in NORMALIZATION_RANGES
     }
-    return pd.DataFrame([features])
+    _write_normalized_export_columns(db, columns.assessment_ids, columns.user_ids, normalized)
 
 
-def predict_productivity_score(assessment: HabitsAssessment) -> float | None:
-    model = _load_detection_model()
-    if model is None:
-        return None
-    try:
-        features = _assessment_to_model_features(assessment)
-        prediction = model.predict(features)[0]
-        return float(prediction)
-    except Exception:
-        logger.exception('Failed to predict productivity score for assessment_id=%s', assessment.assessment_id)
-        return None
+def update_normalized_exports_from_snapshot(db: Session, snapshot: AnalyticsSnapshot, positions: np.ndarray) -> None:
+    """Export the snapshot rows at ``positions``; the snapshot keeps missing metrics as NaN, exports as 0."""
+    normalized = {
+        metric_name: np.nan_to_num(snapshot.columns[metric_name][positions], nan=0.0).tolist()
+        for metric_name in NORMALIZATION_RANGES
+    }
+    _write_normalized_export_columns(
+        db,
+        snapshot.columns['assessment_id'][positions],
+        snapshot.columns['user_id'][positions],
+        normalized,
+    )
 
 
-def update_normalized_exports(db: Session, assessments: list[HabitsAssessment]) -> None:
-    for assessment in assessments:
-        existing = db.scalar(
-            select(HabitsNormalizedExport).where(
-                HabitsNormalizedExport.assessment_id == assessment.assessment_id,
+def _pair_observations(
+    assessment: HabitsAssessment,
+    predicted_score: float | None,
+) -> list[tuple[str, str, float, float]]:
+    observations: list[tuple[str, str, float, float]] = []
+    for performance_metric in PERFORMANCE_METRICS:
+        if performance_metric == 'predicted_productivity_score':
+            y_val = predicted_score
+        else:
+            y_val = _extract_assessment_metric(assessment, performance_metric)
+        if y_val is None:
+            continue
+        for metric_name in METRIC_NAMES:
+            x_val = _extract_assessment_metric(assessment, metric_name)
+            if x_val is None:
+                continue
+            observations.append((metric_name, performance_metric, float(x_val), float(y_val)))
+    return observations
+
+
+def _segment_values(course: str | None, year_level: str | None, career_id: int | None) -> dict[str, str]:
+    segments = {'course': course, 'year_level': year_level, 'career': str(career_id) if career_id is not None else None}
+    return {segment_type: value for segment_type, value in segments.items() if value}
+
+
+def user_segments(user: User) -> dict[str, str]:
+    """The cohorts a user belongs to, keyed by segment type."""
+    return _segment_values(user.course, user.year_level, user.career_id)
+
+
+def _accumulated_sums(rows: list) -> CorrelationSums:
+    return CorrelationSums(
+        sample_size=np.array([row.sample_size for row in rows], dtype=np.float64),
+        sum_x=np.array([row.sum_x for row in rows], dtype=np.float64),
+        sum_y=np.array([row.sum_y for row in rows], dtype=np.float64),
+        sum_x_squared=np.array([row.sum_x_squared for row in rows], dtype=np.float64),
+        sum_y_squared=np.array([row.sum_y_squared for row in rows], dtype=np.float64),
+        sum_xy=np.array([row.sum_xy for row in rows], dtype=np.float64),
+    )
+
+
+def _grouped_payloads(sums: CorrelationSums, group_keys: list[dict], now: datetime) -> list[dict]:
+    """Accumulator rows for every non-empty (group, metric, performance metric) of grouped sums."""
+    payloads: list[dict] = []
+    for index in zip(*np.nonzero(sums.sample_size), strict=True):
+        group, metric_index, performance_index = index
+        payloads.append(
+            {
+                **group_keys[group],
+                'metric_name': METRIC_NAMES[metric_index],
+                'performance_metric': PERFORMANCE_METRICS[performance_index],
+                'sample_size': int(sums.sample_size[index]),
+                'sum_x': float(sums.sum_x[index]),
+                'sum_y': float(sums.sum_y[index]),
+                'sum_x_squared': float(sums.sum_x_squared[index]),
+                'sum_y_squared': float(sums.sum_y_squared[index]),
+                'sum_xy': float(sums.sum_xy[index]),
+                'updated_at': now,
+            }
+        )
+    return payloads
+
+
+def _rebuild_segment_accumulators(db: Session, user_ids: np.ndarray, x: np.ndarray, y: np.ndarray) -> None:
+    profiles = {
+        user_id: _segment_values(course, year_level, career_id)
+        for user_id, course, year_level, career_id in db.execute(
+            select(User.id, User.course, User.year_level, User.career_id)
+        )
+    }
+    now = datetime.now(timezone.utc)
+    payloads: list[dict] = []
+    for segment_type in SEGMENT_TYPES:
+        row_values = [profiles.get(user_id, {}).get(segment_type) for user_id in user_ids.tolist()]
+        in_segment = np.array([value is not None for value in row_values], dtype=bool)
+        if not in_segment.any():
+            continue
+        labels, groups = np.unique(
+            np.array([value for value in row_values if value is not None], dtype=object),
+            return_inverse=True,
+        )
+        sums = PearsonCorrelationCalculator.grouped_matrix_sums(x[in_segment], y[in_segment], groups, len(labels))
+        payloads.extend(
+            _grouped_payloads(
+                sums,
+                [{'segment_type': segment_type, 'segment_value': label} for label in labels],
+                now,
             )
         )
-        payload = {
-            'assessment_id': assessment.assessment_id,
-            'user_id': assessment.user_id,
-            'study_hours': _normalize('study_hours', assessment.study_hours),
-            'sleep_hours': _normalize('sleep_hours', assessment.sleep_hours),
-            'phone_usage_hours': _normalize('phone_usage_hours', assessment.phone_usage_hours),
-            'social_media_hours': _normalize('social_media_hours', assessment.social_media_hours),
-            'gaming_hours': _normalize('gaming_hours', assessment.gaming_hours),
-            'breaks_per_day': _normalize('breaks_per_day', assessment.breaks_per_day),
-            'coffee_intake': _normalize('coffee_intake', assessment.coffee_intake),
-            'exercise_minutes': _normalize('exercise_minutes', assessment.exercise_minutes),
-            'stress_level': _normalize('stress_level', assessment.stress_level),
-            'focus_score': _normalize('focus_score', assessment.focus_score),
-            'attendance_percentage': _normalize('attendance_percentage', assessment.attendance_percentage),
-            'assignments_completed_per_week': _normalize(
-                'assignments_completed_per_week',
-                assessment.assignments_completed_per_week,
-            ),
-            'final_grade': _normalize('final_grade', assessment.final_grade),
-        }
-        if existing is None:
-            db.add(HabitsNormalizedExport(**payload))
-        else:
-            for key, value in payload.items():
-                setattr(existing, key, value)
+    db.execute(delete(HabitsSegmentAccumulator))
+    if payloads:
+        db.execute(insert(HabitsSegmentAccumulator), payloads)
 
 
-def recompute_correlations(db: Session) -> list[HabitsCorrelation]:
-    assessments = list(db.scalars(select(HabitsAssessment)).all())
-    if len(assessments) < 4:
-        return []
+def _bucket_date(created_at: datetime) -> date:
+    # SQLite hands back naive datetimes that are already UTC.
+    return (created_at if created_at.tzinfo is None else created_at.astimezone(timezone.utc)).date()
+
+
+def _rebuild_daily_accumulators(db: Session, assessment_ids: np.ndarray, x: np.ndarray, y: np.ndarray) -> None:
+    payloads: list[dict] = []
+    if len(assessment_ids):
+        created = dict(
+            db.execute(
+                select(HabitsAssessment.assessment_id, HabitsAssessment.created_at).where(
+                    HabitsAssessment.assessment_id <= int(assessment_ids[-1])
+                )
+            ).all()
+        )
+        ordinals = np.array(
+            [_bucket_date(created[assessment_id]).toordinal() for assessment_id in assessment_ids.tolist()]
+        )
+        days, groups = np.unique(ordinals, return_inverse=True)
+        sums = PearsonCorrelationCalculator.grouped_matrix_sums(x, y, groups, len(days))
+        payloads = _grouped_payloads(
+            sums,
+            [{'bucket_date': date.fromordinal(int(day))} for day in days],
+            datetime.now(timezone.utc),
+        )
+    db.execute(delete(HabitsDailyAccumulator))
+    if payloads:
+        db.execute(insert(HabitsDailyAccumulator), payloads)
+
+
+def correlation_windows() -> list[str]:
+    """Every ``time_window`` a snapshot publishes: all-time, each rolling window, then decayed."""
+    return [ALL_TIME_WINDOW, *(f'{days}d' for days in get_settings().habits_correlation_window_days), DECAYED_WINDOW]
+
+
+def window_correlation_sums(db: Session, today: date) -> tuple[list[str], CorrelationSums | None]:
+    """Rolling-window and decayed sums (window x metric x performance metric) from the daily buckets.
+
+    Buckets are laid out in date order and prefix-summed once, so each rolling window is the
+    difference of two prefix rows: sliding a window adds the buckets that entered it and subtracts
+    the ones that left, without reading any assessment. The decayed sums weight each bucket by
+    ``0.5 ** (age_days / half_life)``; their sample size is the summed weight.
+    """
+    rows = db.execute(
+        select(
+            HabitsDailyAccumulator.bucket_date,
+            HabitsDailyAccumulator.metric_name,
+            HabitsDailyAccumulator.performance_metric,
+            *(getattr(HabitsDailyAccumulator, field) for field in SUM_FIELDS),
+        )
+    ).all()
+    if not rows:
+        return [], None
+    settings = get_settings()
+    day_ordinals = np.unique([row[0].toordinal() for row in rows])
+    stats = np.zeros((len(SUM_FIELDS), len(day_ordinals), len(METRIC_NAMES), len(PERFORMANCE_METRICS)))
+    metric_index = {name: index for index, name in enumerate(METRIC_NAMES)}
+    performance_index = {name: index for index, name in enumerate(PERFORMANCE_METRICS)}
+    for bucket_date, metric_name, performance_metric, *values in rows:
+        if metric_name not in metric_index or performance_metric not in performance_index:
+            continue
+        day = np.searchsorted(day_ordinals, bucket_date.toordinal())
+        stats[:, day, metric_index[metric_name], performance_index[performance_metric]] = values
+
+    prefix = np.concatenate([np.zeros_like(stats[:, :1]), np.cumsum(stats, axis=1)], axis=1)
+    end = np.searchsorted(day_ordinals, today.toordinal(), side='right')
+    windows = [
+        prefix[:, end] - prefix[:, np.searchsorted(day_ordinals, today.toordinal() - days + 1)]
+        for days in settings.habits_correlation_window_days
+    ]
+    ages = today.toordinal() - day_ordinals
+    # Buckets dated after ``today`` (clock skew) count in no window.
+    weights = np.where(ages >= 0, 0.5 ** (np.maximum(ages, 0) / settings.habits_correlation_half_life_days), 0.0)
+    windows.append(np.tensordot(stats, weights, axes=([1], [0])))
+
+    stacked = np.stack(windows, axis=1)
+    return correlation_windows()[1:], CorrelationSums(**dict(zip(SUM_FIELDS, stacked, strict=True)))
+
+
+def _load_accumulators(db: Session) -> dict[tuple[str, str], HabitsCorrelationAccumulator]:
+    return {
+        (row.metric_name, row.performance_metric): row
+        for row in db.scalars(select(HabitsCorrelationAccumulator)).all()
+    }
+
+
+def _correlation_inputs(db: Session) -> tuple[AssessmentColumns, np.ndarray, np.ndarray]:
+    """Raw metric (rows x METRIC_NAMES) and performance (rows x PERFORMANCE_METRICS) matrices."""
+    columns = load_assessment_columns(db)
+    x = columns.matrix(METRIC_NAMES)
+    y = np.column_stack(
+        [
+            productivity_scores_for_columns(db, columns)
+            if performance_metric == 'predicted_productivity_score'
+            else columns.values[performance_metric]
+            for performance_metric in PERFORMANCE_METRICS
+        ]
+    ).reshape(len(columns), len(PERFORMANCE_METRICS))
+    return columns, x, y
+
+
+def rank_correlation_matrices(x: np.ndarray, y: np.ndarray) -> dict[str, CorrelationMatrix]:
+    """Spearman and study-hours partial correlations; both need the raw rows, not running sums."""
+    return {
+        SPEARMAN: SpearmanCorrelationCalculator().calculate_matrix(x, y),
+        PARTIAL_STUDY_HOURS: PartialCorrelationCalculator().calculate_matrix(
+            x, y, METRIC_NAMES.index(PARTIAL_CONTROL_METRIC)
+        ),
+    }
+
 
-    last_created = max(assessment.created_at for assessment in assessments)
-    signature = (len(assessments), int(last_created.timestamp()))
-    if not correlation_cache.should_recompute(signature):
-        return list(db.scalars(select(HabitsCorrelation)).all())
-
-    predicted_productivity: dict[int, float] = {}
-    for assessment in assessments:
-        score = predict_productivity_score(assessment)
-        if score is not None:
-            predicted_productivity[assessment.assessment_id] = score
-
-    performance_rows = [
-        assessment
-        for assessment in assessments
-        if (
-            assessment.final_grade is not None
-            or assessment.assignments_completed_per_week is not None
-            or assessment.assessment_id in predicted_productivity
+def _write_accumulators(db: Session, columns: AssessmentColumns, x: np.ndarray, y: np.ndarray) -> None:
+    sums = PearsonCorrelationCalculator.matrix_sums(x, y)
+    existing = _load_accumulators(db)
+    for metric_index, metric_name in enumerate(METRIC_NAMES):
+        for performance_index, performance_metric in enumerate(PERFORMANCE_METRICS):
+            index = (metric_index, performance_index)
+            accumulator = existing.get((metric_name, performance_metric))
+            if accumulator is None:
+                accumulator = HabitsCorrelationAccumulator(
+                    metric_name=metric_name,
+                    performance_metric=performance_metric,
+                )
+                db.add(accumulator)
+            accumulator.sample_size = int(sums.sample_size[index])
+            accumulator.sum_x = float(sums.sum_x[index])
+            accumulator.sum_y = float(sums.sum_y[index])
+            accumulator.sum_x_squared = float(sums.sum_x_squared[index])
+            accumulator.sum_y_squared = float(sums.sum_y_squared[index])
+            accumulator.sum_xy = float(sums.sum_xy[index])
+            accumulator.updated_at = datetime.now(timezone.utc)
+
+    _rebuild_segment_accumulators(db, columns.user_ids, x, y)
+    _rebuild_daily_accumulators(db, columns.assessment_ids, x, y)
+
+
+def rebuild_correlation_accumulators(db: Session) -> int:
+    """Recompute the population and cohort accumulators from the raw rows and overwrite the stored sums."""
+    columns, x, y = _correlation_inputs(db)
+    _write_accumulators(db, columns, x, y)
+    db.commit()
+    logger.info('Rebuilt correlation accumulators from %s assessments', len(columns))
+    return len(columns)
+
+
+@dataclass(frozen=True)
+class ExportReport:
+    rows: int
+    chunks: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+def export_normalized_assessments(
+    db: Session,
+    *,
+    chunk_size: int = NORMALIZED_EXPORT_CHUNK_SIZE,
+    full: bool = False,
+    settle_seconds: float | None = None,
+) -> ExportReport:
+    """Refresh normalized exports for assessments created or updated since the last run.
+
+    The analytics snapshot is refreshed first, so changed assessments are decrypted once into it, and
+    chunks read their values from its memory-mapped columns. Assessments are walked in
+    ``(updated_at, assessment_id)`` order from the stored watermark; each chunk is upserted with a single
+    statement and committed together with the advanced watermark, so an interrupted run resumes after the
+    last committed chunk. ``full`` ignores the watermark and re-exports every assessment. Rows the
+    snapshot does not hold yet are decrypted directly.
+
+    Rows updated within the last ``settle_seconds`` (``habits_export_settle_seconds`` by default) are
+    left for the next run. ``updated_at`` is stamped before the writing transaction commits, so a
+    watermark that ran up to the newest row could pass a slower submit that commits later with an
+    earlier timestamp and skip it for good.
+    """
+    started = time.perf_counter()
+    if settle_seconds is None:
+        settle_seconds = get_settings().habits_export_settle_seconds
+    settled_before = datetime.now(timezone.utc) - timedelta(seconds=settle_seconds)
+    refresh_analytics_snapshot(db, settled_before=settled_before)
+    snapshot = open_analytics_snapshot()
+    table = HabitsAssessment.__table__
+    watermark = db.get(PipelineWatermark, NORMALIZED_EXPORT_WATERMARK)
+    if watermark is None:
+        watermark = PipelineWatermark(name=NORMALIZED_EXPORT_WATERMARK, last_assessment_id=0, rows_processed=0)
+        db.add(watermark)
+    last_updated_at = None if full else watermark.last_updated_at
+    last_assessment_id = 0 if full else watermark.last_assessment_id
+
+    rows = chunks = 0
+    while True:
+        query = select(table.c.assessment_id, table.c.updated_at).where(table.c.updated_at <= settled_before)
+        if last_updated_at is not None:
+            query = query.where(
+                or_(
+                    table.c.updated_at > last_updated_at,
+                    and_(table.c.updated_at == last_updated_at, table.c.assessment_id > last_assessment_id),
+                )
+            )
+        keys = db.execute(
+            query.order_by(table.c.updated_at.asc(), table.c.assessment_id.asc()).limit(chunk_size)
+        ).all()
+        if not keys:
+            break
+        assessment_ids = np.array([assessment_id for assessment_id, _ in keys], dtype=np.int64)
+        positions = snapshot.positions(assessment_ids)
+        in_snapshot = positions >= 0
+        if in_snapshot.any():
+            update_normalized_exports_from_snapshot(db, snapshot, positions[in_snapshot])
+        if not in_snapshot.all():
+            # Committed after the snapshot refresh read its watermark range.
+            logger.info('habits.normalized_export.snapshot_miss rows=%s', int((~in_snapshot).sum()))
+            columns = load_assessment_columns(
+                db,
+                NORMALIZATION_RANGES,
+                assessment_ids=assessment_ids[~in_snapshot].tolist(),
+                chunk_size=chunk_size,
+            )
+            update_normalized_exports_from_columns(db, columns)
+        last_assessment_id, last_updated_at = keys[-1]
+        watermark.last_updated_at = last_updated_at
+        watermark.last_assessment_id = last_assessment_id
+        watermark.rows_processed += len(keys)
+        db.commit()
+        rows += len(keys)
+        chunks += 1
+    db.commit()
+
+    report = ExportReport(rows=rows, chunks=chunks, seconds=time.perf_counter() - started)
+    logger.info(
+        'habits.normalized_export.finished rows=%s chunks=%s seconds=%.3f rows_per_second=%.1f full=%s',
+        report.rows,
+        report.chunks,
+        report.seconds,
+        report.rows_per_second,
+        full,
+    )
+    return report
+
+
+def _assessment_productivity_score(db: Session, assessment: HabitsAssessment) -> float | None:
+    version = assessment.productivity_model_version
+    if version is not None and version == current_model_version():
+        return assessment.productivity_score
+    user = db.get(User, assessment.user_id)
+    return predict_productivity_score(assessment, user) if user is not None else None
+
+
+def _increment_accumulators(
+    db: Session,
+    model: type,
+    keys: list[dict],
+    observations: list[tuple[str, str, float, float]],
+) -> None:
+    """Add one observation per pair to the accumulator row of every key, creating missing rows."""
+    table = model.__table__
+    statement = sqlite_insert(table)
+    now = datetime.now(timezone.utc)
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[*keys[0], 'metric_name', 'performance_metric'],
+            set_={
+                'sample_size': table.c.sample_size + statement.excluded.sample_size,
+                'sum_x': table.c.sum_x + statement.excluded.sum_x,
+                'sum_y': table.c.sum_y + statement.excluded.sum_y,
+                'sum_x_squared': table.c.sum_x_squared + statement.excluded.sum_x_squared,
+                'sum_y_squared': table.c.sum_y_squared + statement.excluded.sum_y_squared,
+                'sum_xy': table.c.sum_xy + statement.excluded.sum_xy,
+                'updated_at': statement.excluded.updated_at,
+            },
+        ),
+        [
+            {
+                **key,
+                'metric_name': metric_name,
+                'performance_metric': performance_metric,
+                'sample_size': 1,
+                'sum_x': x_val,
+                'sum_y': y_val,
+                'sum_x_squared': x_val * x_val,
+                'sum_y_squared': y_val * y_val,
+                'sum_xy': x_val * y_val,
+                'updated_at': now,
+            }
+            for key in keys
+            for metric_name, performance_metric, x_val, y_val in observations
+        ],
+    )
+
+
+def _record_segment_statistics(db: Session, user_id: int, observations: list[tuple[str, str, float, float]]) -> None:
+    user = db.get(User, user_id)
+    segments = user_segments(user) if user is not None else {}
+    if segments:
+        _increment_accumulators(
+            db,
+            HabitsSegmentAccumulator,
+            [{'segment_type': segment_type, 'segment_value': value} for segment_type, value in segments.items()],
+            observations,
+        )
+
+
+def record_assessment_statistics(db: Session, assessment: HabitsAssessment) -> None:
+    """Fold a newly stored assessment into the accumulators without scanning existing rows.
+
+    The assessment counts towards the cohorts its owner belongs to now; a later profile change leaves
+    its contribution in the old cohorts until the scheduled rebuild.
+    """
+    accumulator_count = db.scalar(select(func.count()).select_from(HabitsCorrelationAccumulator)) or 0
+    has_segments = db.scalar(select(HabitsSegmentAccumulator.id).limit(1)) is not None
+    has_buckets = db.scalar(select(HabitsDailyAccumulator.id).limit(1)) is not None
+    if accumulator_count < len(CORRELATION_PAIRS) or not has_segments or not has_buckets:
+        # First run against a populated database: seed the accumulators from the raw rows.
+        rebuild_correlation_accumulators(db)
+        return
+
+    observations = _pair_observations(assessment, _assessment_productivity_score(db, assessment))
+    if observations:
+        table = HabitsCorrelationAccumulator.__table__
+        db.execute(
+            update(table)
+            .where(
+                table.c.metric_name == bindparam('b_metric_name'),
+                table.c.performance_metric == bindparam('b_performance_metric'),
+            )
+            .values(
+                sample_size=table.c.sample_size + 1,
+                sum_x=table.c.sum_x + bindparam('b_x'),
+                sum_y=table.c.sum_y + bindparam('b_y'),
+                sum_x_squared=table.c.sum_x_squared + bindparam('b_x_squared'),
+                sum_y_squared=table.c.sum_y_squared + bindparam('b_y_squared'),
+                sum_xy=table.c.sum_xy + bindparam('b_xy'),
+                updated_at=bindparam('b_updated_at'),
+            ),
+            [
+                {
+                    'b_metric_name': metric_name,
+                    'b_performance_metric': performance_metric,
+                    'b_x': x_val,
+                    'b_y': y_val,
+                    'b_x_squared': x_val * x_val,
+                    'b_y_squared': y_val * y_val,
+                    'b_xy': x_val * y_val,
+                    'b_updated_at': datetime.now(timezone.utc),
+                }
+                for metric_name, performance_metric, x_val, y_val in observations
+            ],
+        )
+        _record_segment_statistics(db, assessment.user_id, observations)
+        _increment_accumulators(
+            db,
+            HabitsDailyAccumulator,
+            [{'bucket_date': _bucket_date(assessment.created_at)}],
+            observations,
         )
+
+    update_normalized_exports(db, [assessment])
+    db.commit()
+
+
+def _correlation_source_signature(db: Session, today: date) -> tuple[int, str]:
+    assessment_count = db.scalar(select(func.count(HabitsAssessment.assessment_id))) or 0
+    last_changes = [
+        db.scalar(select(func.max(HabitsCorrelationAccumulator.updated_at))),
+        db.scalar(select(func.max(HabitsSegmentAccumulator.updated_at))),
+        db.scalar(select(func.max(HabitsDailyAccumulator.updated_at))),
     ]
-    if len(performance_rows) < 4:
+    changes = ':'.join(change.isoformat() if change else '-' for change in last_changes)
+    # Rolling windows move with the calendar even when no assessment arrives.
+    source = f'{assessment_count}:{changes}:{today.isoformat()}'
+    # Hashed so the stored value has a fixed length that fits the column on every backend.
+    return assessment_count, sha256(source.encode('utf-8')).hexdigest()
+
+
+def latest_snapshot_id_subquery():
+    return select(func.max(HabitsCorrelationSnapshot.id)).scalar_subquery()
+
+
+def latest_correlations_query(
+    segment_type: str = POPULATION_SEGMENT,
+    segment_value: str = '',
+    method: str = PEARSON,
+    time_window: str = ALL_TIME_WINDOW,
+):
+    """Correlations of the newest committed snapshot for one segment, method and window, in a single statement.
+
+    Before the first snapshot exists the subquery is NULL and matches the pre-snapshot rows.
+    """
+    return select(HabitsCorrelation).where(
+        HabitsCorrelation.snapshot_id.is_not_distinct_from(latest_snapshot_id_subquery()),
+        HabitsCorrelation.segment_type == segment_type,
+        HabitsCorrelation.segment_value == segment_value,
+        HabitsCorrelation.method == method,
+        HabitsCorrelation.time_window == time_window,
+    )
+
+
+def latest_correlations(db: Session) -> list[HabitsCorrelation]:
+    return list(db.scalars(latest_correlations_query()).all())
+
+
+def cohort_correlations(db: Session, user: User, segment_type: str = 'course') -> list[HabitsCorrelation]:
+    """Population correlations, replaced pair by pair with the user's cohort where the cohort has enough data."""
+    by_pair = {(row.metric_name, row.performance_metric): row for row in latest_correlations(db)}
+    segment_value = user_segments(user).get(segment_type)
+    if segment_value is not None:
+        for row in db.scalars(latest_correlations_query(segment_type, segment_value)).all():
+            by_pair[(row.metric_name, row.performance_metric)] = row
+    return list(by_pair.values())
+
+
+def _prune_snapshots(db: Session, newest_id: int) -> None:
+    cutoff = newest_id - SNAPSHOT_RETENTION
+    if cutoff <= 0:
+        db.execute(delete(HabitsCorrelation).where(HabitsCorrelation.snapshot_id.is_(None)))
+        return
+    db.execute(
+        delete(HabitsCorrelation).where(
+            (HabitsCorrelation.snapshot_id <= cutoff) | HabitsCorrelation.snapshot_id.is_(None)
+        )
+    )
+    db.execute(delete(HabitsCorrelationSnapshot).where(HabitsCorrelationSnapshot.id <= cutoff))
+
+
+def recompute_correlations(
+    db: Session,
+    *,
+    force: bool = False,
+    rank_matrices: dict[str, CorrelationMatrix] | None = None,
+) -> list[HabitsCorrelation]:
+    """Write a new correlation snapshot unless the latest one was built from the same inputs.
+
+    Returns the population all-time Pearson correlations of the latest snapshot; cohort and
+    rolling-window rows are stored alongside them. Pearson comes from the accumulators (windows
+    from the daily buckets, see ``window_correlation_sums``); the Spearman and partial rows in
+    ``rank_matrices`` need a pass over the raw rows, so only the scheduled batch computes them and
+    incremental recomputes carry the previous snapshot's rows forward.
+
+    The decision is made against the snapshot table, so any worker that already published a
+    snapshot for the current accumulator state saves every other worker the recompute. Rows are
+    inserted under a new snapshot id and become visible to readers in one commit; older
+    snapshots stay intact until pruned.
+    """
+    today = datetime.now(timezone.utc).date()
+    assessment_count, signature = _correlation_source_signature(db, today)
+    if assessment_count < 4:
         return []
 
-    db.execute(delete(HabitsCorrelation))
+    latest = db.scalar(select(HabitsCorrelationSnapshot).order_by(HabitsCorrelationSnapshot.id.desc()).limit(1))
+    if latest is not None and latest.source_signature == signature and not force:
+        return latest_correlations(db)
+    carried = (
+        db.scalars(
+            select(HabitsCorrelation).where(
+                HabitsCorrelation.snapshot_id == latest.id,
+                HabitsCorrelation.method != PEARSON,
+            )
+        ).all()
+        if rank_matrices is None and latest is not None
+        else []
+    )
+
+    accumulators = _load_accumulators(db)
+    stored = [accumulators[pair] for pair in CORRELATION_PAIRS if pair in accumulators]
+    if not stored:
+        return []
+    # Cohort pairs below the minimum sample size are not published at all.
+    segment_rows = db.scalars(
+        select(HabitsSegmentAccumulator).where(
+            HabitsSegmentAccumulator.sample_size >= get_settings().habits_segment_min_sample_size
+        )
+    ).all()
+    keyed = [(POPULATION_SEGMENT, '', row) for row in stored] + [
+        (row.segment_type, row.segment_value, row) for row in segment_rows
+    ]
+    # Population and every cohort are evaluated in one vectorized call, the time windows in another.
     calculator = PearsonCorrelationCalculator()
+    matrix = calculator.calculate_from_sums(_accumulated_sums([row for _, _, row in keyed]))
+    window_labels, window_sums = window_correlation_sums(db, today)
+    window_matrix = calculator.calculate_from_sums(window_sums) if window_sums is not None else None
+
+    snapshot = HabitsCorrelationSnapshot(
+        source_signature=signature,
+        assessment_count=assessment_count,
+        correlation_count=0,
+    )
+    db.add(snapshot)
+    db.flush()
+    calculated_at = datetime.now(timezone.utc)
     new_correlations: list[HabitsCorrelation] = []
 
-    for performance_metric in ('predicted_productivity_score', 'final_grade', 'assignments_completed_per_week'):
-        for metric_name in METRIC_NAMES:
-            x_values: list[float] = []
-            y_values: list[float] = []
-            for assessment in performance_rows:
-                x_val = _extract_assessment_metric(assessment, metric_name)
-                if performance_metric == 'predicted_productivity_score':
-                    y_val = predicted_productivity.get(assessment.assessment_id)
-                else:
-                    y_val = _extract_assessment_metric(assessment, performance_metric)
-                if x_val is None or y_val is None:
-                    continue
-                x_values.append(float(x_val))
-                y_values.append(float(y_val))
+    def _add(result: CorrelationStat | None, **keys: str) -> None:
+        if result is None:
+            return
+        correlation = HabitsCorrelation(
+            snapshot_id=snapshot.id,
+            metric_name=result.metric_name,
+            performance_metric=result.performance_metric,
+            correlation_coefficient=result.correlation_coefficient,
+            sample_size=result.sample_size,
+            confidence_interval_low=result.confidence_interval_low,
+            confidence_interval_high=result.confidence_interval_high,
+            confidence_level=result.confidence_level,
+            p_value=result.p_value,
+            calculation_timestamp=calculated_at,
+            **keys,
+        )
+        db.add(correlation)
+        new_correlations.append(correlation)
 
-            result = calculator.calculate(x_values, y_values)
-            if result is None:
-                continue
-            correlation = HabitsCorrelation(
-                metric_name=metric_name,
-                performance_metric=performance_metric,
-                correlation_coefficient=result.correlation_coefficient,
-                sample_size=result.sample_size,
-                confidence_interval_low=result.confidence_interval_low,
-                confidence_interval_high=result.confidence_interval_high,
-                confidence_level=result.confidence_level,
-                p_value=result.p_value,
-                calculation_timestamp=datetime.now(timezone.utc),
+    for index, (segment_type, segment_value, accumulator) in enumerate(keyed):
+        _add(
+            matrix.stat(index, accumulator.metric_name, accumulator.performance_metric),
+            segment_type=segment_type,
+            segment_value=segment_value,
+        )
+    pair_indexes = [
+        (metric_index, metric_name, performance_index, performance_metric)
+        for metric_index, metric_name in enumerate(METRIC_NAMES)
+        for performance_index, performance_metric in enumerate(PERFORMANCE_METRICS)
+    ]
+    for window_index, time_window in enumerate(window_labels):
+        for metric_index, metric_name, performance_index, performance_metric in pair_indexes:
+            _add(
+                window_matrix.stat((window_index, metric_index, performance_index), metric_name, performance_metric),
+                time_window=time_window,
+            )
+    for method, method_matrix in (rank_matrices or {}).items():
+        for metric_index, metric_name, performance_index, performance_metric in pair_indexes:
+            _add(
+                method_matrix.stat((metric_index, performance_index), metric_name, performance_metric),
+                method=method,
             )
-            db.add(correlation)
-            new_correlations.append(correlation)
+    for previous in carried:
+        correlation = HabitsCorrelation(
+            snapshot_id=snapshot.id,
+            **{
+                column.name: getattr(previous, column.name)
+                for column in HabitsCorrelation.__table__.columns
+                if column.name not in ('id', 'snapshot_id')
+            },
+        )
+        db.add(correlation)
+        new_correlations.append(correlation)
+    snapshot.correlation_count = len(new_correlations)
+    _prune_snapshots(db, snapshot.id)
 
-    update_normalized_exports(db, assessments)
     db.commit()
-    logger.info('Recomputed %s correlations from %s assessments', len(new_correlations), len(assessments))
-    return new_correlations
+    # Stored advice was ranked against the previous snapshot.
+    enqueue_job(
+        db,
+        RECOMMENDATION_REFRESH_JOB,
+        dedupe_key=RECOMMENDATION_REFRESH_JOB,
+        delay_seconds=get_settings().habits_recommendation_refresh_delay_seconds,
+    )
+    population = [
+        row
+        for row in new_correlations
+        if row.segment_type == POPULATION_SEGMENT and row.method == PEARSON and row.time_window == ALL_TIME_WINDOW
+    ]
+    cohort = sum(1 for row in new_correlations if row.segment_type != POPULATION_SEGMENT)
+    windowed = sum(1 for row in new_correlations if row.time_window != ALL_TIME_WINDOW)
+    logger.info(
+        'Recomputed %s correlations (%s cohort, %s windowed, %s rank-based) from %s assessments snapshot_id=%s',
+        len(new_correlations),
+        cohort,
+        windowed,
+        len(new_correlations) - len(population) - cohort - windowed,
+        assessment_count,
+        snapshot.id,
+    )
+    return population
 
 
 def run_correlation_batch(db: Session, cadence: str = 'weekly') -> int:
-    correlations = recompute_correlations(db)
+    # The scheduled batch reconciles the incremental accumulators with the raw rows before deriving correlations,
+    # and reuses the same decrypted matrices for the rank-based methods.
+    columns, x, y = _correlation_inputs(db)
+    _write_accumulators(db, columns, x, y)
+    db.commit()
+    rank_matrices = rank_correlation_matrices(x, y) if len(columns) >= 4 else None
+    export_normalized_assessments(db)
+    correlations = recompute_correlations(db, force=True, rank_matrices=rank_matrices)
     logger.info('Correlation batch run complete cadence=%s rows=%s', cadence, len(correlations))
     return len(correlations)
 
 
+def enqueue_correlation_recompute(db: Session) -> BackgroundJob:
+    """Queue a correlation recompute; submits inside the coalescing window share one job."""
+    return enqueue_job(
+        db,
+        RECOMPUTE_CORRELATIONS_JOB,
+        dedupe_key=RECOMPUTE_CORRELATIONS_JOB,
+        delay_seconds=get_settings().jobs_coalesce_seconds,
+    )
+
+
+@register_job_handler(RECOMPUTE_CORRELATIONS_JOB)
+def _run_recompute_correlations_job(db: Session, payload: dict) -> None:
+    recompute_correlations(db)
+
+
+@register_job_handler(CORRELATION_BATCH_JOB)
+def _run_correlation_batch_job(db: Session, payload: dict) -> None:
+    run_correlation_batch(db, payload.get('cadence', 'weekly'))
+
+
+@register_job_handler(NORMALIZED_EXPORT_JOB)
+def _run_normalized_export_job(db: Session, payload: dict) -> None:
+    export_normalized_assessments(db, full=bool(payload.get('full', False)))
+
+
 class RecommendationGenerator:
-    def generate(
-        self,
-        assessment: HabitsAssessment,
-        correlations: list[HabitsCorrelation],
-    ) -> list[HabitsRecommendation]:
-        final_grade_correlation_by_metric = {
-            correlation.metric_name: correlation
-            for correlation in correlations
-            if correlation.performance_metric == 'final_grade'
-        }
-        productivity_correlation_by_metric = {
-            correlation.metric_name: correlation
-            for correlation in correlations
-            if correlation.performance_metric == 'predicted_productivity_score'
-        }
-        correlation_by_metric = (
-            productivity_correlation_by_metric if productivity_correlation_by_metric else final_grade_correlation_by_metric
-        )
-        recommendations: list[tuple[str, str, float]] = []
-
-        sleep_corr = correlation_by_metric.get('sleep_hours')
-        if (
-            sleep_corr is not None
-            and assessment.sleep_hours < 7
-            and sleep_corr.correlation_coefficient > 0.4
-        ):
-            recommendations.append(
-                (
-                    'Increase sleep to 7-8 hours per night for better focus and grades',
-                    'sleep_hours',
-                    abs(sleep_corr.correlation_coefficient),
-                )
-            )
+    """Turn the rule table and the current correlations into ranked recommendations.
 
-        phone_corr = correlation_by_metric.get('phone_usage_hours')
-        if (
-            phone_corr is not None
-            and assessment.phone_usage_hours > 4
-            and phone_corr.correlation_coefficient < -0.3
-        ):
-            recommendations.append(
-                (
-                    'Reduce phone usage during study sessions - consider using app blockers',
-                    'phone_usage_hours',
-                    abs(phone_corr.correlation_coefficient),
-                )
-            )
+    Rule predicates run over column arrays, so ``rank`` handles a block of assessments in one
+    evaluation; ``generate`` is the single-assessment case. Hits are ordered by rule priority, then
+    by the strength of the metric's correlation. When fewer than three rules fire, the strongest
+    correlations fill the list with generic advice.
+    """
 
-        exercise_corr = correlation_by_metric.get('exercise_minutes')
-        if (
-            exercise_corr is not None
-            and assessment.exercise_minutes < 30
-            and exercise_corr.correlation_coefficient > 0.3
-        ):
-            recommendations.append(
-                (
-                    'Add 30+ minutes of daily exercise to improve focus and energy levels',
-                    'exercise_minutes',
-                    abs(exercise_corr.correlation_coefficient),
-                )
-            )
+    MAX_RECOMMENDATIONS = 5
+    MIN_RULE_RECOMMENDATIONS = 3
+    FALLBACK_MIN_ABS_R = 0.3
 
-        social_corr = correlation_by_metric.get('social_media_hours')
-        if (
-            social_corr is not None
-            and assessment.social_media_hours > 2
-            and social_corr.correlation_coefficient < -0.3
-        ):
-            recommendations.append(
-                (
-                    'Limit social media to 30-60 minutes daily during study breaks only',
-                    'social_media_hours',
-                    abs(social_corr.correlation_coefficient),
+    def __init__(self, rules: RuleSet | None = None) -> None:
+        self.rules = rules if rules is not None else load_recommendation_rules()
+
+    @staticmethod
+    def _correlation_by_metric(correlations: list[HabitsCorrelation]) -> dict[str, float]:
+        by_performance: dict[str, dict[str, float]] = {'predicted_productivity_score': {}, 'final_grade': {}}
+        for correlation in correlations:
+            if correlation.performance_metric in by_performance:
+                by_performance[correlation.performance_metric][correlation.metric_name] = (
+                    correlation.correlation_coefficient
                 )
-            )
+        return by_performance['predicted_productivity_score'] or by_performance['final_grade']
 
-        study_corr = correlation_by_metric.get('study_hours')
-        if (
-            study_corr is not None
-            and assessment.study_hours < 2
-            and study_corr.correlation_coefficient > 0.3
-        ):
-            recommendations.append(
+    def _fallback(self, correlation_by_metric: dict[str, float]) -> list[tuple[str, str, float, int]]:
+        ranked = sorted(
+            (item for item in correlation_by_metric.items() if abs(item[1]) >= self.FALLBACK_MIN_ABS_R),
+            key=lambda item: abs(item[1]),
+            reverse=True,
+        )
+        fallback = []
+        for metric_name, coefficient in ranked[:self.MAX_RECOMMENDATIONS]:
+            direction = 'increase' if metric_name not in NEGATIVE_METRICS else 'reduce'
+            fallback.append(
                 (
-                    'Increase focused study time to 2-3 hours daily in consistent blocks',
-                    'study_hours',
-                    abs(study_corr.correlation_coefficient),
+                    f'Consider adjusting {metric_name.replace("_", " ")} to {direction} for better outcomes',
+                    metric_name,
+                    abs(coefficient),
+                    DEFAULT_PRIORITY,
                 )
             )
+        return fallback
 
-        if len(recommendations) < 3:
-            ranked = sorted(
-                (
-                    correlation
-                    for correlation in correlation_by_metric.values()
-                    if abs(correlation.correlation_coefficient) >= 0.3
-                ),
-                key=lambda item: abs(item.correlation_coefficient),
-                reverse=True,
-            )
-            for correlation in ranked:
-                direction = 'increase' if correlation.metric_name not in NEGATIVE_METRICS else 'reduce'
-                recommendations.append(
-                    (
-                        f'Consider adjusting {correlation.metric_name.replace("_", " ")} to {direction} for better outcomes',
-                        correlation.metric_name,
-                        abs(correlation.correlation_coefficient),
-                    )
+    def rank(
+        self,
+        values: Mapping[str, np.ndarray],
+        correlations: list[HabitsCorrelation],
+    ) -> list[list[tuple[str, str, float]]]:
+        """``(text, supporting_metric, strength)`` lists for every row of the metric ``values`` arrays."""
+        correlation_by_metric = self._correlation_by_metric(correlations)
+        rules = self.rules.rules
+        strength = np.array([abs(correlation_by_metric.get(rule.metric, 0.0)) for rule in rules])
+        hits = self.rules.evaluate(values) & self.rules.gates(correlation_by_metric)[:, None]
+        # Stable: equal priority and strength keep table order.
+        order = np.lexsort((-strength, -self.rules.priorities))
+        fallback = self._fallback(correlation_by_metric)
+
+        ranked: list[list[tuple[str, str, float]]] = []
+        hit_rows, hit_positions = np.nonzero(hits[order].T)
+        boundaries = np.searchsorted(hit_rows, np.arange(hits.shape[1] + 1))
+        for row in range(hits.shape[1]):
+            candidates = []
+            for index in order[hit_positions[boundaries[row]:boundaries[row + 1]]]:
+                rule = rules[index]
+                candidates.append(
+                    (rule.render(float(values[rule.metric][row])), rule.metric, strength[index], rule.priority)
                 )
-                if len(recommendations) >= 5:
+            if len(candidates) < self.MIN_RULE_RECOMMENDATIONS:
+                candidates = sorted(candidates + fallback, key=lambda item: (-item[3], -item[2]))
+            chosen: list[tuple[str, str, float]] = []
+            seen_text: set[str] = set()
+            for text, metric_name, item_strength, _ in candidates:
+                if text in seen_text:
+                    continue
+                seen_text.add(text)
+                chosen.append((text, metric_name, float(item_strength)))
+                if len(chosen) >= self.MAX_RECOMMENDATIONS:
                     break
+            ranked.append(chosen)
+        return ranked
 
-        deduped: list[tuple[str, str, float]] = []
-        seen_text: set[str] = set()
-        for recommendation in sorted(recommendations, key=lambda item: item[2], reverse=True):
-            if recommendation[0] in seen_text:
-                continue
-            deduped.append(recommendation)
-            seen_text.add(recommendation[0])
-            if len(deduped) >= 5:
-                break
+    def generate(
+        self,
+        assessment: HabitsAssessment,
+        correlations: list[HabitsCorrelation],
+    ) -> list[HabitsRecommendation]:
+        values = {
+            metric: np.array([np.nan if value is None else value], dtype=np.float64)
+            for metric in self.rules.metrics
+            for value in [_extract_assessment_metric(assessment, metric)]
+        }
         return [
             HabitsRecommendation(
                 assessment_id=assessment.assessment_id,
@@ -439,5 +1301,5 @@ class RecommendationGenerator:
                 correlation_strength=strength,
                 priority_rank=index + 1,
             )
-            for index, (text, metric, strength) in enumerate(deduped[:5])
+            for index, (text, metric, strength) in enumerate(self.rank(values, correlations)[0])
         ]
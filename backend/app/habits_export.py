@@ -0,0 +1,168 @@
+"""Stream ``habits_normalized_exports`` out as CSV, JSON lines or Parquet.
+
+Rows are read with ``yield_per`` and encoded one partition at a time, so memory stays bounded by
+``chunk_size`` rows whatever the size of the table. Parquet output is written with ``pyarrow``; each
+partition becomes one row group and the bytes are handed out as soon as they are written.
+"""
+
+import csv
+import io
+import json
+import logging
+from collections.abc import Iterator, Sequence
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from .models import HabitsNormalizedExport
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'parquet')
+MEDIA_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+DEFAULT_EXPORT_CHUNK_SIZE = 5000
+
+_table = HabitsNormalizedExport.__table__
+EXPORT_COLUMNS = tuple(column.name for column in _table.columns if column.name != 'id')
+
+
+class ExportFormatUnavailableError(RuntimeError):
+    pass
+
+
+def ensure_export_format(export_format: str) -> None:
+    """Fail before any bytes are sent when ``export_format`` cannot be produced here."""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Unsupported export format {export_format!r}')
+    if export_format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as exc:
+            raise ExportFormatUnavailableError('Parquet export requires the pyarrow package') from exc
+
+
+def _partitions(db: Session, chunk_size: int) -> Iterator[Sequence[Row]]:
+    result = db.execute(
+        select(*(_table.c[name] for name in EXPORT_COLUMNS))
+        .order_by(_table.c.assessment_id.asc())
+        .execution_options(yield_per=chunk_size)
+    )
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+
+def _iter_csv(partitions: Iterator[Sequence[Row]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(EXPORT_COLUMNS)
+    for partition in partitions:
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row] for row in partition
+        )
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _iter_jsonl(partitions: Iterator[Sequence[Row]]) -> Iterator[bytes]:
+    for partition in partitions:
+        yield ''.join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row, strict=True)), default=datetime.isoformat) + '\n'
+            for row in partition
+        ).encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands its bytes back on ``drain`` while keeping the stream position."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arrow_type(pa, name: str):
+    if name == 'created_at':
+        return pa.timestamp('us')
+    if name in ('assessment_id', 'user_id'):
+        return pa.int64()
+    return pa.float64()
+
+
+def _iter_parquet(partitions: Iterator[Sequence[Row]]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [
+            pa.field(column.name, _arrow_type(pa, column.name), nullable=column.nullable)
+            for column in _table.columns
+            if column.name in EXPORT_COLUMNS
+        ]
+    )
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for partition in partitions:
+            writer.write_batch(
+                pa.record_batch(
+                    [
+                        pa.array([row[index] for row in partition], type=schema.field(index).type)
+                        for index in range(len(EXPORT_COLUMNS))
+                    ],
+                    schema=schema,
+                )
+            )
+            yield sink.drain()
+    yield sink.drain()
+
+
+_ENCODERS = {'csv': _iter_csv, 'jsonl': _iter_jsonl, 'parquet': _iter_parquet}
+
+
+def stream_normalized_exports(
+    db: Session,
+    export_format: str,
+    *,
+    chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """Yield the encoded table in ``assessment_id`` order, one chunk of rows at a time."""
+    ensure_export_format(export_format)
+    rows = 0
+
+    def _counted() -> Iterator[Sequence[Row]]:
+        nonlocal rows
+        for partition in _partitions(db, chunk_size):
+            rows += len(partition)
+            yield partition
+
+    for data in _ENCODERS[export_format](_counted()):
+        if data:
+            yield data
+    logger.info('habits.export.streamed format=%s rows=%s', export_format, rows)
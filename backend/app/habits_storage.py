@@ -0,0 +1,392 @@
+"""Storage-level access to raw encrypted habits assessment columns: bulk reads and maintenance jobs."""
+
+import logging
+import time
+from collections import deque
+from collections.abc import Iterable, Mapping, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import LargeBinary, bindparam, func, select, type_coerce, update
+from sqlalchemy.orm import Session
+
+from .encryption import (
+    decrypt_number,
+    encrypt_number,
+    get_keyring,
+    rewrap_sealed_record,
+    seal_record,
+    sealed_record_key_id,
+    unseal_record,
+)
+from .models import SEALED_METRIC_FIELDS, SEALED_PLACEHOLDER, HabitsAssessment
+
+logger = logging.getLogger(__name__)
+
+ENCRYPTED_ASSESSMENT_COLUMNS = SEALED_METRIC_FIELDS
+STORAGE_MODES = ('columns', 'sealed')
+DEFAULT_READ_CHUNK_SIZE = 2000
+
+# Range each metric is scaled from into [0, 1] for normalized exports and the analytics snapshot.
+NORMALIZATION_RANGES = {
+    'study_hours': (0.0, 12.0),
+    'sleep_hours': (0.0, 12.0),
+    'phone_usage_hours': (0.0, 12.0),
+    'social_media_hours': (0.0, 10.0),
+    'gaming_hours': (0.0, 10.0),
+    'breaks_per_day': (0.0, 20.0),
+    'coffee_intake': (0.0, 10.0),
+    'exercise_minutes': (0.0, 180.0),
+    'stress_level': (1.0, 10.0),
+    'focus_score': (0.0, 100.0),
+    'attendance_percentage': (0.0, 100.0),
+    'assignments_completed_per_week': (0.0, 20.0),
+    'final_grade': (0.0, 100.0),
+}
+
+assessment_table = HabitsAssessment.__table__
+
+
+def _raw_columns(names: tuple[str, ...]) -> list:
+    # type_coerce bypasses EncryptedFloat/SealedMetrics so the ciphertext bytes come back untouched.
+    return [type_coerce(assessment_table.c[name], LargeBinary).label(name) for name in names]
+
+
+def _raw_update_statement(names: tuple[str, ...]):
+    return (
+        update(assessment_table)
+        .where(assessment_table.c.assessment_id == bindparam('b_assessment_id'))
+        .values(
+            {
+                **{assessment_table.c[name]: bindparam(f'b_{name}', type_=LargeBinary) for name in names},
+                # Storage maintenance does not change the data, so keep the row's modification time.
+                assessment_table.c.updated_at: assessment_table.c.updated_at,
+            }
+        )
+    )
+
+
+@dataclass
+class AssessmentColumns:
+    """Decrypted assessment values as one contiguous float64 array per column, NaN where missing."""
+
+    assessment_ids: np.ndarray
+    user_ids: np.ndarray
+    grade_opt_in: np.ndarray
+    values: dict[str, np.ndarray]
+    # Stored productivity score (NaN where unscored) and producing model version (None where unscored);
+    # only filled for rows read from the table.
+    productivity_scores: np.ndarray | None = None
+    productivity_model_versions: np.ndarray | None = None
+
+    def __len__(self) -> int:
+        return len(self.assessment_ids)
+
+    def matrix(self, names: Sequence[str]) -> np.ndarray:
+        """Rows x ``names`` matrix, copying the requested columns side by side."""
+        if not names:
+            return np.empty((len(self), 0), dtype=np.float64)
+        return np.column_stack([self.values[name] for name in names])
+
+    def take(self, positions: np.ndarray) -> 'AssessmentColumns':
+        """The rows at ``positions`` (indices or a boolean mask) as new columns."""
+        return AssessmentColumns(
+            assessment_ids=self.assessment_ids[positions],
+            user_ids=self.user_ids[positions],
+            grade_opt_in=self.grade_opt_in[positions],
+            values={name: values[positions] for name, values in self.values.items()},
+            productivity_scores=None if self.productivity_scores is None else self.productivity_scores[positions],
+            productivity_model_versions=(
+                None if self.productivity_model_versions is None else self.productivity_model_versions[positions]
+            ),
+        )
+
+
+def normalize_column(metric_name: str, values: np.ndarray, *, missing: float = 0.0) -> np.ndarray:
+    """Scale a metric column into [0, 1]; missing (NaN) values become ``missing``."""
+    min_value, max_value = NORMALIZATION_RANGES[metric_name]
+    if max_value == min_value:
+        return np.where(np.isnan(values), missing, 0.0)
+    scaled = (np.clip(values, min_value, max_value) - min_value) / (max_value - min_value)
+    return np.where(np.isnan(values), missing, scaled)
+
+
+def _decrypt_chunk(names: tuple[str, ...], rows: list[tuple[bytes | None, ...]]) -> np.ndarray:
+    """Decrypt raw ``(sealed_metrics, *names)`` tuples into a ``len(names) x rows`` block."""
+    block = np.full((len(names), len(rows)), np.nan, dtype=np.float64)
+    sealed_positions = [SEALED_METRIC_FIELDS.index(name) for name in names]
+    for row_index, row in enumerate(rows):
+        sealed = row[0]
+        if sealed is not None:
+            record = unseal_record(sealed)
+            for column_index, position in enumerate(sealed_positions):
+                value = record[position] if position < len(record) else None
+                if value is not None:
+                    block[column_index, row_index] = value
+            continue
+        for column_index, value in enumerate(row[1:]):
+            if value is not None and value != SEALED_PLACEHOLDER:
+                block[column_index, row_index] = decrypt_number(value)
+    return block
+
+
+def what_if_columns(
+    assessment: HabitsAssessment,
+    scenarios: Mapping[str, np.ndarray],
+    count: int,
+    names: Iterable[str] = ENCRYPTED_ASSESSMENT_COLUMNS,
+) -> AssessmentColumns:
+    """``count`` copies of one loaded assessment, each with its own metric overrides applied.
+
+    ``scenarios`` maps metric names to ``count`` values; NaN keeps the assessment's own value.
+    """
+    values: dict[str, np.ndarray] = {}
+    for name in names:
+        stored = getattr(assessment, name, None)
+        column = np.full(count, np.nan if stored is None else float(stored), dtype=np.float64)
+        override = scenarios.get(name)
+        if override is not None:
+            column = np.where(np.isnan(override), column, override)
+        values[name] = column
+    return AssessmentColumns(
+        assessment_ids=np.full(count, assessment.assessment_id, dtype=np.int64),
+        user_ids=np.full(count, assessment.user_id, dtype=np.int64),
+        grade_opt_in=np.full(count, bool(assessment.grade_opt_in), dtype=bool),
+        values=values,
+    )
+
+
+def load_assessment_columns(
+    db: Session,
+    names: Iterable[str] = ENCRYPTED_ASSESSMENT_COLUMNS,
+    *,
+    assessment_ids: Iterable[int] | None = None,
+    min_assessment_id: int | None = None,
+    chunk_size: int = DEFAULT_READ_CHUNK_SIZE,
+    processes: int | None = None,
+) -> AssessmentColumns:
+    """Stream raw ciphertext with a Core select and decrypt it chunk by chunk into column arrays.
+
+    No ORM objects are built. Output arrays are allocated once up front, so peak memory is the result
+    plus one chunk of ciphertext per in-flight chunk. With ``processes`` > 1 chunks are decrypted in a
+    process pool while the next chunk is fetched.
+    """
+    names = tuple(names)
+    filters = []
+    if assessment_ids is not None:
+        filters.append(assessment_table.c.assessment_id.in_(list(assessment_ids)))
+    if min_assessment_id is not None:
+        filters.append(assessment_table.c.assessment_id > min_assessment_id)
+
+    # Pin the upper bound so rows inserted while streaming cannot overflow the preallocated arrays.
+    upper_id = db.scalar(select(func.max(assessment_table.c.assessment_id)).where(*filters))
+    if upper_id is None:
+        return AssessmentColumns(
+            assessment_ids=np.empty(0, dtype=np.int64),
+            user_ids=np.empty(0, dtype=np.int64),
+            grade_opt_in=np.empty(0, dtype=bool),
+            values={name: np.empty(0, dtype=np.float64) for name in names},
+            productivity_scores=np.empty(0, dtype=np.float64),
+            productivity_model_versions=np.empty(0, dtype=object),
+        )
+    filters.append(assessment_table.c.assessment_id <= upper_id)
+    total = db.scalar(select(func.count()).select_from(assessment_table).where(*filters)) or 0
+
+    ids = np.empty(total, dtype=np.int64)
+    user_ids = np.empty(total, dtype=np.int64)
+    grade_opt_in = np.empty(total, dtype=bool)
+    scores = np.empty(total, dtype=np.float64)
+    versions = np.empty(total, dtype=object)
+    values = np.full((len(names), total), np.nan, dtype=np.float64)
+
+    result = db.execute(
+        select(
+            assessment_table.c.assessment_id,
+            assessment_table.c.user_id,
+            assessment_table.c.grade_opt_in,
+            assessment_table.c.productivity_score,
+            assessment_table.c.productivity_model_version,
+            *_raw_columns(('sealed_metrics', *names)),
+        )
+        .where(*filters)
+        .order_by(assessment_table.c.assessment_id.asc())
+        .execution_options(yield_per=chunk_size)
+    )
+
+    executor = ProcessPoolExecutor(max_workers=processes) if processes and processes > 1 else None
+    in_flight: deque[tuple[int, Future[np.ndarray]]] = deque()
+
+    def _store(offset: int, block: np.ndarray) -> None:
+        values[:, offset:offset + block.shape[1]] = block
+
+    offset = 0
+    try:
+        for partition in result.partitions():
+            count = len(partition)
+            ids[offset:offset + count] = [row[0] for row in partition]
+            user_ids[offset:offset + count] = [row[1] for row in partition]
+            grade_opt_in[offset:offset + count] = [bool(row[2]) for row in partition]
+            scores[offset:offset + count] = [np.nan if row[3] is None else row[3] for row in partition]
+            versions[offset:offset + count] = [row[4] for row in partition]
+            raw = [tuple(row[5:]) for row in partition]
+            if executor is None:
+                _store(offset, _decrypt_chunk(names, raw))
+            else:
+                in_flight.append((offset, executor.submit(_decrypt_chunk, names, raw)))
+                if len(in_flight) >= 2 * processes:
+                    done_offset, future = in_flight.popleft()
+                    _store(done_offset, future.result())
+            offset += count
+        while in_flight:
+            done_offset, future = in_flight.popleft()
+            _store(done_offset, future.result())
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    # Rows deleted while streaming leave the tail unused.
+    return AssessmentColumns(
+        assessment_ids=ids[:offset],
+        user_ids=user_ids[:offset],
+        grade_opt_in=grade_opt_in[:offset],
+        values={name: np.ascontiguousarray(values[index, :offset]) for index, name in enumerate(names)},
+        productivity_scores=scores[:offset],
+        productivity_model_versions=versions[:offset],
+    )
+
+
+def reencrypt_assessments(db: Session, *, chunk_size: int = 500, pause_seconds: float = 0.0) -> int:
+    """Re-encrypt every assessment value and sealed record that is not under the active key.
+
+    Rows are walked in primary-key order and committed per chunk, so the job can run while the API keeps
+    serving traffic: readers hold every configured key and decrypt old and new ciphertexts alike.
+    """
+    keyring = get_keyring()
+    names = (*ENCRYPTED_ASSESSMENT_COLUMNS, 'sealed_metrics')
+    statement = _raw_update_statement(names)
+
+    last_assessment_id = 0
+    scanned = 0
+    rewritten = 0
+    started = time.perf_counter()
+    while True:
+        rows = db.execute(
+            select(assessment_table.c.assessment_id, *_raw_columns(names))
+            .where(assessment_table.c.assessment_id > last_assessment_id)
+            .order_by(assessment_table.c.assessment_id.asc())
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        last_assessment_id = rows[-1].assessment_id
+        scanned += len(rows)
+
+        params: list[dict[str, object]] = []
+        for row in rows:
+            values = dict(row._mapping)
+            stale = [
+                name
+                for name in ENCRYPTED_ASSESSMENT_COLUMNS
+                if values[name] is not None and keyring.needs_rotation(values[name])
+            ]
+            sealed = values['sealed_metrics']
+            if sealed is not None and sealed_record_key_id(sealed) != keyring.active_key_id:
+                values['sealed_metrics'] = rewrap_sealed_record(sealed)
+            elif not stale:
+                continue
+            for name in stale:
+                values[name] = keyring.rewrap(values[name])
+            params.append({'b_assessment_id': row.assessment_id, **{f'b_{name}': values[name] for name in names}})
+        if params:
+            db.execute(statement, params)
+        db.commit()
+        rewritten += len(params)
+        logger.info(
+            'habits.storage.reencrypt.chunk last_assessment_id=%s scanned=%s rewritten=%s active_key_id=%s',
+            last_assessment_id,
+            scanned,
+            rewritten,
+            keyring.active_key_id,
+        )
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+    logger.info(
+        'habits.storage.reencrypt.complete scanned=%s rewritten=%s duration_s=%.2f',
+        scanned,
+        rewritten,
+        time.perf_counter() - started,
+    )
+    return rewritten
+
+
+def convert_assessment_storage(db: Session, mode: str, *, chunk_size: int = 500) -> int:
+    """Move existing rows to the given storage mode in committed primary-key chunks.
+
+    ``sealed`` packs the per-column ciphertexts of each row into one sealed record; ``columns`` reverses it.
+    """
+    if mode not in STORAGE_MODES:
+        raise ValueError(f'Unknown habits storage mode {mode!r}')
+    names = (*ENCRYPTED_ASSESSMENT_COLUMNS, 'sealed_metrics')
+    statement = _raw_update_statement(names)
+    sealed_column = assessment_table.c.sealed_metrics
+    pending = sealed_column.is_(None) if mode == 'sealed' else sealed_column.is_not(None)
+
+    last_assessment_id = 0
+    converted = 0
+    started = time.perf_counter()
+    while True:
+        rows = db.execute(
+            select(assessment_table.c.assessment_id, *_raw_columns(names))
+            .where(assessment_table.c.assessment_id > last_assessment_id, pending)
+            .order_by(assessment_table.c.assessment_id.asc())
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        last_assessment_id = rows[-1].assessment_id
+
+        params: list[dict[str, object]] = []
+        for row in rows:
+            values = row._mapping
+            if mode == 'sealed':
+                numbers = [
+                    decrypt_number(values[name]) if values[name] not in (None, SEALED_PLACEHOLDER) else None
+                    for name in ENCRYPTED_ASSESSMENT_COLUMNS
+                ]
+                converted_values = {
+                    **{
+                        f'b_{name}': None if number is None else SEALED_PLACEHOLDER
+                        for name, number in zip(ENCRYPTED_ASSESSMENT_COLUMNS, numbers, strict=True)
+                    },
+                    'b_sealed_metrics': seal_record(numbers),
+                }
+            else:
+                numbers = list(unseal_record(values['sealed_metrics']))
+                converted_values = {
+                    **{
+                        f'b_{name}': None if number is None else encrypt_number(number)
+                        for name, number in zip(ENCRYPTED_ASSESSMENT_COLUMNS, numbers, strict=False)
+                    },
+                    'b_sealed_metrics': None,
+                }
+            params.append({'b_assessment_id': row.assessment_id, **converted_values})
+
+        db.execute(statement, params)
+        db.commit()
+        converted += len(params)
+        logger.info(
+            'habits.storage.convert.chunk mode=%s last_assessment_id=%s converted=%s',
+            mode,
+            last_assessment_id,
+            converted,
+        )
+
+    logger.info(
+        'habits.storage.convert.complete mode=%s converted=%s duration_s=%.2f',
+        mode,
+        converted,
+        time.perf_counter() - started,
+    )
+    return converted
@@ -0,0 +1,279 @@
+"""Durable background jobs stored in the ``background_jobs`` table.
+
+Producers call ``enqueue_job``; ``python -m app.worker`` claims and runs due jobs. Jobs that share a
+``dedupe_key`` collapse into a single pending row, and a ``delay_seconds`` on enqueue gives a burst of
+producers time to coalesce into that one row before a worker picks it up.
+
+A claimed job holds a lease (``locked_at``) that ``run_job`` renews from a heartbeat thread while the
+handler runs, so only jobs whose worker stopped renewing are handed to another worker by
+``release_stale_jobs``, however long a healthy run takes.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+RETRY_BASE_SECONDS = 30
+DEFAULT_LEASE_SECONDS = 15 * 60
+# Leases are renewed this many times per lease period, so a single slow or failed renewal is tolerated.
+HEARTBEATS_PER_LEASE = 3
+
+JobHandler = Callable[[Session, dict], object]
+_handlers: dict[str, JobHandler] = {}
+
+
+def register_job_handler(job_type: str) -> Callable[[JobHandler], JobHandler]:
+    def decorator(handler: JobHandler) -> JobHandler:
+        _handlers[job_type] = handler
+        return handler
+
+    return decorator
+
+
+def job_handler(job_type: str) -> JobHandler | None:
+    return _handlers.get(job_type)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def enqueue_job(
+    db: Session,
+    job_type: str,
+    payload: dict | None = None,
+    *,
+    dedupe_key: str | None = None,
+    delay_seconds: float = 0.0,
+    max_attempts: int = 3,
+) -> BackgroundJob:
+    """Commit a new pending job, or return the pending job that already carries ``dedupe_key``."""
+    if dedupe_key is not None:
+        existing = _pending_job(db, dedupe_key)
+        if existing is not None:
+            logger.info('jobs.enqueue.coalesced job_id=%s job_type=%s', existing.id, job_type)
+            return existing
+
+    job = BackgroundJob(
+        job_type=job_type,
+        dedupe_key=dedupe_key,
+        payload=json.dumps(payload or {}, sort_keys=True),
+        max_attempts=max_attempts,
+        run_after=_utcnow() + timedelta(seconds=delay_seconds),
+    )
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another producer inserted the same pending dedupe key between our check and commit.
+        db.rollback()
+        existing = _pending_job(db, dedupe_key) if dedupe_key is not None else None
+        if existing is None:
+            raise
+        return existing
+    logger.info('jobs.enqueue.created job_id=%s job_type=%s', job.id, job_type)
+    return job
+
+
+def _pending_job(db: Session, dedupe_key: str) -> BackgroundJob | None:
+    return db.scalar(
+        select(BackgroundJob).where(
+            BackgroundJob.dedupe_key == dedupe_key,
+            BackgroundJob.status == JOB_PENDING,
+        )
+    )
+
+
+def claim_next_job(db: Session, worker_id: str) -> BackgroundJob | None:
+    """Atomically move the oldest due pending job to ``running`` for this worker."""
+    while True:
+        now = _utcnow()
+        candidate_id = db.scalar(
+            select(BackgroundJob.id)
+            .where(BackgroundJob.status == JOB_PENDING, BackgroundJob.run_after <= now)
+            .order_by(BackgroundJob.run_after.asc(), BackgroundJob.id.asc())
+            .limit(1)
+        )
+        if candidate_id is None:
+            db.commit()
+            return None
+        # Compare-and-set on the status column: only one worker can win the update.
+        claimed = db.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == candidate_id, BackgroundJob.status == JOB_PENDING)
+            .values(
+                status=JOB_RUNNING,
+                locked_by=worker_id,
+                locked_at=now,
+                attempts=BackgroundJob.attempts + 1,
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if claimed:
+            return db.get(BackgroundJob, candidate_id, populate_existing=True)
+
+
+class LeaseHeartbeat:
+    """Renew a running job's lease from a background thread until the context exits.
+
+    Renewals go through their own session on the caller's engine, so they commit independently of the
+    handler's transaction.
+    """
+
+    def __init__(self, db: Session, job: BackgroundJob, lease_seconds: float) -> None:
+        self._bind = db.get_bind()
+        self._job_id = job.id
+        self._worker_id = job.locked_by
+        self._interval = lease_seconds / HEARTBEATS_PER_LEASE
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'job-heartbeat-{job.id}', daemon=True)
+
+    def __enter__(self) -> 'LeaseHeartbeat':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            self.renew()
+
+    def renew(self) -> bool:
+        """Push ``locked_at`` forward while this worker still holds the job; False when the lease was lost."""
+        try:
+            with Session(self._bind) as session:
+                renewed = session.execute(
+                    update(BackgroundJob)
+                    .where(
+                        BackgroundJob.id == self._job_id,
+                        BackgroundJob.status == JOB_RUNNING,
+                        BackgroundJob.locked_by == self._worker_id,
+                    )
+                    .values(locked_at=_utcnow())
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                session.commit()
+        except Exception:
+            # The next beat retries; the lease only expires after several missed renewals.
+            logger.warning('jobs.lease.renew_failed job_id=%s', self._job_id, exc_info=True)
+            return True
+        if not renewed:
+            logger.warning('jobs.lease.lost job_id=%s worker_id=%s', self._job_id, self._worker_id)
+        return bool(renewed)
+
+
+def run_job(db: Session, job: BackgroundJob, *, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+    """Run a claimed job and record its outcome; failed attempts are rescheduled with backoff.
+
+    The job's lease is renewed every ``lease_seconds / HEARTBEATS_PER_LEASE`` while the handler runs.
+    """
+    handler = job_handler(job.job_type)
+    started = time.perf_counter()
+    try:
+        if handler is None:
+            raise LookupError(f'No handler registered for job type {job.job_type!r}')
+        payload = json.loads(job.payload)
+        with LeaseHeartbeat(db, job, lease_seconds):
+            handler(db, payload)
+    except Exception as exc:
+        db.rollback()
+        job = db.get(BackgroundJob, job.id, populate_existing=True)
+        job.last_error = f'{type(exc).__name__}: {exc}'
+        job.locked_by = None
+        job.locked_at = None
+        if job.attempts < job.max_attempts:
+            job.status = JOB_PENDING
+            job.run_after = _utcnow() + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (job.attempts - 1))
+        else:
+            job.status = JOB_FAILED
+            job.finished_at = _utcnow()
+        try:
+            db.commit()
+        except IntegrityError:
+            # A newer pending job with the same dedupe key already covers this work.
+            db.rollback()
+            job = db.get(BackgroundJob, job.id, populate_existing=True)
+            job.status = JOB_FAILED
+            job.finished_at = _utcnow()
+            db.commit()
+        logger.exception(
+            'jobs.run.failed job_id=%s job_type=%s attempt=%s status=%s',
+            job.id,
+            job.job_type,
+            job.attempts,
+            job.status,
+        )
+        return False
+
+    job.status = JOB_SUCCEEDED
+    job.locked_by = None
+    job.locked_at = None
+    job.last_error = None
+    job.finished_at = _utcnow()
+    db.commit()
+    logger.info(
+        'jobs.run.succeeded job_id=%s job_type=%s duration_ms=%.2f',
+        job.id,
+        job.job_type,
+        (time.perf_counter() - started) * 1000,
+    )
+    return True
+
+
+def release_stale_jobs(db: Session, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> int:
+    """Return jobs whose worker stopped renewing the lease (e.g. died mid-run) to the pending state."""
+    cutoff = _utcnow() - timedelta(seconds=lease_seconds)
+    stale = db.scalars(
+        select(BackgroundJob).where(BackgroundJob.status == JOB_RUNNING, BackgroundJob.locked_at < cutoff)
+    ).all()
+    for job in stale:
+        job.locked_by = None
+        job.locked_at = None
+        job.last_error = 'Lease expired'
+        if job.attempts < job.max_attempts and (job.dedupe_key is None or _pending_job(db, job.dedupe_key) is None):
+            job.status = JOB_PENDING
+            job.run_after = _utcnow()
+        else:
+            job.status = JOB_FAILED
+            job.finished_at = _utcnow()
+        db.flush()
+    db.commit()
+    if stale:
+        logger.warning('jobs.lease.released count=%s', len(stale))
+    return len(stale)
+
+
+def run_pending_jobs(
+    db: Session,
+    worker_id: str,
+    *,
+    limit: int | None = None,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+) -> int:
+    """Claim and run due jobs until none are left (or ``limit`` is reached); returns jobs run."""
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_next_job(db, worker_id)
+        if job is None:
+            break
+        run_job(db, job, lease_seconds=lease_seconds)
+        processed += 1
+    return processed
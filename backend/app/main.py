@@ -1,16 +1,22 @@
 import logging
+import math
 import time
 from uuid import uuid4
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from .career_services import seed_career_metadata
 from .config import get_settings
 from .database import Base, SessionLocal, engine
-from .migrations import ensure_career_schema
+from .deps import get_current_admin
+from .migrations import ensure_career_schema, ensure_habits_schema
+from .model_registry import model_registry
+from .routers.admin_exports import router as admin_exports_router
 from .routers.auth import router as auth_router
 from .routers.career_recommendations import router as career_recommendations_router
 from .routers.careers import router as careers_router
@@ -84,13 +90,29 @@ async def request_logging_middleware(request: Request, call_next):
     return response
 
 
+def _json_safe_float(value: float) -> float | str:
+    return value if math.isfinite(value) else str(value)
+
+
+@app.exception_handler(RequestValidationError)
+async def request_validation_exception_handler(request: Request, exc: RequestValidationError) -> JSONResponse:
+    # Errors echo the rejected input; NaN or Infinity in it would make the 422 body itself fail to render.
+    return JSONResponse(
+        status_code=422,
+        content={'detail': jsonable_encoder(exc.errors(), custom_encoder={float: _json_safe_float})},
+    )
+
+
 @app.on_event('startup')
 def on_startup() -> None:
     Base.metadata.create_all(bind=engine)
     ensure_career_schema(engine)
+    ensure_habits_schema(engine)
     with SessionLocal() as db:
         seed_career_metadata(db)
     logger.info('startup db.initialized database_url=%s', settings.database_url)
+    # Unpickle model artifacts now so the first request does not pay for it.
+    model_registry.warm_up()
     routes = sorted(
         {
             f"{','.join(sorted(route.methods or []))} {route.path}"
@@ -106,9 +128,16 @@ def on_startup() -> None:
 def health() -> dict[str, str]:
     return {'status': 'ok'}
 
+
+@app.get('/health/models', dependencies=[Depends(get_current_admin)])
+def health_models() -> dict[str, dict[str, object]]:
+    return model_registry.stats()
+
+
 app.include_router(auth_router)
 app.include_router(profile_router)
 app.include_router(careers_router)
 app.include_router(resources_router)
 app.include_router(career_recommendations_router)
 app.include_router(habits_router)
+app.include_router(admin_exports_router)
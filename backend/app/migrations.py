@@ -1,9 +1,13 @@
 from sqlalchemy import inspect, text
 from sqlalchemy.engine import Engine
 
+from .career_catalog import slugify_name
+
 
 def ensure_career_schema(engine: Engine) -> None:
     inspector = inspect(engine)
+    if inspector.has_table('careers'):
+        _ensure_career_slugs(engine, {column['name'] for column in inspector.get_columns('careers')})
     if not inspector.has_table('users'):
         return
 
@@ -20,3 +24,81 @@ def ensure_career_schema(engine: Engine) -> None:
 
         if 'career_goal' in user_columns:
             connection.execute(text('ALTER TABLE users DROP COLUMN career_goal'))
+
+
+def _ensure_career_slugs(engine: Engine, career_columns: set[str]) -> None:
+    with engine.begin() as connection:
+        if 'slug' not in career_columns:
+            connection.execute(text("ALTER TABLE careers ADD COLUMN slug VARCHAR(120) NOT NULL DEFAULT ''"))
+            careers = connection.execute(text('SELECT id, name FROM careers')).all()
+            if careers:
+                connection.execute(
+                    text('UPDATE careers SET slug = :slug WHERE id = :id'),
+                    [{'id': career_id, 'slug': slugify_name(name)} for career_id, name in careers],
+                )
+        connection.execute(text('CREATE UNIQUE INDEX IF NOT EXISTS uq_careers_slug ON careers (slug)'))
+        connection.execute(text('CREATE INDEX IF NOT EXISTS ix_careers_name_lower ON careers (lower(name))'))
+
+
+def ensure_habits_schema(engine: Engine) -> None:
+    inspector = inspect(engine)
+    if not inspector.has_table('habits_assessment'):
+        return
+
+    assessment_columns = {column['name'] for column in inspector.get_columns('habits_assessment')}
+    with engine.begin() as connection:
+        if 'sealed_metrics' not in assessment_columns:
+            connection.execute(text('ALTER TABLE habits_assessment ADD COLUMN sealed_metrics BLOB'))
+        if 'productivity_score' not in assessment_columns:
+            connection.execute(text('ALTER TABLE habits_assessment ADD COLUMN productivity_score FLOAT'))
+        if 'productivity_model_version' not in assessment_columns:
+            connection.execute(
+                text('ALTER TABLE habits_assessment ADD COLUMN productivity_model_version VARCHAR(64)')
+            )
+
+        connection.execute(
+            text(
+                'CREATE INDEX IF NOT EXISTS ix_habits_assessment_productivity_model_version '
+                'ON habits_assessment (productivity_model_version)'
+            )
+        )
+        connection.execute(
+            text(
+                'CREATE INDEX IF NOT EXISTS ix_habits_assessment_updated_at_assessment_id '
+                'ON habits_assessment (updated_at, assessment_id)'
+            )
+        )
+
+    if inspector.has_table('habits_correlations'):
+        correlation_columns = {column['name'] for column in inspector.get_columns('habits_correlations')}
+        with engine.begin() as connection:
+            if 'snapshot_id' not in correlation_columns:
+                connection.execute(text('ALTER TABLE habits_correlations ADD COLUMN snapshot_id INTEGER'))
+            if 'segment_type' not in correlation_columns:
+                connection.execute(
+                    text("ALTER TABLE habits_correlations ADD COLUMN segment_type VARCHAR(20) NOT NULL DEFAULT 'all'")
+                )
+            if 'segment_value' not in correlation_columns:
+                connection.execute(
+                    text("ALTER TABLE habits_correlations ADD COLUMN segment_value VARCHAR(255) NOT NULL DEFAULT ''")
+                )
+            if 'method' not in correlation_columns:
+                connection.execute(
+                    text("ALTER TABLE habits_correlations ADD COLUMN method VARCHAR(30) NOT NULL DEFAULT 'pearson'")
+                )
+            if 'time_window' not in correlation_columns:
+                connection.execute(
+                    text("ALTER TABLE habits_correlations ADD COLUMN time_window VARCHAR(20) NOT NULL DEFAULT 'all'")
+                )
+            connection.execute(
+                text(
+                    'CREATE INDEX IF NOT EXISTS ix_habits_correlations_snapshot_id '
+                    'ON habits_correlations (snapshot_id)'
+                )
+            )
+            connection.execute(
+                text(
+                    'CREATE INDEX IF NOT EXISTS ix_habits_correlations_segment '
+                    'ON habits_correlations (segment_type, segment_value)'
+                )
+            )
@@ -0,0 +1,187 @@
+"""Process-wide registry of trained model artifacts.
+
+Each artifact is unpickled once (at startup through ``warm_up``) and served as an immutable
+``ModelHandle``. ``get`` stats the artifact file at most every ``model_reload_interval_seconds``;
+when a retrained artifact replaces it, one caller loads the new version while the others keep
+serving the current one, and the new handle is swapped in with a single reference assignment.
+"""
+
+import io
+import logging
+import time
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+from hashlib import sha256
+from pathlib import Path
+from threading import Lock
+
+import joblib
+
+from .compiled_model import CompiledLinearModel, compile_or_keep
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+ARTIFACTS_DIR = Path(__file__).resolve().parents[1] / 'artifacts'
+PRODUCTIVITY_MODEL = 'productivity'
+
+
+@dataclass(frozen=True)
+class ModelHandle:
+    name: str
+    path: Path
+    predictor: object
+    # sha256 of the artifact bytes; persisted next to every stored prediction.
+    checksum: str
+    generation: int
+    loaded_at: datetime
+    load_seconds: float
+    file_signature: tuple[int, int]
+
+    @property
+    def version(self) -> str:
+        return self.checksum
+
+
+@dataclass
+class _InferenceStats:
+    calls: int = 0
+    rows: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    lock: Lock = field(default_factory=Lock, repr=False)
+
+    def record(self, rows: int, seconds: float) -> None:
+        with self.lock:
+            self.calls += 1
+            self.rows += rows
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def snapshot(self) -> dict[str, float | int]:
+        with self.lock:
+            return {
+                'calls': self.calls,
+                'rows': self.rows,
+                'mean_call_ms': self.total_seconds / self.calls * 1000 if self.calls else 0.0,
+                'max_call_ms': self.max_seconds * 1000,
+                'mean_row_us': self.total_seconds / self.rows * 1e6 if self.rows else 0.0,
+            }
+
+
+def _file_signature(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ModelRegistry:
+    def __init__(self) -> None:
+        self._paths: dict[str, Path] = {}
+        self._handles: dict[str, ModelHandle] = {}
+        self._checked_at: dict[str, float] = {}
+        self._stats: dict[str, _InferenceStats] = {}
+        self._load_lock = Lock()
+
+    def register(self, name: str, path: Path) -> None:
+        self._paths[name] = path
+        self._stats.setdefault(name, _InferenceStats())
+
+    def get(self, name: str) -> ModelHandle | None:
+        now = time.monotonic()
+        checked_at = self._checked_at.get(name)
+        interval = get_settings().model_reload_interval_seconds
+        if checked_at is None or (interval >= 0 and now - checked_at >= interval):
+            self._checked_at[name] = now
+            return self.reload_if_changed(name, wait=name not in self._handles)
+        return self._handles.get(name)
+
+    def reload_if_changed(self, name: str, *, wait: bool = True) -> ModelHandle | None:
+        """Load the artifact when its file changed since the current handle was built.
+
+        With ``wait=False`` a caller that finds another thread already loading keeps the current handle.
+        """
+        current = self._handles.get(name)
+        path = self._paths[name]
+        signature = _file_signature(path)
+        if current is not None and signature == current.file_signature:
+            return current
+        if not self._load_lock.acquire(blocking=wait):
+            return current
+        try:
+            current = self._handles.get(name)
+            if current is not None and _file_signature(path) == current.file_signature:
+                return current
+            loaded = self._load(name, path, current)
+            if loaded is not None:
+                self._handles[name] = loaded
+            return self._handles.get(name)
+        finally:
+            self._load_lock.release()
+
+    def _load(self, name: str, path: Path, current: ModelHandle | None) -> ModelHandle | None:
+        signature = _file_signature(path)
+        if signature is None:
+            if current is None:
+                logger.warning('model.registry.not_found name=%s path=%s', name, path)
+            return None
+        started = time.perf_counter()
+        try:
+            artifact = path.read_bytes()
+            checksum = sha256(artifact).hexdigest()
+            if current is not None and checksum == current.checksum:
+                # Touched but unchanged: keep the loaded predictor, remember the new file signature.
+                return replace(current, file_signature=signature)
+            predictor = compile_or_keep(joblib.load(io.BytesIO(artifact)), path.name)
+        except Exception:
+            logger.exception('model.registry.load_failed name=%s path=%s', name, path)
+            return None
+        handle = ModelHandle(
+            name=name,
+            path=path,
+            predictor=predictor,
+            checksum=checksum,
+            generation=current.generation + 1 if current is not None else 1,
+            loaded_at=datetime.now(timezone.utc),
+            load_seconds=time.perf_counter() - started,
+            file_signature=signature,
+        )
+        logger.info(
+            'model.registry.loaded name=%s generation=%s checksum=%s load_ms=%.1f',
+            name,
+            handle.generation,
+            checksum[:12],
+            handle.load_seconds * 1000,
+        )
+        return handle
+
+    def warm_up(self) -> None:
+        for name in self._paths:
+            self.reload_if_changed(name)
+            self._checked_at[name] = time.monotonic()
+
+    def record_inference(self, name: str, rows: int, seconds: float) -> None:
+        self._stats[name].record(rows, seconds)
+
+    def stats(self) -> dict[str, dict[str, object]]:
+        report: dict[str, dict[str, object]] = {}
+        for name, path in self._paths.items():
+            handle = self._handles.get(name)
+            report[name] = {
+                'path': str(path),
+                'loaded': handle is not None,
+                'version': handle.version if handle else None,
+                'checksum': handle.checksum if handle else None,
+                'generation': handle.generation if handle else 0,
+                'compiled': handle is not None and isinstance(handle.predictor, CompiledLinearModel),
+                'loaded_at': handle.loaded_at.isoformat() if handle else None,
+                'load_ms': handle.load_seconds * 1000 if handle else None,
+                'inference': self._stats[name].snapshot(),
+            }
+        return report
+
+
+model_registry = ModelRegistry()
+model_registry.register(PRODUCTIVITY_MODEL, ARTIFACTS_DIR / 'linear_regression_best_model.pkl')
@@ -1,7 +1,8 @@
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 
 from sqlalchemy import (
     Boolean,
+    Date,
     DateTime,
     Float,
     ForeignKey,
@@ -11,12 +12,41 @@ from sqlalchemy import (
     String,
     Text,
     UniqueConstraint,
+    event,
+    func,
+    text,
 )
 from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.orm.attributes import flag_modified, set_committed_value
 from sqlalchemy.types import TypeDecorator
 
+from .career_catalog import slugify_name
+from .config import get_settings
 from .database import Base
-from .encryption import decrypt_number, encrypt_number
+from .encryption import decrypt_number, encrypt_number, seal_record, unseal_record
+
+# Field order of sealed record format version 1; append only.
+SEALED_METRIC_FIELDS = (
+    'study_hours',
+    'sleep_hours',
+    'phone_usage_hours',
+    'social_media_hours',
+    'gaming_hours',
+    'breaks_per_day',
+    'coffee_intake',
+    'exercise_minutes',
+    'stress_level',
+    'focus_score',
+    'attendance_percentage',
+    'assignments_completed_per_week',
+    'final_grade',
+)
+# Written to per-metric columns in sealed storage mode; the value lives in the row's sealed record.
+SEALED_PLACEHOLDER = b''
+
+
+def sealed_storage_enabled() -> bool:
+    return get_settings().habits_storage_mode == 'sealed'
 
 
 class EncryptedFloat(TypeDecorator[float]):
@@ -26,22 +56,58 @@ class EncryptedFloat(TypeDecorator[float]):
     def process_bind_param(self, value: float | None, dialect) -> bytes | None:  # type: ignore[override]
         if value is None:
             return None
+        if sealed_storage_enabled():
+            return SEALED_PLACEHOLDER
         return encrypt_number(float(value))
 
     def process_result_value(self, value: bytes | None, dialect) -> float | None:  # type: ignore[override]
-        if value is None:
+        if value is None or value == SEALED_PLACEHOLDER:
             return None
         return decrypt_number(value)
 
 
+class SealedMetrics(TypeDecorator[dict]):
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(  # type: ignore[override]
+        self,
+        value: dict[str, float | None] | None,
+        dialect,
+    ) -> bytes | None:
+        if value is None:
+            return None
+        return seal_record([value.get(name) for name in SEALED_METRIC_FIELDS])
+
+    def process_result_value(  # type: ignore[override]
+        self,
+        value: bytes | None,
+        dialect,
+    ) -> dict[str, float | None] | None:
+        if value is None:
+            return None
+        return dict(zip(SEALED_METRIC_FIELDS, unseal_record(value), strict=False))
+
+
 class Career(Base):
     __tablename__ = 'careers'
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(100), unique=True, nullable=False, index=True)
+    # URL key of ``/api/careers/{career_name}``; derived from the name on insert.
+    slug: Mapped[str] = mapped_column(
+        String(120),
+        nullable=False,
+        default=lambda context: slugify_name(context.get_current_parameters()['name']),
+    )
     description: Mapped[str] = mapped_column(Text, nullable=False)
 
 
+Index('uq_careers_slug', Career.slug, unique=True)
+# Case-insensitive name lookups.
+Index('ix_careers_name_lower', func.lower(Career.name))
+
+
 class SkillArea(Base):
     __tablename__ = 'skill_areas'
 
@@ -103,6 +169,21 @@ class SubjectResource(Base):
     provider: Mapped[str] = mapped_column(String(100), nullable=False)
 
 
+class CareerCatalogVersion(Base):
+    """Single row whose ``version`` changes whenever ``seed_career_metadata`` changes the catalog."""
+
+    __tablename__ = 'career_catalog_version'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[str] = mapped_column(String(32), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+
 class User(Base):
     __tablename__ = 'users'
 
@@ -134,6 +215,8 @@ class HabitsAssessment(Base):
     __tablename__ = 'habits_assessment'
     __table_args__ = (
         Index('ix_habits_assessment_user_id_created_at', 'user_id', 'created_at'),
+        Index('ix_habits_assessment_productivity_model_version', 'productivity_model_version'),
+        Index('ix_habits_assessment_updated_at_assessment_id', 'updated_at', 'assessment_id'),
     )
 
     assessment_id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
@@ -152,6 +235,9 @@ class HabitsAssessment(Base):
     assignments_completed_per_week: Mapped[float] = mapped_column(EncryptedFloat, nullable=False)
     final_grade: Mapped[float | None] = mapped_column(EncryptedFloat, nullable=True)
     grade_opt_in: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    sealed_metrics: Mapped[dict[str, float | None] | None] = mapped_column(SealedMetrics, nullable=True)
+    productivity_score: Mapped[float | None] = mapped_column(Float, nullable=True)
+    productivity_model_version: Mapped[str | None] = mapped_column(String(64), nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc),
@@ -166,11 +252,67 @@ class HabitsAssessment(Base):
     )
 
 
+@event.listens_for(HabitsAssessment, 'before_insert')
+@event.listens_for(HabitsAssessment, 'before_update')
+def _seal_assessment_metrics(mapper, connection, target: HabitsAssessment) -> None:
+    if sealed_storage_enabled():
+        target.sealed_metrics = {name: getattr(target, name) for name in SEALED_METRIC_FIELDS}
+    elif target.sealed_metrics is not None:
+        # Per-column mode writing a sealed row: move every value back into its own column.
+        target.sealed_metrics = None
+        for name in SEALED_METRIC_FIELDS:
+            flag_modified(target, name)
+
+
+@event.listens_for(HabitsAssessment, 'load')
+@event.listens_for(HabitsAssessment, 'refresh')
+def _unseal_assessment_metrics(target: HabitsAssessment, context, attrs=None) -> None:
+    sealed = target.__dict__.get('sealed_metrics')
+    if sealed is None:
+        return
+    for name, value in sealed.items():
+        if attrs is None or name in attrs:
+            set_committed_value(target, name, value)
+
+
+class HabitsCorrelationSnapshot(Base):
+    """One immutable, fully written set of correlation rows; readers use the newest committed one."""
+
+    __tablename__ = 'habits_correlation_snapshots'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    # Assessment count plus the last accumulator change the snapshot was computed from.
+    source_signature: Mapped[str] = mapped_column(String(100), nullable=False, index=True)
+    assessment_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    correlation_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+
 class HabitsCorrelation(Base):
     __tablename__ = 'habits_correlations'
-    __table_args__ = (Index('ix_habits_correlations_metric_performance', 'metric_name', 'performance_metric'),)
+    __table_args__ = (
+        Index('ix_habits_correlations_metric_performance', 'metric_name', 'performance_metric'),
+        Index('ix_habits_correlations_snapshot_id', 'snapshot_id'),
+        Index('ix_habits_correlations_segment', 'segment_type', 'segment_value'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    # NULL for rows written before snapshots existed.
+    snapshot_id: Mapped[int | None] = mapped_column(
+        ForeignKey('habits_correlation_snapshots.id', ondelete='CASCADE'),
+        nullable=True,
+    )
+    # 'all' for the whole population, otherwise the cohort dimension (course, year_level, career).
+    segment_type: Mapped[str] = mapped_column(String(20), nullable=False, default='all')
+    segment_value: Mapped[str] = mapped_column(String(255), nullable=False, default='')
+    # 'pearson', 'spearman' or 'partial_study_hours' (controlling for study hours).
+    method: Mapped[str] = mapped_column(String(30), nullable=False, default='pearson')
+    # 'all' for all-time, '<days>d' for a rolling window or 'decayed' for exponentially decayed sums.
+    time_window: Mapped[str] = mapped_column(String(20), nullable=False, default='all')
     metric_name: Mapped[str] = mapped_column(String(100), nullable=False)
     performance_metric: Mapped[str] = mapped_column(String(100), nullable=False)
     correlation_coefficient: Mapped[float] = mapped_column(Float, nullable=False)
@@ -191,6 +333,97 @@ class HabitsCorrelation(Base):
     )
 
 
+class HabitsCorrelationAccumulator(Base):
+    __tablename__ = 'habits_correlation_accumulators'
+    __table_args__ = (
+        UniqueConstraint(
+            'metric_name',
+            'performance_metric',
+            name='uq_habits_correlation_accumulators_metric_performance',
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    metric_name: Mapped[str] = mapped_column(String(100), nullable=False)
+    performance_metric: Mapped[str] = mapped_column(String(100), nullable=False)
+    sample_size: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    sum_x: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    sum_y: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    sum_x_squared: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    sum_y_squared: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    sum_xy: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+
+class HabitsSegmentAccumulator(Base):
+    """Per-cohort counterpart of ``HabitsCorrelationAccumulator``."""
+
+    __tablename__ = 'habits_segment_accumulators'
+    __table_args__ = (
+        UniqueConstraint(
+            'segment_type',
+            'segment_value',
+            'metric_name',
+            'performance_metric',
+            name='uq_habits_segment_accumulators_segment_pair',
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    segment_type: Mapped[str] = mapped_column(String(20), nullable=False)
+    segment_value: Mapped[str] = mapped_column(String(255), nullable=False)
+    metric_name: Mapped[str] = mapped_column(String(100), nullable=False)
+    performance_metric: Mapped[str] = mapped_column(String(100), nullable=False)
+    sample_size: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    sum_x: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    sum_y: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    sum_x_squared: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    sum_y_squared: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    sum_xy: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+
+class HabitsDailyAccumulator(Base):
+    """Per-day counterpart of ``HabitsCorrelationAccumulator``, bucketed by assessment creation date (UTC)."""
+
+    __tablename__ = 'habits_daily_accumulators'
+    __table_args__ = (
+        UniqueConstraint(
+            'bucket_date',
+            'metric_name',
+            'performance_metric',
+            name='uq_habits_daily_accumulators_day_pair',
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    bucket_date: Mapped[date] = mapped_column(Date, nullable=False)
+    metric_name: Mapped[str] = mapped_column(String(100), nullable=False)
+    performance_metric: Mapped[str] = mapped_column(String(100), nullable=False)
+    sample_size: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    sum_x: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    sum_y: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    sum_x_squared: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    sum_y_squared: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    sum_xy: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+
 class HabitsRecommendation(Base):
     __tablename__ = 'habits_recommendations'
     __table_args__ = (
@@ -248,3 +481,63 @@ class HabitsNormalizedExport(Base):
         default=lambda: datetime.now(timezone.utc),
         nullable=False,
     )
+
+
+class PipelineWatermark(Base):
+    """Position an incremental pipeline has processed up to, as an ``(updated_at, assessment_id)`` key."""
+
+    __tablename__ = 'pipeline_watermarks'
+
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    last_updated_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_assessment_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    rows_processed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+
+class BackgroundJob(Base):
+    __tablename__ = 'background_jobs'
+    __table_args__ = (
+        Index('ix_background_jobs_status_run_after', 'status', 'run_after'),
+        # At most one pending job per dedupe key; running jobs do not block a follow-up.
+        Index(
+            'uq_background_jobs_pending_dedupe_key',
+            'dedupe_key',
+            unique=True,
+            sqlite_where=text("status = 'pending'"),
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    job_type: Mapped[str] = mapped_column(String(100), nullable=False)
+    dedupe_key: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    payload: Mapped[str] = mapped_column(Text, nullable=False, default='{}')
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default='pending')
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=3)
+    run_after: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+    locked_by: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    locked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
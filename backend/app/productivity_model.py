@@ -1,17 +1,23 @@
 from __future__ import annotations
 
 import logging
-from functools import lru_cache
-from pathlib import Path
+import time
+from collections.abc import Sequence
 
-import joblib
+import numpy as np
 import pandas as pd
+from sqlalchemy import bindparam, or_, select, update
+from sqlalchemy.orm import Session
 
+from .config import get_settings
+from .habits_storage import AssessmentColumns
+from .jobs import enqueue_job, register_job_handler
+from .model_registry import PRODUCTIVITY_MODEL, ModelHandle, model_registry
 from .models import HabitsAssessment, User
 
 logger = logging.getLogger(__name__)
 
-MODEL_PATH = Path(__file__).resolve().parents[1] / 'artifacts' / 'linear_regression_best_model.pkl'
+BACKFILL_SCORES_JOB = 'productivity.backfill_scores'
 DEFAULT_AGE = 20
 DEFAULT_GENDER = 'Other'
 COFFEE_MG_PER_CUP = 95.0
@@ -29,16 +35,13 @@ YEAR_LEVEL_TO_AGE = {
 }
 
 
-@lru_cache(maxsize=1)
-def _load_pipeline():
-    if not MODEL_PATH.exists():
-        logger.warning('productivity.model.not_found path=%s', MODEL_PATH)
-        return None
-    try:
-        return joblib.load(MODEL_PATH)
-    except Exception:
-        logger.exception('productivity.model.load_failed path=%s', MODEL_PATH)
-        return None
+def _load_model() -> ModelHandle | None:
+    return model_registry.get(PRODUCTIVITY_MODEL)
+
+
+def current_model_version() -> str | None:
+    model = _load_model()
+    return model.version if model is not None else None
 
 
 def _infer_age(year_level: str | None) -> int:
@@ -71,16 +74,243 @@ def _model_input(assessment: HabitsAssessment, user: User) -> dict[str, object]:
     }
 
 
-def predict_productivity_score(assessment: HabitsAssessment, user: User) -> float | None:
-    pipeline = _load_pipeline()
-    if pipeline is None:
-        return None
+def _columns_model_input(columns: AssessmentColumns, ages: np.ndarray) -> pd.DataFrame:
+    """Column-wise equivalent of ``_model_input``; missing values stay NaN for the model's imputer."""
+    values = columns.values
+    return pd.DataFrame(
+        {
+            'age': ages,
+            'gender': [DEFAULT_GENDER] * len(columns),
+            'study_hours_per_day': values['study_hours'],
+            'sleep_hours': values['sleep_hours'],
+            'phone_usage_hours': values['phone_usage_hours'],
+            'social_media_hours': values['social_media_hours'],
+            'youtube_hours': values['social_media_hours'],
+            'gaming_hours': values['gaming_hours'],
+            'breaks_per_day': values['breaks_per_day'],
+            'coffee_intake_mg': values['coffee_intake'] * COFFEE_MG_PER_CUP,
+            'exercise_minutes': values['exercise_minutes'],
+            'assignments_completed': values['assignments_completed_per_week'],
+            'attendance_percentage': values['attendance_percentage'],
+            'stress_level': values['stress_level'],
+            'focus_score': values['focus_score'],
+            'final_grade': np.where(columns.grade_opt_in, values['final_grade'], np.nan),
+        }
+    )
+
 
+def predict_frame(model, frame: pd.DataFrame, row_ids: Sequence[object] = ()) -> np.ndarray:
+    """Predict every row of ``frame`` in one call; NaN marks rows that could not be scored.
+
+    When the batched call fails, rows are retried one at a time so a single bad row
+    only loses its own prediction.
+    """
+    if frame.empty:
+        return np.empty(0, dtype=np.float64)
     try:
-        features = _model_input(assessment, user)
-        frame = pd.DataFrame([features])
-        prediction = float(pipeline.predict(frame)[0])
-        return round(prediction, 2)
+        predictions = np.asarray(model.predict(frame), dtype=np.float64).reshape(-1)
     except Exception:
-        logger.exception('productivity.predict.failed assessment_id=%s user_id=%s', assessment.assessment_id, user.id)
-        return None
+        logger.warning('productivity.predict.batch_failed rows=%s retrying=row_by_row', len(frame))
+        predictions = np.full(len(frame), np.nan)
+        for position in range(len(frame)):
+            try:
+                predictions[position] = float(model.predict(frame.iloc[[position]])[0])
+            except Exception:
+                row_id = row_ids[position] if position < len(row_ids) else position
+                logger.exception('productivity.predict.failed row=%s', row_id)
+    predictions[~np.isfinite(predictions)] = np.nan
+    return predictions
+
+
+def _timed_predict(model: ModelHandle, frame: pd.DataFrame, row_ids: Sequence[object]) -> np.ndarray:
+    started = time.perf_counter()
+    predictions = predict_frame(model.predictor, frame, row_ids)
+    model_registry.record_inference(model.name, len(frame), time.perf_counter() - started)
+    return predictions
+
+
+def _score_pairs(pairs: Sequence[tuple[HabitsAssessment, User]]) -> list[float | None]:
+    scores: list[float | None] = [None] * len(pairs)
+    model = _load_model()
+    if model is None or not pairs:
+        return scores
+
+    positions: list[int] = []
+    rows: list[dict[str, object]] = []
+    for position, (assessment, user) in enumerate(pairs):
+        try:
+            rows.append(_model_input(assessment, user))
+        except (TypeError, ValueError):
+            logger.exception(
+                'productivity.features.failed assessment_id=%s user_id=%s',
+                assessment.assessment_id,
+                user.id,
+            )
+            continue
+        positions.append(position)
+
+    predictions = _timed_predict(
+        model,
+        pd.DataFrame(rows),
+        [pairs[position][0].assessment_id for position in positions],
+    )
+    for position, prediction in zip(positions, predictions.tolist(), strict=True):
+        if not np.isnan(prediction):
+            scores[position] = round(prediction, 2)
+    return scores
+
+
+def predict_productivity_scores(assessments: Sequence[HabitsAssessment], user: User) -> list[float | None]:
+    """Score a user's assessments with a single ``predict`` call, isolating rows that fail."""
+    return _score_pairs([(assessment, user) for assessment in assessments])
+
+
+def predict_productivity_score(assessment: HabitsAssessment, user: User) -> float | None:
+    return predict_productivity_scores([assessment], user)[0]
+
+
+def predict_productivity_scores_for_columns(db: Session, columns: AssessmentColumns) -> np.ndarray:
+    """Score decrypted assessment columns in one ``predict`` call; NaN where no score is available."""
+    model = _load_model()
+    if model is None or not len(columns):
+        return np.full(len(columns), np.nan)
+    year_levels = {user_id: year_level for user_id, year_level in db.execute(select(User.id, User.year_level))}
+    ages = np.array([_infer_age(year_levels.get(user_id)) for user_id in columns.user_ids.tolist()])
+    predictions = _timed_predict(model, _columns_model_input(columns, ages), columns.assessment_ids.tolist())
+    return np.round(predictions, 2)
+
+
+def productivity_scores_for_columns(db: Session, columns: AssessmentColumns) -> np.ndarray:
+    """Serve the stored scores of loaded columns; only rows scored by another model version are re-predicted.
+
+    Stale rows are scored in one ``predict`` call but not written back; ``backfill_productivity_scores``
+    persists them. Without a loaded model the stored scores are returned as they are.
+    """
+    if columns.productivity_scores is None or columns.productivity_model_versions is None:
+        return predict_productivity_scores_for_columns(db, columns)
+    scores = columns.productivity_scores.copy()
+    version = current_model_version()
+    if version is None:
+        return scores
+    stale = columns.productivity_model_versions != version
+    if stale.any():
+        scores[stale] = predict_productivity_scores_for_columns(db, columns.take(stale))
+        logger.info('productivity.columns.rescored rows=%s stored=%s', int(stale.sum()), int((~stale).sum()))
+    return scores
+
+
+def predict_user_productivity_scores_for_columns(columns: AssessmentColumns, user: User) -> np.ndarray:
+    """Score columns that all belong to ``user``, such as what-if variants of one assessment, in one call."""
+    model = _load_model()
+    if model is None or not len(columns):
+        return np.full(len(columns), np.nan)
+    ages = np.full(len(columns), _infer_age(user.year_level))
+    predictions = _timed_predict(model, _columns_model_input(columns, ages), columns.assessment_ids.tolist())
+    return np.round(predictions, 2)
+
+
+def store_productivity_score(assessment: HabitsAssessment, user: User) -> None:
+    """Score an assessment and stamp it with the producing model version before it is committed."""
+    assessment.productivity_score = predict_productivity_score(assessment, user)
+    assessment.productivity_model_version = current_model_version()
+
+
+def stored_productivity_scores(assessments: Sequence[HabitsAssessment], user: User) -> list[float | None]:
+    """Serve persisted scores; only rows that were never scored fall back to (batched) inference."""
+    scores = [assessment.productivity_score for assessment in assessments]
+    unscored = [index for index, assessment in enumerate(assessments) if assessment.productivity_model_version is None]
+    if unscored:
+        fresh = predict_productivity_scores([assessments[index] for index in unscored], user)
+        for index, score in zip(unscored, fresh, strict=True):
+            scores[index] = score
+    return scores
+
+
+def invalidate_productivity_scores(db: Session, user_id: int) -> None:
+    """Mark a user's stored scores stale, e.g. after a profile change that feeds the model.
+
+    Call ``enqueue_score_backfill`` once the change is committed so the rows are re-scored.
+    """
+    db.execute(
+        update(HabitsAssessment)
+        .where(HabitsAssessment.user_id == user_id)
+        .values(productivity_model_version=None, updated_at=HabitsAssessment.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def backfill_productivity_scores(db: Session, *, chunk_size: int = 500) -> int:
+    """Re-score assessments whose stored model version differs from the loaded model.
+
+    Rows are processed in primary-key chunks, each scored with one ``predict`` call and
+    committed on its own so the job can run while the API is serving traffic.
+    """
+    version = current_model_version()
+    if version is None:
+        logger.warning('productivity.backfill.skipped reason=model_unavailable')
+        return 0
+
+    table = HabitsAssessment.__table__
+    statement = (
+        update(table)
+        .where(table.c.assessment_id == bindparam('b_assessment_id'))
+        .values(
+            productivity_score=bindparam('b_productivity_score'),
+            productivity_model_version=version,
+            # Re-scoring does not change the assessment itself.
+            updated_at=table.c.updated_at,
+        )
+    )
+    rescored = 0
+    last_id = 0
+    while True:
+        pairs = [
+            (assessment, user)
+            for assessment, user in db.execute(
+                select(HabitsAssessment, User)
+                .join(User, User.id == HabitsAssessment.user_id)
+                .where(
+                    HabitsAssessment.assessment_id > last_id,
+                    or_(
+                        HabitsAssessment.productivity_model_version.is_(None),
+                        HabitsAssessment.productivity_model_version != version,
+                    ),
+                )
+                .order_by(HabitsAssessment.assessment_id)
+                .limit(chunk_size)
+            ).all()
+        ]
+        if not pairs:
+            break
+        scores = _score_pairs(pairs)
+        db.execute(
+            statement,
+            [
+                {'b_assessment_id': assessment.assessment_id, 'b_productivity_score': score}
+                for (assessment, _), score in zip(pairs, scores, strict=True)
+            ],
+        )
+        last_id = pairs[-1][0].assessment_id
+        db.commit()
+        for assessment, _ in pairs:
+            db.expunge(assessment)
+        rescored += len(pairs)
+        logger.info('productivity.backfill.chunk rows=%s last_assessment_id=%s', len(pairs), last_id)
+
+    logger.info('productivity.backfill.done rows=%s model_version=%s', rescored, version)
+    return rescored
+
+
+def enqueue_score_backfill(db: Session) -> None:
+    """Queue a backfill; invalidations and model swaps inside the coalescing window share one job."""
+    enqueue_job(
+        db,
+        BACKFILL_SCORES_JOB,
+        dedupe_key=BACKFILL_SCORES_JOB,
+        delay_seconds=get_settings().jobs_coalesce_seconds,
+    )
+
+
+@register_job_handler(BACKFILL_SCORES_JOB)
+def _run_backfill_scores_job(db: Session, payload: dict) -> None:
+    backfill_productivity_scores(db)
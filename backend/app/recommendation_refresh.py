@@ -0,0 +1,220 @@
+"""Regenerate habits recommendations for every user's latest assessment after a correlation refresh.
+
+Recommendations are otherwise only written at submit time, so advice drifts as correlations change.
+``refresh_recommendations`` finds each user's latest assessment in one query, decrypts the rule
+metrics column-wise a chunk at a time, ranks the whole chunk with ``RecommendationGenerator.rank``
+and reconciles the stored rows in bulk. A recommendation whose text and supporting metric are still
+produced keeps its row, and with it the user's feedback ``status``; only its rank and strength are
+updated. Rows that are no longer produced are deleted and new ones inserted.
+"""
+
+import logging
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from .habits_engine import (
+    ALL_TIME_WINDOW,
+    PEARSON,
+    RECOMMENDATION_REFRESH_JOB,
+    RecommendationGenerator,
+    latest_correlations,
+    latest_snapshot_id_subquery,
+    user_segments,
+)
+from .habits_storage import load_assessment_columns
+from .jobs import register_job_handler
+from .models import HabitsAssessment, HabitsCorrelation, HabitsRecommendation, User
+
+logger = logging.getLogger(__name__)
+
+RECOMMENDATION_REFRESH_CHUNK_SIZE = 500
+# Same cohort preference as the submit endpoint.
+COHORT_SEGMENT = 'course'
+
+
+@dataclass(frozen=True)
+class RecommendationRefreshReport:
+    assessments: int
+    inserted: int
+    updated: int
+    deleted: int
+    unchanged: int
+    seconds: float
+
+
+def latest_assessment_ids(db: Session) -> list[tuple[int, int]]:
+    """``(assessment_id, user_id)`` of every user's most recent assessment, in assessment id order."""
+    ranked = select(
+        HabitsAssessment.assessment_id,
+        HabitsAssessment.user_id,
+        func.row_number()
+        .over(
+            partition_by=HabitsAssessment.user_id,
+            order_by=(HabitsAssessment.created_at.desc(), HabitsAssessment.assessment_id.desc()),
+        )
+        .label('position'),
+    ).subquery()
+    return [
+        (assessment_id, user_id)
+        for assessment_id, user_id in db.execute(
+            select(ranked.c.assessment_id, ranked.c.user_id)
+            .where(ranked.c.position == 1)
+            .order_by(ranked.c.assessment_id.asc())
+        )
+    ]
+
+
+def _correlation_sets(db: Session) -> dict[str | None, list[HabitsCorrelation]]:
+    """Population correlations (key ``None``) and population merged with each published cohort."""
+    population = {(row.metric_name, row.performance_metric): row for row in latest_correlations(db)}
+    cohorts: dict[str, dict[tuple[str, str], HabitsCorrelation]] = defaultdict(dict)
+    for row in db.scalars(
+        select(HabitsCorrelation).where(
+            HabitsCorrelation.snapshot_id.is_not_distinct_from(latest_snapshot_id_subquery()),
+            HabitsCorrelation.segment_type == COHORT_SEGMENT,
+            HabitsCorrelation.method == PEARSON,
+            HabitsCorrelation.time_window == ALL_TIME_WINDOW,
+        )
+    ):
+        cohorts[row.segment_value][(row.metric_name, row.performance_metric)] = row
+    sets: dict[str | None, list[HabitsCorrelation]] = {None: list(population.values())}
+    for segment_value, rows in cohorts.items():
+        sets[segment_value] = list({**population, **rows}.values())
+    return sets
+
+
+def refresh_recommendations(
+    db: Session,
+    *,
+    chunk_size: int = RECOMMENDATION_REFRESH_CHUNK_SIZE,
+    progress: Callable[[int, int], None] | None = None,
+) -> RecommendationRefreshReport:
+    """Bring every user's latest recommendations in line with the newest correlation snapshot.
+
+    Each chunk is committed on its own; ``progress`` is called with ``(processed, total)`` after it.
+    """
+    started = time.perf_counter()
+    generator = RecommendationGenerator()
+    correlation_sets = _correlation_sets(db)
+    targets = latest_assessment_ids(db)
+    total = len(targets)
+    inserted = updated = deleted = unchanged = processed = 0
+
+    for offset in range(0, total, chunk_size):
+        chunk = targets[offset:offset + chunk_size]
+        assessment_ids = [assessment_id for assessment_id, _ in chunk]
+        columns = load_assessment_columns(db, generator.rules.metrics, assessment_ids=assessment_ids)
+        user_ids = {user_id for _, user_id in chunk}
+        users = {user.id: user for user in db.scalars(select(User).where(User.id.in_(user_ids)))}
+
+        # Rank each cohort's rows together; users outside a published cohort share the population set.
+        groups: dict[str | None, list[int]] = defaultdict(list)
+        for row, user_id in enumerate(columns.user_ids.tolist()):
+            user = users.get(user_id)
+            segment_value = user_segments(user).get(COHORT_SEGMENT) if user is not None else None
+            groups[segment_value if segment_value in correlation_sets else None].append(row)
+        desired: dict[int, list[tuple[str, str, float]]] = {}
+        for segment_value, rows in groups.items():
+            selected = np.asarray(rows, dtype=np.int64)
+            ranked = generator.rank(
+                {name: values[selected] for name, values in columns.values.items()},
+                correlation_sets[segment_value],
+            )
+            for row, recommendations in zip(rows, ranked, strict=True):
+                desired[int(columns.assessment_ids[row])] = recommendations
+
+        existing: dict[int, list[Row]] = defaultdict(list)
+        for row in db.execute(
+            select(
+                HabitsRecommendation.id,
+                HabitsRecommendation.assessment_id,
+                HabitsRecommendation.recommendation_text,
+                HabitsRecommendation.supporting_metric,
+                HabitsRecommendation.priority_rank,
+                HabitsRecommendation.correlation_strength,
+            ).where(HabitsRecommendation.assessment_id.in_(assessment_ids))
+        ):
+            existing[row.assessment_id].append(row)
+
+        now = datetime.now(timezone.utc)
+        stale_ids: list[int] = []
+        updates: list[dict] = []
+        inserts: list[dict] = []
+        user_by_assessment = dict(chunk)
+        for assessment_id, recommendations in desired.items():
+            current: dict[tuple[str, str], Row] = {}
+            for row in existing[assessment_id]:
+                key = (row.recommendation_text, row.supporting_metric)
+                if key in current:
+                    stale_ids.append(row.id)
+                else:
+                    current[key] = row
+            for rank, (text, metric, strength) in enumerate(recommendations, start=1):
+                row = current.pop((text, metric), None)
+                if row is None:
+                    inserts.append(
+                        {
+                            'assessment_id': assessment_id,
+                            'user_id': user_by_assessment[assessment_id],
+                            'recommendation_text': text,
+                            'supporting_metric': metric,
+                            'correlation_strength': strength,
+                            'priority_rank': rank,
+                            'status': 'pending',
+                            'created_at': now,
+                        }
+                    )
+                elif row.priority_rank != rank or row.correlation_strength != strength:
+                    updates.append({'id': row.id, 'priority_rank': rank, 'correlation_strength': strength})
+                else:
+                    unchanged += 1
+            stale_ids.extend(row.id for row in current.values())
+
+        if stale_ids:
+            db.execute(delete(HabitsRecommendation).where(HabitsRecommendation.id.in_(stale_ids)))
+        if updates:
+            db.execute(update(HabitsRecommendation), updates)
+        if inserts:
+            db.execute(insert(HabitsRecommendation), inserts)
+        db.commit()
+
+        inserted += len(inserts)
+        updated += len(updates)
+        deleted += len(stale_ids)
+        processed += len(chunk)
+        logger.info('habits.recommendations.refresh.progress processed=%s total=%s', processed, total)
+        if progress is not None:
+            progress(processed, total)
+
+    report = RecommendationRefreshReport(
+        assessments=total,
+        inserted=inserted,
+        updated=updated,
+        deleted=deleted,
+        unchanged=unchanged,
+        seconds=time.perf_counter() - started,
+    )
+    logger.info(
+        'habits.recommendations.refresh.finished assessments=%s inserted=%s updated=%s deleted=%s unchanged=%s '
+        'seconds=%.3f',
+        report.assessments,
+        report.inserted,
+        report.updated,
+        report.deleted,
+        report.unchanged,
+        report.seconds,
+    )
+    return report
+
+
+@register_job_handler(RECOMMENDATION_REFRESH_JOB)
+def _run_recommendation_refresh_job(db: Session, payload: dict) -> None:
+    refresh_recommendations(db, chunk_size=int(payload.get('chunk_size', RECOMMENDATION_REFRESH_CHUNK_SIZE)))
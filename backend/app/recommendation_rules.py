@@ -0,0 +1,222 @@
+"""Declarative habits recommendation rules, compiled into vectorized predicates.
+
+Each rule is one row of a table: an assessment metric, a comparator and threshold, an optional
+correlation gate, a text template and a priority. ``RECOMMENDATION_RULES`` is the built-in table;
+``AUTH_HABITS_RECOMMENDATION_RULES_PATH`` points at a JSON file with the same list of objects to
+replace it without a code change.
+
+``RuleSet.evaluate`` checks every rule against a whole block of assessments at once: rules that
+share a comparator are evaluated together as one broadcast comparison of the metric columns
+against their thresholds.
+"""
+
+import json
+import logging
+from collections.abc import Mapping
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from .config import get_settings
+from .models import SEALED_METRIC_FIELDS
+
+logger = logging.getLogger(__name__)
+
+COMPARATORS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+}
+DEFAULT_PRIORITY = 1
+
+# ``min_correlation`` gates a rule on the correlation of its metric with performance: a positive gate
+# needs r above it, a negative gate needs r below it, and no gate means the threshold alone decides.
+# Templates may use ``{value}`` (the assessment's value) and ``{threshold}``.
+RECOMMENDATION_RULES = [
+    {
+        'name': 'low_sleep',
+        'metric': 'sleep_hours',
+        'comparator': '<',
+        'threshold': 7,
+        'min_correlation': 0.4,
+        'text': 'Increase sleep to 7-8 hours per night for better focus and grades',
+    },
+    {
+        'name': 'high_phone_usage',
+        'metric': 'phone_usage_hours',
+        'comparator': '>',
+        'threshold': 4,
+        'min_correlation': -0.3,
+        'text': 'Reduce phone usage during study sessions - consider using app blockers',
+    },
+    {
+        'name': 'low_exercise',
+        'metric': 'exercise_minutes',
+        'comparator': '<',
+        'threshold': 30,
+        'min_correlation': 0.3,
+        'text': 'Add 30+ minutes of daily exercise to improve focus and energy levels',
+    },
+    {
+        'name': 'high_social_media',
+        'metric': 'social_media_hours',
+        'comparator': '>',
+        'threshold': 2,
+        'min_correlation': -0.3,
+        'text': 'Limit social media to 30-60 minutes daily during study breaks only',
+    },
+    {
+        'name': 'low_study_time',
+        'metric': 'study_hours',
+        'comparator': '<',
+        'threshold': 2,
+        'min_correlation': 0.3,
+        'text': 'Increase focused study time to 2-3 hours daily in consistent blocks',
+    },
+    # Rule-based mapping from PLAN.md section 4.1.
+    {
+        'name': 'high_stress',
+        'metric': 'stress_level',
+        'comparator': '>',
+        'threshold': 7,
+        'text': (
+            'Your stress level is {value:g}/10 - follow a stress management plan and a structured revision schedule'
+        ),
+    },
+    {
+        'name': 'phone_detox',
+        'metric': 'phone_usage_hours',
+        'comparator': '>',
+        'threshold': 6,
+        'text': 'Try a digital detox: keep your phone out of reach during study blocks and use Pomodoro timers',
+    },
+    {
+        'name': 'sleep_hygiene',
+        'metric': 'sleep_hours',
+        'comparator': '<',
+        'threshold': 6,
+        'text': 'Follow a sleep hygiene checklist: fixed bedtime, no screens an hour before sleep, 7-8 hours a night',
+    },
+    {
+        'name': 'attendance_risk',
+        'metric': 'attendance_percentage',
+        'comparator': '<',
+        'threshold': 75,
+        'priority': 2,
+        'text': 'Attendance of {value:g}% puts your grades at risk - aim for at least {threshold:g}%',
+    },
+    {
+        'name': 'weekly_planner',
+        'metric': 'assignments_completed_per_week',
+        'comparator': '<',
+        'threshold': 4,
+        'text': 'Use a weekly productivity planner to schedule assignments and track completion',
+    },
+]
+
+
+@dataclass(frozen=True)
+class RecommendationRule:
+    name: str
+    metric: str
+    comparator: str
+    threshold: float
+    text: str
+    min_correlation: float | None = None
+    priority: int = DEFAULT_PRIORITY
+
+    @classmethod
+    def from_dict(cls, definition: Mapping) -> 'RecommendationRule':
+        unknown = set(definition) - set(cls.__dataclass_fields__)
+        if unknown:
+            raise ValueError(f'Rule {definition.get("name")!r} has unknown fields {sorted(unknown)}')
+        rule = cls(**definition)
+        if rule.metric not in SEALED_METRIC_FIELDS:
+            raise ValueError(f'Rule {rule.name!r} uses unknown metric {rule.metric!r}')
+        if rule.comparator not in COMPARATORS:
+            raise ValueError(f'Rule {rule.name!r} uses unsupported comparator {rule.comparator!r}')
+        return rule
+
+    def passes_gate(self, correlation_coefficient: float | None) -> bool:
+        if self.min_correlation is None:
+            return True
+        if correlation_coefficient is None:
+            return False
+        if self.min_correlation >= 0:
+            return correlation_coefficient > self.min_correlation
+        return correlation_coefficient < self.min_correlation
+
+    def render(self, value: float) -> str:
+        return self.text.format(value=value, threshold=self.threshold)
+
+
+class RuleSet:
+    """A compiled rule table: per-comparator metric indexes and threshold vectors."""
+
+    def __init__(self, rules: list[RecommendationRule]) -> None:
+        self.rules = rules
+        self.metrics = tuple(dict.fromkeys(rule.metric for rule in rules))
+        self.priorities = np.array([rule.priority for rule in rules], dtype=np.int64)
+        metric_index = {metric: index for index, metric in enumerate(self.metrics)}
+        self._groups = []
+        for comparator, ufunc in COMPARATORS.items():
+            members = np.flatnonzero([rule.comparator == comparator for rule in rules])
+            if len(members):
+                self._groups.append(
+                    (
+                        ufunc,
+                        members,
+                        np.array([metric_index[rules[index].metric] for index in members], dtype=np.int64),
+                        np.array([rules[index].threshold for index in members], dtype=np.float64),
+                    )
+                )
+
+    @classmethod
+    def from_definitions(cls, definitions: list[Mapping]) -> 'RuleSet':
+        return cls([RecommendationRule.from_dict(definition) for definition in definitions])
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def evaluate(self, values: Mapping[str, np.ndarray]) -> np.ndarray:
+        """Rules x rows matrix of threshold hits; a missing (NaN) value never matches."""
+        columns = np.column_stack([np.asarray(values[metric], dtype=np.float64) for metric in self.metrics])
+        hits = np.zeros((len(self.rules), len(columns)), dtype=bool)
+        with np.errstate(invalid='ignore'):
+            for ufunc, members, metric_indexes, thresholds in self._groups:
+                hits[members] = ufunc(columns[:, metric_indexes], thresholds).T
+        return hits
+
+    def gates(self, correlation_by_metric: Mapping[str, float]) -> np.ndarray:
+        """Which rules are enabled by the current correlations (the same for every assessment)."""
+        return np.array([rule.passes_gate(correlation_by_metric.get(rule.metric)) for rule in self.rules], dtype=bool)
+
+
+def _file_signature(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@lru_cache(maxsize=4)
+def _compile(path: str, signature: tuple[int, int] | None) -> RuleSet:
+    if not path:
+        return RuleSet.from_definitions(RECOMMENDATION_RULES)
+    if signature is None:
+        logger.warning('recommendation.rules.not_found path=%s', path)
+        return RuleSet.from_definitions(RECOMMENDATION_RULES)
+    rules = RuleSet.from_definitions(json.loads(Path(path).read_text()))
+    logger.info('recommendation.rules.loaded path=%s rules=%s', path, len(rules))
+    return rules
+
+
+def load_recommendation_rules() -> RuleSet:
+    """The configured rule table, recompiled whenever the rules file changes."""
+    path = get_settings().habits_recommendation_rules_path
+    return _compile(path, _file_signature(Path(path)) if path else None)
+
@@ -0,0 +1,47 @@
+import logging
+from collections.abc import Iterator
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..deps import get_current_admin
+from ..habits_export import (
+    DEFAULT_EXPORT_CHUNK_SIZE,
+    MEDIA_TYPES,
+    ExportFormatUnavailableError,
+    ensure_export_format,
+    stream_normalized_exports,
+)
+from ..models import User
+
+router = APIRouter(prefix='/api/admin/exports', tags=['admin'])
+logger = logging.getLogger(__name__)
+
+
+def _stream_in_own_session(bind, export_format: str, chunk_size: int) -> Iterator[bytes]:
+    # The body is streamed after the handler returned, when the request-scoped session may be closed already.
+    with Session(bind=bind, autoflush=False) as export_db:
+        yield from stream_normalized_exports(export_db, export_format, chunk_size=chunk_size)
+
+
+@router.get('/habits-normalized')
+def export_habits_normalized(
+    export_format: Literal['csv', 'jsonl', 'parquet'] = Query('csv', alias='format'),
+    chunk_size: int = Query(DEFAULT_EXPORT_CHUNK_SIZE, ge=100, le=50000),
+    db: Session = Depends(get_db),
+    current_admin: User = Depends(get_current_admin),
+) -> StreamingResponse:
+    try:
+        ensure_export_format(export_format)
+    except ExportFormatUnavailableError as exc:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(exc)) from exc
+
+    logger.info('admin.export.start admin_user_id=%s format=%s', current_admin.id, export_format)
+    return StreamingResponse(
+        _stream_in_own_session(db.get_bind(), export_format, chunk_size),
+        media_type=MEDIA_TYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename="habits_normalized_exports.{export_format}"'},
+    )
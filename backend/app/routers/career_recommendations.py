@@ -1,7 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
-from ..career_services import get_user_career_aligned_recommendations, parse_simulation_metrics
+from ..career_services import (
+    expand_simulation_scenarios,
+    get_user_career_aligned_recommendations,
+    parse_simulation_metrics,
+    simulate_career_scenarios,
+)
 from ..database import get_db
 from ..deps import get_current_user
 from ..models import User
@@ -9,6 +14,10 @@ from ..schemas import (
     CareerAlignedRecommendationResponse,
     CareerAlignedRecommendationsListResponse,
     CareerResponse,
+    CareerSimulationRequest,
+    CareerSimulationResponse,
+    CareerSimulationScenarioResponse,
+    CareerSimulationSubjectResponse,
     SubjectResourceResponse,
 )
 
@@ -96,3 +105,44 @@ def get_career_aligned_recommendations(
         career=CareerResponse.model_validate(career) if career is not None else None,
         items=items,
     )
+
+
+@router.post(
+    '/{user_id}/recommendations/career-aligned/simulations',
+    response_model=CareerSimulationResponse,
+)
+def simulate_career_aligned_recommendations(
+    user_id: int,
+    payload: CareerSimulationRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> CareerSimulationResponse:
+    _validate_user_access(user_id, current_user)
+
+    scenarios, count = expand_simulation_scenarios(
+        grid={metric: axis.points() for metric, axis in payload.grid.items()} if payload.grid is not None else None,
+        scenarios=payload.scenarios,
+    )
+    simulation = simulate_career_scenarios(db, current_user, scenarios, count, limit=payload.limit)
+
+    return CareerSimulationResponse(
+        career=CareerResponse.model_validate(simulation.career) if simulation.career is not None else None,
+        baseline_productivity_score=simulation.baseline_productivity_score,
+        scenarios=[
+            CareerSimulationScenarioResponse(
+                metrics=scenario.metrics,
+                predicted_productivity_score=scenario.predicted_productivity_score,
+                items=[
+                    CareerSimulationSubjectResponse(
+                        subject_id=item.subject_id,
+                        subject_name=item.subject_name,
+                        weakness_score=item.weakness_score,
+                        baseline_weakness_score=item.baseline_weakness_score,
+                        gap_closure_percent=item.gap_closure_percent,
+                    )
+                    for item in scenario.items
+                ],
+            )
+            for scenario in simulation.scenarios
+        ],
+    )
@@ -1,5 +1,4 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from ..career_services import (
@@ -10,7 +9,7 @@ from ..career_services import (
 )
 from ..database import get_db
 from ..deps import get_current_user
-from ..models import CareerSkill, SkillArea, User
+from ..models import User
 from ..schemas import CareerResponse, CareerSkillAreaResponse, CareerSubjectResponse
 
 router = APIRouter(prefix='/api/careers', tags=['careers'])
@@ -73,19 +72,9 @@ def get_career_skill_subjects(
     if career is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Career not found')
 
-    skill_belongs_to_career = db.scalar(
-        select(CareerSkill).where(
-            CareerSkill.career_id == career.id,
-            CareerSkill.skill_area_id == skill_id,
-        )
-    )
-    if skill_belongs_to_career is None:
+    if skill_id not in career.skill_ids:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Skill not found for this career')
 
-    skill = db.scalar(select(SkillArea).where(SkillArea.id == skill_id))
-    if skill is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Skill not found')
-
     subjects = get_subjects_for_skill(db, skill_id, user_course=current_user.course)
     return [
         CareerSubjectResponse(
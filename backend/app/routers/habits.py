@@ -1,16 +1,28 @@
 import logging
 from datetime import datetime, timezone
+from typing import Literal
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy import func, select
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
 from ..database import get_db
 from ..deps import get_current_user
-from ..habits_engine import RecommendationGenerator, recompute_correlations
+from ..habits_engine import (
+    ALL_TIME_WINDOW,
+    PEARSON,
+    POPULATION_SEGMENT,
+    RecommendationGenerator,
+    cohort_correlations,
+    correlation_windows,
+    enqueue_correlation_recompute,
+    latest_correlations_query,
+    record_assessment_statistics,
+    user_segments,
+)
 from ..models import HabitsAssessment, HabitsCorrelation, HabitsRecommendation, User
-from ..productivity_model import predict_productivity_score
+from ..productivity_model import store_productivity_score, stored_productivity_scores
 from ..schemas import (
     HabitsAssessmentCreate,
     HabitsAssessmentHistoryResponse,
@@ -24,10 +36,17 @@ router = APIRouter(prefix='/api/habits', tags=['habits'])
 logger = logging.getLogger(__name__)
 
 
+def _assessment_responses(assessments: list[HabitsAssessment], user: User) -> list[HabitsAssessmentResponse]:
+    # Validate each row once from its attributes; the score is attached without a second validation.
+    scores = stored_productivity_scores(assessments, user)
+    return [
+        HabitsAssessmentResponse.model_validate(assessment).model_copy(update={'productivity_score': score})
+        for assessment, score in zip(assessments, scores, strict=True)
+    ]
+
+
 def _assessment_response(assessment: HabitsAssessment, user: User) -> HabitsAssessmentResponse:
-    payload = HabitsAssessmentResponse.model_validate(assessment).model_dump()
-    payload['productivity_score'] = predict_productivity_score(assessment, user)
-    return HabitsAssessmentResponse(**payload)
+    return _assessment_responses([assessment], user)[0]
 
 
 def _validate_user_access(user_id: int, current_user: User) -> None:
@@ -51,6 +70,7 @@ def submit_assessment(
     logger.info('habits.assessment.submit.start user_id=%s', user_id)
 
     assessment = HabitsAssessment(user_id=user_id, **payload.model_dump())
+    store_productivity_score(assessment, current_user)
     db.add(assessment)
     try:
         db.commit()
@@ -67,10 +87,16 @@ def submit_assessment(
         assessment.assessment_id,
     )
 
-    correlations = recompute_correlations(db)
-    if not correlations:
-        correlations = list(db.scalars(select(HabitsCorrelation)).all())
-    logger.info('habits.assessment.submit.correlations user_id=%s count=%s', user_id, len(correlations))
+    record_assessment_statistics(db, assessment)
+    # Correlations are refreshed by the job worker; recommendations use the latest stored set.
+    job = enqueue_correlation_recompute(db)
+    correlations = cohort_correlations(db, current_user)
+    logger.info(
+        'habits.assessment.submit.correlations user_id=%s count=%s recompute_job_id=%s',
+        user_id,
+        len(correlations),
+        job.id,
+    )
 
     generator = RecommendationGenerator()
     recommendations = generator.generate(assessment, correlations)
@@ -115,7 +141,7 @@ def get_assessment_history(
     page_size: int = Query(default=10, ge=1, le=100),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
-) -> HabitsAssessmentHistoryResponse:
+) -> Response:
     _validate_user_access(user_id, current_user)
     logger.info(
         'habits.assessment.history.start user_id=%s page=%s page_size=%s',
@@ -140,12 +166,15 @@ def get_assessment_history(
             .limit(page_size)
         ).all()
     )
-    return HabitsAssessmentHistoryResponse(
-        items=[_assessment_response(item, current_user) for item in items],
+    history = HabitsAssessmentHistoryResponse.model_construct(
+        items=_assessment_responses(items, current_user),
         page=page,
         page_size=page_size,
         total=total,
     )
+    # The items are already validated models; serialize once instead of letting the
+    # response_model dump and re-validate the whole page.
+    return Response(content=history.model_dump_json(), media_type='application/json')
 
 
 @router.get('/{user_id}/correlations', response_model=list[HabitsCorrelationResponse])
@@ -153,20 +182,37 @@ def get_correlations(
     user_id: int,
     min_abs_r: float = Query(default=0.3, ge=0, le=1),
     min_confidence: float = Query(default=95, ge=0, le=100),
+    segment: Literal['course', 'year_level', 'career'] | None = Query(default=None),
+    method: Literal['pearson', 'spearman', 'partial_study_hours'] = Query(default=PEARSON),
+    window: str = Query(default=ALL_TIME_WINDOW),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> list[HabitsCorrelationResponse]:
     _validate_user_access(user_id, current_user)
     logger.info(
-        'audit habits-correlations user_id=%s min_abs_r=%s min_confidence=%s',
+        'audit habits-correlations user_id=%s min_abs_r=%s min_confidence=%s segment=%s method=%s window=%s',
         user_id,
         min_abs_r,
         min_confidence,
+        segment,
+        method,
+        window,
     )
+    windows = correlation_windows()
+    if window not in windows:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'Unknown window; expected one of {", ".join(windows)}',
+        )
 
+    # A segment returns the correlations of the requesting student's own cohort.
+    segment_value = user_segments(current_user).get(segment) if segment else ''
+    if segment_value is None:
+        logger.info('habits.correlations.no_segment user_id=%s segment=%s', user_id, segment)
+        return []
     rows = list(
         db.scalars(
-            select(HabitsCorrelation).where(
+            latest_correlations_query(segment or POPULATION_SEGMENT, segment_value, method, window).where(
                 func.abs(HabitsCorrelation.correlation_coefficient) >= min_abs_r,
                 HabitsCorrelation.confidence_level >= min_confidence,
             )
@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 from ..database import get_db
 from ..deps import get_current_user
 from ..models import Career, User
+from ..productivity_model import enqueue_score_backfill, invalidate_productivity_scores
 from ..schemas import (
     CareerSelectionRequest,
     CareerSummaryResponse,
@@ -50,6 +51,10 @@ def update_profile(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> UserProfileResponse:
+    scores_invalidated = payload.year_level != current_user.year_level
+    if scores_invalidated:
+        # The productivity model derives age from the year level.
+        invalidate_productivity_scores(db, current_user.id)
     current_user.name = payload.name
     current_user.course = payload.course
     current_user.year_level = payload.year_level
@@ -64,6 +69,8 @@ def update_profile(
             detail='Unable to update profile',
         ) from exc
 
+    if scores_invalidated:
+        enqueue_score_backfill(db)
     return _profile_response_from_user(db, current_user)
 
 
@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from ..career_graph import get_career_graph
 from ..database import get_db
 from ..deps import get_current_user
-from ..models import Subject, SubjectResource, User
+from ..models import User
 from ..schemas import SubjectResourceResponse
 
 router = APIRouter(prefix='/api/resources', tags=['resources'])
@@ -18,15 +18,16 @@ def get_subject_resources(
 ) -> list[SubjectResourceResponse]:
     del current_user
 
-    subject = db.scalar(select(Subject).where(Subject.id == subject_id))
+    subject = get_career_graph(db).subjects_by_id.get(subject_id)
     if subject is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Subject not found')
 
-    resources = list(
-        db.scalars(
-            select(SubjectResource)
-            .where(SubjectResource.subject_id == subject_id)
-            .order_by(SubjectResource.id.asc())
-        ).all()
-    )
-    return [SubjectResourceResponse.model_validate(resource) for resource in resources]
+    return [
+        SubjectResourceResponse(
+            id=resource.id,
+            title=resource.title,
+            url=resource.url,
+            provider=resource.provider,
+        )
+        for resource in subject.resources
+    ]
@@ -1,8 +1,9 @@
+import math
 import re
 from datetime import datetime
 from typing import Literal
 
-from pydantic import BaseModel, ConfigDict, EmailStr, field_validator
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, FiniteFloat, field_validator, model_validator
 
 YEAR_LEVELS = ('Freshman', 'Sophomore', 'Junior', 'Senior')
 PASSWORD_POLICY_MESSAGE = (
@@ -156,6 +157,131 @@ class CareerAlignedRecommendationsListResponse(BaseModel):
     items: list[CareerAlignedRecommendationResponse]
 
 
+# Accepted range of each simulated metric, matching the career-aligned recommendation query parameters.
+SIMULATION_METRIC_BOUNDS: dict[str, tuple[float, float | None]] = {
+    'study_hours': (0, None),
+    'sleep_hours': (0, None),
+    'phone_usage_hours': (0, None),
+    'social_media_hours': (0, None),
+    'gaming_hours': (0, None),
+    'breaks_per_day': (0, None),
+    'coffee_intake': (0, None),
+    'exercise_minutes': (0, None),
+    'stress_level': (1, 10),
+    'focus_score': (0, 100),
+    'attendance_percentage': (0, 100),
+    'assignments_completed_per_week': (0, None),
+    'final_grade': (0, 100),
+}
+MAX_SIMULATION_SCENARIOS = 2000
+
+
+def _check_simulated_value(metric: str, value: float) -> None:
+    if metric not in SIMULATION_METRIC_BOUNDS:
+        raise ValueError(f'Unknown metric {metric!r}')
+    if not math.isfinite(value):
+        raise ValueError(f'{metric} must be a finite number')
+    low, high = SIMULATION_METRIC_BOUNDS[metric]
+    if value < low or (high is not None and value > high):
+        if high is None:
+            raise ValueError(f'{metric} cannot be below {low:g}')
+        raise ValueError(f'{metric} must be between {low:g} and {high:g}')
+
+
+class SimulationAxis(BaseModel):
+    """One grid dimension: explicit ``values`` or an inclusive ``start``/``stop`` range in ``step`` increments."""
+
+    values: list[FiniteFloat] | None = None
+    start: FiniteFloat | None = None
+    stop: FiniteFloat | None = None
+    step: FiniteFloat | None = None
+
+    @model_validator(mode='after')
+    def validate_axis(self) -> 'SimulationAxis':
+        if self.values is not None:
+            if self.start is not None or self.stop is not None or self.step is not None:
+                raise ValueError('Give either values or start/stop/step, not both')
+            if not self.values:
+                raise ValueError('values cannot be empty')
+            if len(self.values) > MAX_SIMULATION_SCENARIOS:
+                raise ValueError(f'An axis can have at most {MAX_SIMULATION_SCENARIOS} values')
+            return self
+        if self.start is None or self.stop is None or self.step is None:
+            raise ValueError('Give values or all of start, stop and step')
+        if self.step <= 0 or self.stop < self.start:
+            raise ValueError('step must be positive and stop must not be below start')
+        # A huge range or a tiny step overflows to inf, which cannot become a length.
+        steps = (self.stop - self.start) / self.step
+        if not math.isfinite(steps) or int(steps + 1e-9) + 1 > MAX_SIMULATION_SCENARIOS:
+            raise ValueError(f'An axis can have at most {MAX_SIMULATION_SCENARIOS} values')
+        return self
+
+    def __len__(self) -> int:
+        if self.values is not None:
+            return len(self.values)
+        # Tolerance so that e.g. 0-8 in 0.1 steps includes 8.
+        return int((self.stop - self.start) / self.step + 1e-9) + 1
+
+    def points(self) -> list[float]:
+        if self.values is not None:
+            return list(self.values)
+        return [round(self.start + self.step * index, 10) for index in range(len(self))]
+
+
+class CareerSimulationRequest(BaseModel):
+    """What-if scenarios: the cartesian product of ``grid`` axes, or an explicit list of ``scenarios``.
+
+    Metrics a scenario does not mention keep the latest assessment's value.
+    """
+
+    grid: dict[str, SimulationAxis] | None = None
+    scenarios: list[dict[str, FiniteFloat]] | None = None
+    limit: int = Field(default=3, ge=1, le=10)
+
+    @model_validator(mode='after')
+    def validate_scenarios(self) -> 'CareerSimulationRequest':
+        if (self.grid is None) == (self.scenarios is None):
+            raise ValueError('Give exactly one of grid or scenarios')
+        if self.grid is not None:
+            if not self.grid:
+                raise ValueError('grid needs at least one metric')
+            count = 1
+            for metric, axis in self.grid.items():
+                for value in (axis.values or [axis.start, axis.stop]):
+                    _check_simulated_value(metric, value)
+                count *= len(axis)
+                if count > MAX_SIMULATION_SCENARIOS:
+                    break
+        else:
+            for scenario in self.scenarios:
+                for metric, value in scenario.items():
+                    _check_simulated_value(metric, value)
+            count = len(self.scenarios)
+        if not 1 <= count <= MAX_SIMULATION_SCENARIOS:
+            raise ValueError(f'Between 1 and {MAX_SIMULATION_SCENARIOS} scenarios are allowed, got {count}')
+        return self
+
+
+class CareerSimulationSubjectResponse(BaseModel):
+    subject_id: int
+    subject_name: str
+    weakness_score: float
+    baseline_weakness_score: float
+    gap_closure_percent: float
+
+
+class CareerSimulationScenarioResponse(BaseModel):
+    metrics: dict[str, float]
+    predicted_productivity_score: float | None
+    items: list[CareerSimulationSubjectResponse]
+
+
+class CareerSimulationResponse(BaseModel):
+    career: CareerResponse | None = None
+    baseline_productivity_score: float | None
+    scenarios: list[CareerSimulationScenarioResponse]
+
+
 class HabitsAssessmentBase(BaseModel):
     study_hours: float
     sleep_hours: float
@@ -245,6 +371,11 @@ class HabitsCorrelationResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
     id: int
+    snapshot_id: int | None = None
+    segment_type: str = 'all'
+    segment_value: str = ''
+    method: str = 'pearson'
+    time_window: str = 'all'
     metric_name: str
     performance_metric: str
     correlation_coefficient: float
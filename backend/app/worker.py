@@ -0,0 +1,130 @@
+"""Background job worker: ``python -m app.worker``.
+
+Runs queued jobs (correlation recomputes enqueued by assessment submits, scheduled batches) and keeps
+the periodic jobs in ``PERIODIC_JOBS`` queued. When the loaded productivity model changes, it also
+queues a backfill of the stored scores. Several workers may run against the same database; job
+claiming is a compare-and-set on the job row.
+"""
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+# Importing registers the job handlers.
+from . import habits_engine, recommendation_refresh  # noqa: F401
+from .config import get_settings
+from .database import Base, SessionLocal, engine
+from .jobs import JOB_PENDING, JOB_RUNNING, JOB_SUCCEEDED, claim_next_job, enqueue_job, release_stale_jobs, run_job
+from .migrations import ensure_habits_schema
+from .model_registry import model_registry
+from .models import BackgroundJob
+from .productivity_model import current_model_version, enqueue_score_backfill
+
+logger = logging.getLogger(__name__)
+
+# job type -> (payload, interval between successful runs)
+PERIODIC_JOBS: dict[str, tuple[dict, timedelta]] = {
+    habits_engine.CORRELATION_BATCH_JOB: ({'cadence': 'weekly'}, timedelta(days=7)),
+    # Rolling-window correlations slide forward once a day even without new submits.
+    habits_engine.RECOMPUTE_CORRELATIONS_JOB: ({}, timedelta(days=1)),
+    habits_engine.NORMALIZED_EXPORT_JOB: ({}, timedelta(hours=1)),
+}
+
+
+def schedule_periodic_jobs(db: Session) -> None:
+    """Queue each periodic job whose interval elapsed since its last successful run."""
+    now = datetime.now(timezone.utc)
+    for job_type, (payload, interval) in PERIODIC_JOBS.items():
+        active = db.scalar(
+            select(func.count())
+            .select_from(BackgroundJob)
+            .where(BackgroundJob.job_type == job_type, BackgroundJob.status.in_((JOB_PENDING, JOB_RUNNING)))
+        )
+        if active:
+            continue
+        last_finished = db.scalar(
+            select(func.max(BackgroundJob.finished_at)).where(
+                BackgroundJob.job_type == job_type,
+                BackgroundJob.status == JOB_SUCCEEDED,
+            )
+        )
+        if last_finished is not None and last_finished.replace(tzinfo=timezone.utc) + interval > now:
+            continue
+        enqueue_job(db, job_type, payload, dedupe_key=job_type)
+
+
+class Worker:
+    def __init__(self, worker_id: str | None = None) -> None:
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+        self._stopping = False
+        # Model version the last score backfill was queued for; a new one (hot swap or restart) queues another.
+        self._backfilled_model_version: str | None = None
+
+    def stop(self, *_: object) -> None:
+        logger.info('worker.stopping worker_id=%s', self.worker_id)
+        self._stopping = True
+
+    def run_once(self) -> int:
+        """Release expired leases, schedule periodic jobs and drain every due job; returns jobs run."""
+        settings = get_settings()
+        processed = 0
+        with SessionLocal() as db:
+            release_stale_jobs(db, settings.jobs_lease_seconds)
+            schedule_periodic_jobs(db)
+            self._schedule_score_backfill(db)
+            while not self._stopping:
+                job = claim_next_job(db, self.worker_id)
+                if job is None:
+                    break
+                run_job(db, job, lease_seconds=settings.jobs_lease_seconds)
+                processed += 1
+        return processed
+
+    def _schedule_score_backfill(self, db: Session) -> None:
+        model_version = current_model_version()
+        if model_version is not None and model_version != self._backfilled_model_version:
+            enqueue_score_backfill(db)
+            self._backfilled_model_version = model_version
+
+    def run_forever(self) -> None:
+        poll_interval = get_settings().jobs_poll_interval_seconds
+        logger.info('worker.started worker_id=%s poll_interval=%s', self.worker_id, poll_interval)
+        while not self._stopping:
+            try:
+                processed = self.run_once()
+            except Exception:
+                logger.exception('worker.iteration_failed worker_id=%s', self.worker_id)
+                processed = 0
+            if not processed:
+                time.sleep(poll_interval)
+        logger.info('worker.stopped worker_id=%s', self.worker_id)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Run queued background jobs.')
+    parser.add_argument('--once', action='store_true', help='Drain due jobs and exit.')
+    parser.add_argument('--worker-id', default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s [%(name)s] %(message)s')
+    Base.metadata.create_all(bind=engine)
+    ensure_habits_schema(engine)
+    model_registry.warm_up()
+    worker = Worker(args.worker_id)
+    if args.once:
+        print(f'jobs run: {worker.run_once()}')
+        return
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""Re-score habits assessments whose stored productivity score came from another model version."""
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from app.database import SessionLocal
+from app.productivity_model import backfill_productivity_scores, current_model_version
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chunk-size', type=int, default=500)
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        rescored = backfill_productivity_scores(session, chunk_size=args.chunk_size)
+        print(f'assessments re-scored: {rescored} (model version {current_model_version()})')
+    finally:
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Compare the scalar and vectorized Pearson correlation paths on synthetic assessment data.
+
+Run with:
+    python scripts/benchmark_correlations.py --rows 100000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from app.habits_engine import METRIC_NAMES, PERFORMANCE_METRICS, PearsonCorrelationCalculator
+
+
+def _synthetic_matrices(rows: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(0, 12, size=(rows, len(METRIC_NAMES)))
+    y = np.column_stack(
+        [
+            x @ rng.normal(size=len(METRIC_NAMES)) + rng.normal(scale=5, size=rows),
+            rng.uniform(40, 100, size=rows),
+            x[:, METRIC_NAMES.index('assignments_completed_per_week')],
+        ]
+    )
+    # Roughly a third of students do not opt in to sharing their final grade.
+    y[rng.random(rows) < 0.35, PERFORMANCE_METRICS.index('final_grade')] = np.nan
+    return x, y
+
+
+def _scalar_pass(calculator: PearsonCorrelationCalculator, x: np.ndarray, y: np.ndarray) -> int:
+    computed = 0
+    for performance_index in range(y.shape[1]):
+        for metric_index in range(x.shape[1]):
+            x_values: list[float] = []
+            y_values: list[float] = []
+            for x_val, y_val in zip(x[:, metric_index].tolist(), y[:, performance_index].tolist(), strict=True):
+                if x_val != x_val or y_val != y_val:
+                    continue
+                x_values.append(x_val)
+                y_values.append(y_val)
+            if calculator.calculate(x_values, y_values) is not None:
+                computed += 1
+    return computed
+
+
+def _best_of(repeats: int, func) -> tuple[float, object]:
+    best = float('inf')
+    result = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    x, y = _synthetic_matrices(args.rows, args.seed)
+    calculator = PearsonCorrelationCalculator()
+
+    scalar_seconds, scalar_count = _best_of(args.repeats, lambda: _scalar_pass(calculator, x, y))
+    matrix_seconds, matrix = _best_of(args.repeats, lambda: calculator.calculate_matrix(x, y))
+    matrix_count = int(np.count_nonzero(~np.isnan(matrix.correlation_coefficient)))
+
+    print(f'rows={args.rows} pairs={x.shape[1] * y.shape[1]}')
+    print(f'scalar: {scalar_seconds * 1000:.1f} ms ({scalar_count} coefficients)')
+    print(f'matrix: {matrix_seconds * 1000:.1f} ms ({matrix_count} coefficients)')
+    print(f'speedup: {scalar_seconds / matrix_seconds:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Compare sklearn pipeline inference with the compiled weight-vector fast path.
+
+Run with:
+    python scripts/benchmark_productivity_model.py --rows 10000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from app.compiled_model import compile_linear_pipeline
+from train_productivity_models import fit_pipeline, load_dataset
+
+
+def _best_of(repeats: int, func) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--single-calls', type=int, default=200)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    x, y = load_dataset(ROOT_DIR / 'dataset' / 'productivity_dataset.csv')
+    pipeline = fit_pipeline(x, y)
+    compiled = compile_linear_pipeline(pipeline)
+    batch = pd.concat([x] * (args.rows // len(x) + 1), ignore_index=True).head(args.rows)
+    rows = batch.head(args.single_calls).to_dict('records')
+
+    max_error = float(np.max(np.abs(compiled.predict(batch) - pipeline.predict(batch))))
+    pipeline_single = _best_of(args.repeats, lambda: [pipeline.predict(pd.DataFrame([row])) for row in rows])
+    compiled_single = _best_of(
+        args.repeats,
+        lambda: [compiled.predict({name: [value] for name, value in row.items()}) for row in rows],
+    )
+    pipeline_batch = _best_of(args.repeats, lambda: pipeline.predict(batch))
+    compiled_batch = _best_of(args.repeats, lambda: compiled.predict(batch))
+
+    print(f'rows={args.rows} max_abs_error={max_error:.2e}')
+    print(
+        f'single row: pipeline {pipeline_single / len(rows) * 1e6:.0f} us, '
+        f'compiled {compiled_single / len(rows) * 1e6:.0f} us ({pipeline_single / compiled_single:.1f}x)'
+    )
+    print(
+        f'batch: pipeline {pipeline_batch * 1000:.1f} ms, '
+        f'compiled {compiled_batch * 1000:.1f} ms ({pipeline_batch / compiled_batch:.1f}x)'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -2,8 +2,14 @@
 
 from pathlib import Path
 import sqlite3
+import sys
 
 ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from app.career_catalog import slugify_name
+
 SQL_FILE = Path(__file__).resolve().with_name('create_career_module_tables.sql')
 DB_FILE = ROOT_DIR.parent / 'auth.db'
 
@@ -16,10 +22,23 @@ def _ensure_users_career_column(connection: sqlite3.Connection) -> None:
     connection.execute('CREATE INDEX IF NOT EXISTS ix_users_career_id ON users (career_id)')
 
 
+def _ensure_careers_slug_column(connection: sqlite3.Connection) -> None:
+    rows = connection.execute('PRAGMA table_info(careers)').fetchall()
+    if 'slug' not in {row[1] for row in rows}:
+        connection.execute("ALTER TABLE careers ADD COLUMN slug VARCHAR(120) NOT NULL DEFAULT ''")
+    careers = connection.execute("SELECT id, name FROM careers WHERE slug = ''").fetchall()
+    connection.executemany(
+        'UPDATE careers SET slug = ? WHERE id = ?',
+        [(slugify_name(name), career_id) for career_id, name in careers],
+    )
+    connection.execute('CREATE UNIQUE INDEX IF NOT EXISTS uq_careers_slug ON careers (slug)')
+
+
 def main() -> None:
     sql = SQL_FILE.read_text(encoding='utf-8')
     with sqlite3.connect(DB_FILE) as connection:
         connection.executescript(sql)
+        _ensure_careers_slug_column(connection)
         _ensure_users_career_column(connection)
     print('career module tables created')
 
@@ -6,6 +6,7 @@ CREATE TABLE IF NOT EXISTS schema_migrations (
 CREATE TABLE IF NOT EXISTS careers (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     name VARCHAR(100) NOT NULL UNIQUE,
+    slug VARCHAR(120) NOT NULL DEFAULT '',
     description TEXT NOT NULL
 );
 
@@ -51,7 +52,14 @@ CREATE TABLE IF NOT EXISTS subject_resources (
     FOREIGN KEY (subject_id) REFERENCES subjects(id) ON DELETE CASCADE
 );
 
+CREATE TABLE IF NOT EXISTS career_catalog_version (
+    id INTEGER PRIMARY KEY,
+    version VARCHAR(32) NOT NULL,
+    updated_at DATETIME NOT NULL
+);
+
 CREATE INDEX IF NOT EXISTS ix_careers_name ON careers(name);
+CREATE INDEX IF NOT EXISTS ix_careers_name_lower ON careers(lower(name));
 CREATE INDEX IF NOT EXISTS ix_skill_areas_name ON skill_areas(name);
 CREATE INDEX IF NOT EXISTS ix_career_skills_career_id ON career_skills(career_id);
 CREATE INDEX IF NOT EXISTS ix_career_skills_skill_area_id ON career_skills(skill_area_id);
@@ -63,3 +71,9 @@ CREATE INDEX IF NOT EXISTS ix_subject_resources_subject_id ON subject_resources(
 
 INSERT OR IGNORE INTO schema_migrations (version, applied_at)
 VALUES ('20260225_career_goal_module', CURRENT_TIMESTAMP);
+
+INSERT OR IGNORE INTO schema_migrations (version, applied_at)
+VALUES ('20261017_career_catalog_version', CURRENT_TIMESTAMP);
+
+INSERT OR IGNORE INTO schema_migrations (version, applied_at)
+VALUES ('20261017_career_slugs', CURRENT_TIMESTAMP);
@@ -20,13 +20,29 @@ CREATE TABLE IF NOT EXISTS habits_assessment (
     assignments_completed_per_week BLOB NOT NULL,
     final_grade BLOB NULL,
     grade_opt_in BOOLEAN NOT NULL DEFAULT 0,
+    sealed_metrics BLOB NULL,
+    productivity_score FLOAT NULL,
+    productivity_model_version VARCHAR(64) NULL,
     created_at DATETIME NOT NULL,
     updated_at DATETIME NOT NULL,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
+CREATE TABLE IF NOT EXISTS habits_correlation_snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source_signature VARCHAR(100) NOT NULL,
+    assessment_count INTEGER NOT NULL,
+    correlation_count INTEGER NOT NULL,
+    created_at DATETIME NOT NULL
+);
+
 CREATE TABLE IF NOT EXISTS habits_correlations (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
+    snapshot_id INTEGER NULL,
+    segment_type VARCHAR(20) NOT NULL DEFAULT 'all',
+    segment_value VARCHAR(255) NOT NULL DEFAULT '',
+    method VARCHAR(30) NOT NULL DEFAULT 'pearson',
+    time_window VARCHAR(20) NOT NULL DEFAULT 'all',
     metric_name VARCHAR(100) NOT NULL,
     performance_metric VARCHAR(100) NOT NULL,
     correlation_coefficient FLOAT NOT NULL,
@@ -36,7 +52,8 @@ CREATE TABLE IF NOT EXISTS habits_correlations (
     confidence_level FLOAT NOT NULL DEFAULT 95.0,
     p_value FLOAT NOT NULL,
     calculation_timestamp DATETIME NOT NULL,
-    created_at DATETIME NOT NULL
+    created_at DATETIME NOT NULL,
+    FOREIGN KEY (snapshot_id) REFERENCES habits_correlation_snapshots(id) ON DELETE CASCADE
 );
 
 CREATE TABLE IF NOT EXISTS habits_recommendations (
@@ -76,16 +93,118 @@ CREATE TABLE IF NOT EXISTS habits_normalized_exports (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
+CREATE TABLE IF NOT EXISTS habits_correlation_accumulators (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    metric_name VARCHAR(100) NOT NULL,
+    performance_metric VARCHAR(100) NOT NULL,
+    sample_size INTEGER NOT NULL DEFAULT 0,
+    sum_x FLOAT NOT NULL DEFAULT 0,
+    sum_y FLOAT NOT NULL DEFAULT 0,
+    sum_x_squared FLOAT NOT NULL DEFAULT 0,
+    sum_y_squared FLOAT NOT NULL DEFAULT 0,
+    sum_xy FLOAT NOT NULL DEFAULT 0,
+    updated_at DATETIME NOT NULL,
+    CONSTRAINT uq_habits_correlation_accumulators_metric_performance UNIQUE (metric_name, performance_metric)
+);
+
+CREATE TABLE IF NOT EXISTS habits_segment_accumulators (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    segment_type VARCHAR(20) NOT NULL,
+    segment_value VARCHAR(255) NOT NULL,
+    metric_name VARCHAR(100) NOT NULL,
+    performance_metric VARCHAR(100) NOT NULL,
+    sample_size INTEGER NOT NULL DEFAULT 0,
+    sum_x FLOAT NOT NULL DEFAULT 0,
+    sum_y FLOAT NOT NULL DEFAULT 0,
+    sum_x_squared FLOAT NOT NULL DEFAULT 0,
+    sum_y_squared FLOAT NOT NULL DEFAULT 0,
+    sum_xy FLOAT NOT NULL DEFAULT 0,
+    updated_at DATETIME NOT NULL,
+    CONSTRAINT uq_habits_segment_accumulators_segment_pair
+        UNIQUE (segment_type, segment_value, metric_name, performance_metric)
+);
+
+CREATE TABLE IF NOT EXISTS habits_daily_accumulators (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    bucket_date DATE NOT NULL,
+    metric_name VARCHAR(100) NOT NULL,
+    performance_metric VARCHAR(100) NOT NULL,
+    sample_size INTEGER NOT NULL DEFAULT 0,
+    sum_x FLOAT NOT NULL DEFAULT 0,
+    sum_y FLOAT NOT NULL DEFAULT 0,
+    sum_x_squared FLOAT NOT NULL DEFAULT 0,
+    sum_y_squared FLOAT NOT NULL DEFAULT 0,
+    sum_xy FLOAT NOT NULL DEFAULT 0,
+    updated_at DATETIME NOT NULL,
+    CONSTRAINT uq_habits_daily_accumulators_day_pair UNIQUE (bucket_date, metric_name, performance_metric)
+);
+
+CREATE TABLE IF NOT EXISTS background_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_type VARCHAR(100) NOT NULL,
+    dedupe_key VARCHAR(255) NULL,
+    payload TEXT NOT NULL DEFAULT '{}',
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_after DATETIME NOT NULL,
+    locked_by VARCHAR(100) NULL,
+    locked_at DATETIME NULL,
+    last_error TEXT NULL,
+    finished_at DATETIME NULL,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS pipeline_watermarks (
+    name VARCHAR(100) PRIMARY KEY,
+    last_updated_at DATETIME NULL,
+    last_assessment_id INTEGER NOT NULL DEFAULT 0,
+    rows_processed INTEGER NOT NULL DEFAULT 0,
+    updated_at DATETIME NOT NULL
+);
+
 CREATE INDEX IF NOT EXISTS ix_habits_assessment_user_id ON habits_assessment (user_id);
 CREATE INDEX IF NOT EXISTS ix_habits_assessment_created_at ON habits_assessment (created_at);
 CREATE INDEX IF NOT EXISTS ix_habits_assessment_user_id_created_at
     ON habits_assessment (user_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_habits_assessment_updated_at_assessment_id
+    ON habits_assessment (updated_at, assessment_id);
 CREATE INDEX IF NOT EXISTS ix_habits_recommendations_assessment_priority
     ON habits_recommendations (assessment_id, priority_rank);
 CREATE INDEX IF NOT EXISTS ix_habits_recommendations_user_id_created_at
     ON habits_recommendations (user_id, created_at);
 CREATE INDEX IF NOT EXISTS ix_habits_correlations_metric_performance
     ON habits_correlations (metric_name, performance_metric);
+CREATE INDEX IF NOT EXISTS ix_habits_correlation_snapshots_source_signature
+    ON habits_correlation_snapshots (source_signature);
+CREATE INDEX IF NOT EXISTS ix_background_jobs_status_run_after ON background_jobs (status, run_after);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_background_jobs_pending_dedupe_key
+    ON background_jobs (dedupe_key) WHERE status = 'pending';
 
 INSERT OR IGNORE INTO schema_migrations (version, applied_at)
 VALUES ('20260225_study_habits_assessment', CURRENT_TIMESTAMP);
+
+INSERT OR IGNORE INTO schema_migrations (version, applied_at)
+VALUES ('20261017_habits_correlation_accumulators', CURRENT_TIMESTAMP);
+
+INSERT OR IGNORE INTO schema_migrations (version, applied_at)
+VALUES ('20261017_habits_assessment_productivity_score', CURRENT_TIMESTAMP);
+
+INSERT OR IGNORE INTO schema_migrations (version, applied_at)
+VALUES ('20261017_background_jobs', CURRENT_TIMESTAMP);
+
+INSERT OR IGNORE INTO schema_migrations (version, applied_at)
+VALUES ('20261017_habits_correlation_snapshots', CURRENT_TIMESTAMP);
+
+INSERT OR IGNORE INTO schema_migrations (version, applied_at)
+VALUES ('20261017_pipeline_watermarks', CURRENT_TIMESTAMP);
+
+INSERT OR IGNORE INTO schema_migrations (version, applied_at)
+VALUES ('20261017_habits_segment_correlations', CURRENT_TIMESTAMP);
+
+INSERT OR IGNORE INTO schema_migrations (version, applied_at)
+VALUES ('20261017_habits_correlation_methods', CURRENT_TIMESTAMP);
+
+INSERT OR IGNORE INTO schema_migrations (version, applied_at)
+VALUES ('20261017_habits_correlation_windows', CURRENT_TIMESTAMP);
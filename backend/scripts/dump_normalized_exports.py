@@ -0,0 +1,39 @@
+"""Stream the normalized habits export table to a CSV, JSON lines or Parquet file."""
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from app.database import SessionLocal
+from app.habits_export import DEFAULT_EXPORT_CHUNK_SIZE, EXPORT_FORMATS, ensure_export_format, stream_normalized_exports
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+    parser.add_argument('--output', type=Path, default=None, help='Defaults to stdout.')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_EXPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+    ensure_export_format(args.format)
+
+    session = SessionLocal()
+    output = args.output.open('wb') if args.output else sys.stdout.buffer
+    try:
+        written = 0
+        for data in stream_normalized_exports(session, args.format, chunk_size=args.chunk_size):
+            output.write(data)
+            written += len(data)
+        if args.output:
+            print(f'wrote {written} bytes to {args.output}')
+    finally:
+        if args.output:
+            output.close()
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""Refresh normalized habits exports for assessments created or updated since the last run."""
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from app.database import SessionLocal
+from app.habits_engine import NORMALIZED_EXPORT_CHUNK_SIZE, export_normalized_assessments
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chunk-size', type=int, default=NORMALIZED_EXPORT_CHUNK_SIZE)
+    parser.add_argument('--full', action='store_true', help='Ignore the watermark and re-export every assessment.')
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        report = export_normalized_assessments(session, chunk_size=args.chunk_size, full=args.full)
+        print(
+            f'normalized exports written: {report.rows} in {report.chunks} chunks '
+            f'({report.seconds:.2f}s, {report.rows_per_second:.0f} rows/s)'
+        )
+    finally:
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
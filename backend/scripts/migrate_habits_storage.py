@@ -0,0 +1,36 @@
+"""Convert stored habits assessments between per-column and sealed-record storage.
+
+Set AUTH_HABITS_STORAGE_MODE to the target mode on every worker first, so new submissions are
+written in that format, then run this script to convert the existing rows in batches.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from app.database import SessionLocal, engine
+from app.habits_storage import STORAGE_MODES, convert_assessment_storage
+from app.migrations import ensure_habits_schema
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Convert habits assessments to another storage mode.')
+    parser.add_argument('--mode', choices=STORAGE_MODES, default='sealed')
+    parser.add_argument('--chunk-size', type=int, default=500)
+    args = parser.parse_args()
+
+    ensure_habits_schema(engine)
+    session = SessionLocal()
+    try:
+        converted = convert_assessment_storage(session, args.mode, chunk_size=args.chunk_size)
+        print(f'assessments converted to {args.mode} storage: {converted}')
+    finally:
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
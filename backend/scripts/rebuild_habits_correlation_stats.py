@@ -0,0 +1,25 @@
+"""Rebuild habits correlation accumulators from the raw assessment rows."""
+
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from app.database import SessionLocal
+from app.habits_engine import rebuild_correlation_accumulators, recompute_correlations
+
+
+def main() -> None:
+    session = SessionLocal()
+    try:
+        assessments = rebuild_correlation_accumulators(session)
+        correlations = recompute_correlations(session, force=True)
+        print(f'accumulators rebuilt from {assessments} assessments; correlation rows updated: {len(correlations)}')
+    finally:
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
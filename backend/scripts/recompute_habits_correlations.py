@@ -1,5 +1,6 @@
 """Run habits correlation recomputation batch job."""
 
+import argparse
 import sys
 from pathlib import Path
 
@@ -8,12 +9,21 @@ if str(ROOT_DIR) not in sys.path:
     sys.path.append(str(ROOT_DIR))
 
 from app.database import SessionLocal
-from app.habits_engine import run_correlation_batch
+from app.habits_engine import CORRELATION_BATCH_JOB, run_correlation_batch
+from app.jobs import enqueue_job
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description='Run the habits correlation batch.')
+    parser.add_argument('--enqueue', action='store_true', help='Queue the batch for the job worker instead.')
+    args = parser.parse_args()
+
     session = SessionLocal()
     try:
+        if args.enqueue:
+            job = enqueue_job(session, CORRELATION_BATCH_JOB, {'cadence': 'weekly'}, dedupe_key=CORRELATION_BATCH_JOB)
+            print(f'correlation batch queued as job {job.id}')
+            return
         rows = run_correlation_batch(session, cadence='weekly')
         print(f'correlation rows updated: {rows}')
     finally:
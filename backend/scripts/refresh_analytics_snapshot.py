@@ -0,0 +1,34 @@
+"""Build or incrementally refresh the memory-mapped analytics snapshot of habits assessments."""
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from app.analytics_snapshot import refresh_analytics_snapshot
+from app.database import SessionLocal
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--directory', type=Path, default=None, help='Defaults to AUTH_ANALYTICS_SNAPSHOT_DIR.')
+    parser.add_argument('--full', action='store_true', help='Rewrite a new generation instead of appending.')
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        refresh = refresh_analytics_snapshot(session, args.directory, full=args.full)
+        if refresh.rebuilt:
+            change = 'rebuilt'
+        else:
+            change = f'appended {refresh.appended}, patched {refresh.patched}'
+        print(f'snapshot generation {refresh.generation}: {refresh.rows} rows ({change}) in {refresh.seconds:.2f}s')
+    finally:
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""Regenerate habits recommendations for every user's latest assessment from the newest correlations."""
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from app.database import SessionLocal
+from app.recommendation_refresh import RECOMMENDATION_REFRESH_CHUNK_SIZE, refresh_recommendations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chunk-size', type=int, default=RECOMMENDATION_REFRESH_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        report = refresh_recommendations(
+            session,
+            chunk_size=args.chunk_size,
+            progress=lambda processed, total: print(f'{processed}/{total} assessments', flush=True),
+        )
+        print(
+            f'recommendations refreshed for {report.assessments} assessments: {report.inserted} inserted, '
+            f'{report.updated} re-ranked, {report.deleted} deleted, {report.unchanged} unchanged '
+            f'({report.seconds:.2f}s)'
+        )
+    finally:
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""Re-encrypt habits assessment values with the active keyring key.
+
+Rollout for a new key:
+    1. Add it to AUTH_HABITS_ENCRYPTION_KEYRING on every worker (e.g. "1:<base64 key>").
+    2. Point AUTH_HABITS_ENCRYPTION_ACTIVE_KEY_ID at it and restart workers.
+    3. Run this script; it rewrites rows in committed chunks while the API stays online.
+    4. Remove the retired key once the script reports nothing left to rewrite.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from app.database import SessionLocal
+from app.habits_storage import reencrypt_assessments
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Re-encrypt habits assessments with the active key.')
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--pause-seconds', type=float, default=0.0, help='Sleep between chunks to limit load.')
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        rewritten = reencrypt_assessments(session, chunk_size=args.chunk_size, pause_seconds=args.pause_seconds)
+        print(f'assessments re-encrypted: {rewritten}')
+    finally:
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
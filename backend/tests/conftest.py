@@ -1,5 +1,5 @@
 import sys
-from collections.abc import Generator
+from collections.abc import Callable, Generator
 from pathlib import Path
 
 import pytest
@@ -11,7 +11,9 @@ ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
+from app.config import get_settings
 from app.database import Base, get_db
+from app.encryption import get_keyring
 from app.main import app
 from app.rate_limiter import login_rate_limiter
 from app.career_services import seed_career_metadata
@@ -24,6 +26,29 @@ def clear_rate_limiter() -> Generator[None, None, None]:
     login_rate_limiter._store.clear()  # noqa: SLF001
 
 
+@pytest.fixture(autouse=True)
+def analytics_snapshot_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Generator[Path, None, None]:
+    directory = tmp_path / 'analytics_snapshot'
+    monkeypatch.setenv('AUTH_ANALYTICS_SNAPSHOT_DIR', str(directory))
+    get_settings.cache_clear()
+    yield directory
+    get_settings.cache_clear()
+
+
+@pytest.fixture
+def settings_env(monkeypatch: pytest.MonkeyPatch) -> Generator[Callable[..., None], None, None]:
+    def configure(**values: object) -> None:
+        for name, value in values.items():
+            monkeypatch.setenv(f'AUTH_{name.upper()}', str(value))
+        get_settings.cache_clear()
+        get_keyring.cache_clear()
+
+    yield configure
+    monkeypatch.undo()
+    get_settings.cache_clear()
+    get_keyring.cache_clear()
+
+
 @pytest.fixture
 def db_session(tmp_path: Path) -> Generator[Session, None, None]:
     db_file = tmp_path / 'test_auth.db'
@@ -0,0 +1,123 @@
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app import habits_engine
+from app.analytics_snapshot import SnapshotRefresh, open_analytics_snapshot, refresh_analytics_snapshot
+from app.habits_engine import METRIC_NAMES, export_normalized_assessments
+from app.models import HabitsAssessment, HabitsNormalizedExport, User
+
+
+def _create_user(db: Session) -> User:
+    user = User(
+        email='snapshot@example.com',
+        hashed_password='unused',
+        name='Snapshot User',
+        course='Computer Science',
+        year_level='Junior',
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _add_assessments(db: Session, user_id: int, study_hours: list[float]) -> list[HabitsAssessment]:
+    assessments = [
+        HabitsAssessment(
+            user_id=user_id,
+            grade_opt_in=index % 2 == 0,
+            final_grade=70.0 if index % 2 == 0 else None,
+            **{metric_name: 3.0 for metric_name in METRIC_NAMES},
+        )
+        for index in range(len(study_hours))
+    ]
+    for assessment, hours in zip(assessments, study_hours, strict=True):
+        assessment.study_hours = hours
+    db.add_all(assessments)
+    db.commit()
+    return assessments
+
+
+def _refresh(db: Session, directory: Path) -> SnapshotRefresh:
+    return refresh_analytics_snapshot(db, directory, settled_before=datetime.now(timezone.utc))
+
+
+def test_snapshot_appends_new_rows_and_patches_updated_ones_in_place(db_session: Session, tmp_path: Path) -> None:
+    user = _create_user(db_session)
+    assessments = _add_assessments(db_session, user.id, [0.0, 6.0, 12.0, 3.0])
+
+    first = _refresh(db_session, tmp_path)
+    assert (first.generation, first.rows, first.rebuilt) == (1, 4, True)
+    assert _refresh(db_session, tmp_path).appended == 0
+
+    _add_assessments(db_session, user.id, [9.0, 1.5])
+    assessments[0].study_hours = 12.0
+    # Score backfills keep updated_at, so the score is synced from the stored column.
+    db_session.execute(
+        update(HabitsAssessment)
+        .where(HabitsAssessment.assessment_id == assessments[1].assessment_id)
+        .values(productivity_score=42.0, updated_at=HabitsAssessment.updated_at)
+    )
+    db_session.commit()
+    second = _refresh(db_session, tmp_path)
+    assert (second.generation, second.rows, second.appended, second.patched, second.rebuilt) == (1, 6, 2, 2, False)
+
+    snapshot = open_analytics_snapshot(tmp_path)
+    assert snapshot is not None and len(snapshot) == 6
+    assert isinstance(snapshot.columns['study_hours'], np.memmap)
+    np.testing.assert_allclose(snapshot.columns['study_hours'], [1.0, 0.5, 1.0, 0.25, 0.75, 0.125])
+    assert np.isnan(snapshot.columns['final_grade'][1::2]).all()
+    assert snapshot.columns['productivity_score'][1] == 42.0
+    assert snapshot.matrix(['study_hours', 'sleep_hours']).shape == (6, 2)
+    assert sorted(path.name for path in tmp_path.glob('gen-*')) == ['gen-000001']
+
+    ids = snapshot.columns['assessment_id']
+    np.testing.assert_array_equal(snapshot.positions(np.array([ids[4], ids[0], 10_000])), [4, 0, -1])
+
+
+def test_snapshot_rewrites_a_generation_after_deletes(db_session: Session, tmp_path: Path) -> None:
+    user = _create_user(db_session)
+    assessments = _add_assessments(db_session, user.id, [0.0, 6.0, 12.0])
+    _refresh(db_session, tmp_path)
+
+    db_session.delete(assessments[1])
+    db_session.commit()
+    refresh = _refresh(db_session, tmp_path)
+    assert (refresh.generation, refresh.rows, refresh.rebuilt) == (2, 2, True)
+    assert sorted(path.name for path in tmp_path.glob('gen-*')) == ['gen-000002']
+    snapshot = open_analytics_snapshot(tmp_path)
+    assert snapshot is not None
+    np.testing.assert_allclose(snapshot.columns['study_hours'], [0.0, 1.0])
+
+
+def test_normalized_export_reads_the_snapshot_instead_of_decrypting(
+    db_session: Session,
+    analytics_snapshot_dir: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    user = _create_user(db_session)
+    assessments = _add_assessments(db_session, user.id, [0.0, 6.0, 12.0])
+    assert export_normalized_assessments(db_session, settle_seconds=0).rows == 3
+
+    def _no_decrypt(*args: object, **kwargs: object) -> None:
+        raise AssertionError('the exporter should read the snapshot')
+
+    monkeypatch.setattr(habits_engine, 'load_assessment_columns', _no_decrypt)
+    assessments[2].study_hours = 3.0
+    db_session.commit()
+    assert export_normalized_assessments(db_session, full=True, settle_seconds=0).rows == 3
+
+    exported = dict(
+        db_session.execute(select(HabitsNormalizedExport.assessment_id, HabitsNormalizedExport.study_hours)).all()
+    )
+    assert exported == pytest.approx(
+        {assessments[0].assessment_id: 0.0, assessments[1].assessment_id: 0.5, assessments[2].assessment_id: 0.25}
+    )
+    # Missing metrics stay NaN in the snapshot but are exported as 0, as before.
+    final_grades = db_session.scalars(select(HabitsNormalizedExport.final_grade)).all()
+    assert sorted(final_grades) == pytest.approx([0.0, 0.7, 0.7])
+    assert open_analytics_snapshot(analytics_snapshot_dir) is not None
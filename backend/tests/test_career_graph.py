@@ -0,0 +1,105 @@
+from pathlib import Path
+
+from sqlalchemy import create_engine, delete, select, text
+from sqlalchemy.orm import Session
+
+from app.career_graph import catalog_version, get_career_graph
+from app.career_services import resolve_career_by_name, seed_career_metadata
+from app.migrations import ensure_career_schema
+from app.models import Career, CareerCatalogVersion, Subject, SubjectResource
+
+
+def test_career_graph_indexes_catalog(db_session: Session) -> None:
+    graph = get_career_graph(db_session)
+
+    assert [career.name for career in graph.careers] == sorted(career.name for career in graph.careers)
+    developer = graph.resolve('software-developer')
+    assert developer is not None
+    assert graph.resolve('Software Developer') is developer
+    assert [skill.name for skill in developer.skills] == [
+        'Algorithms',
+        'Data Structures',
+        'Databases',
+        'Programming',
+        'System Design',
+    ]
+
+    programming = next(skill for skill in developer.skills if skill.name == 'Programming')
+    links = {link.subject.name: link for link in programming.subjects}
+    assert links['Software Development'].relevance_indicator == 'critical'
+    assert links['Software Development'].relevance_weight == 1.0
+    assert links['Computer Science'].relevance_weight == 0.8
+    assert [resource.title for resource in links['Computer Science'].subject.resources] == [
+        'Harvard CS50',
+        'Teach Yourself CS Guide',
+    ]
+
+
+def test_career_graph_is_shared_until_catalog_is_reseeded(db_session: Session) -> None:
+    graph = get_career_graph(db_session)
+    assert get_career_graph(db_session) is graph
+    version = catalog_version(db_session)
+    assert graph.version == version is not None
+
+    seed_career_metadata(db_session)
+    assert catalog_version(db_session) == version
+    assert get_career_graph(db_session) is graph
+
+    subject_id = db_session.scalar(select(Subject.id).where(Subject.name == 'Computer Science'))
+    db_session.execute(delete(SubjectResource).where(SubjectResource.subject_id == subject_id))
+    db_session.commit()
+    # Re-seeding restores the resources and stamps a new version, which invalidates the graph.
+    seed_career_metadata(db_session)
+    assert catalog_version(db_session) != version
+    rebuilt = get_career_graph(db_session)
+    assert rebuilt is not graph
+    assert len(rebuilt.subjects_by_id[subject_id].resources) == 2
+
+
+def test_career_graph_without_a_catalog_version_is_built_once(db_session: Session) -> None:
+    db_session.execute(delete(CareerCatalogVersion))
+    db_session.commit()
+
+    graph = get_career_graph(db_session)
+    assert graph.version is None
+    assert get_career_graph(db_session) is graph
+
+    # Seeding stamps the missing version, which invalidates the unversioned graph.
+    seed_career_metadata(db_session)
+    assert catalog_version(db_session) is not None
+    assert get_career_graph(db_session) is not graph
+
+
+def test_resolve_career_by_slug_and_name_falls_back_to_indexed_lookup(db_session: Session) -> None:
+    assert resolve_career_by_name(db_session, ' DATA-analyst ').name == 'Data Analyst'
+    assert resolve_career_by_name(db_session, 'data analyst').slug == 'data-analyst'
+    assert resolve_career_by_name(db_session, 'astronaut') is None
+
+    # Inserted without re-seeding: the graph does not know it yet, the slug index does.
+    db_session.add(Career(name='Marine Biologist', description='Study ocean ecosystems.'))
+    db_session.commit()
+    career = resolve_career_by_name(db_session, 'marine-biologist')
+    assert career is not None
+    assert career.slug == 'marine-biologist'
+    assert get_career_graph(db_session).resolve('Marine Biologist') is career
+
+
+def test_career_schema_backfills_slugs_and_indexes(tmp_path: Path) -> None:
+    engine = create_engine(f'sqlite:///{tmp_path / "legacy.db"}')
+    with engine.begin() as connection:
+        connection.execute(
+            text('CREATE TABLE careers (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, description TEXT NOT NULL)')
+        )
+        connection.execute(text("INSERT INTO careers (name, description) VALUES ('Data Analyst', 'Analyze data.')"))
+
+    ensure_career_schema(engine)
+
+    with engine.connect() as connection:
+        assert connection.execute(text('SELECT slug FROM careers')).scalar_one() == 'data-analyst'
+        slug_plan = connection.execute(text("EXPLAIN QUERY PLAN SELECT id FROM careers WHERE slug = 'x'")).all()
+        name_plan = connection.execute(
+            text("EXPLAIN QUERY PLAN SELECT id FROM careers WHERE lower(name) = 'x'")
+        ).all()
+    assert 'uq_careers_slug' in slug_plan[0][-1]
+    assert 'ix_careers_name_lower' in name_plan[0][-1]
+    engine.dispose()
@@ -1,4 +1,24 @@
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app import productivity_model
+from app.career_catalog import SKILL_METRIC_RULES
+from app.career_graph import get_career_graph
+from app.career_services import (
+    NORMALIZATION_RANGES,
+    _matching_fields,
+    _rank_career_subjects,
+    course_fields,
+    course_matches_field,
+)
+from app.model_registry import PRODUCTIVITY_MODEL, ModelHandle
 
 REGISTRATION_PAYLOAD = {
     'email': 'career-reco@example.com',
@@ -111,3 +131,171 @@ def test_career_aligned_recommendations_include_resources_and_simulation_gap_clo
     simulated_items = simulated.json()['items']
     assert simulated_items
     assert any(item['gap_closure_percent'] >= 0 for item in simulated_items)
+
+
+def _reference_weakness(values: dict[str, float], skill_name: str) -> float:
+    rules = SKILL_METRIC_RULES.get(skill_name)
+    if not rules:
+        return 0.5
+    total = weight_sum = 0.0
+    for rule in rules:
+        low, high = NORMALIZATION_RANGES[rule.metric_name]
+        normalized = (min(max(values[rule.metric_name], low), high) - low) / (high - low)
+        total += ((1 - normalized) if rule.higher_is_better else normalized) * rule.weight
+        weight_sum += rule.weight
+    return total / weight_sum
+
+
+def test_vectorized_subject_scores_match_per_link_scoring(db_session: Session) -> None:
+    rng = np.random.default_rng(7)
+    graph = get_career_graph(db_session)
+    for career in graph.careers:
+        for user_course in ('', 'Computer Science'):
+            stored = {metric: float(rng.uniform(low, high)) for metric, (low, high) in NORMALIZATION_RANGES.items()}
+            simulated = {'study_hours': 9.0, 'focus_score': 95.0}
+            expected: dict[int, tuple[float, float]] = {}
+            for skill in career.skills:
+                current = _reference_weakness({**stored, **simulated}, skill.name)
+                baseline = _reference_weakness(stored, skill.name)
+                for link in skill.subjects:
+                    if user_course and not course_matches_field(user_course, link.subject.field_of_study):
+                        continue
+                    weight = skill.importance_weight * link.relevance_weight
+                    previous = expected.get(link.subject.id, (0.0, 0.0))
+                    expected[link.subject.id] = (
+                        max(previous[0], current * weight),
+                        max(previous[1], baseline * weight),
+                    )
+
+            ranked = _rank_career_subjects(
+                career,
+                SimpleNamespace(assessment_id=1, user_id=1, grade_opt_in=False, **stored),
+                fields=course_fields(graph, user_course),
+                simulated_metrics=simulated,
+                limit=3,
+            )
+            top = sorted(expected.values(), reverse=True)[:3]
+            assert [item.weakness_score for item in ranked] == [round(current, 4) for current, _ in top]
+            for item in ranked:
+                assert item.baseline_weakness_score == round(expected[item.subject_id][1], 4)
+
+
+def test_course_fields_are_resolved_once_per_course(db_session: Session) -> None:
+    graph = get_career_graph(db_session)
+    _matching_fields.cache_clear()
+
+    assert course_fields(graph, '') is None
+    fields = course_fields(graph, 'Computer Science')
+    assert fields == {'Computer Science', 'Data Science', 'General'}
+    expected = {field for field in graph.fields_of_study if course_matches_field('Computer Science', field)}
+    assert fields == expected
+    assert course_fields(graph, '  computer science ') is fields
+    assert _matching_fields.cache_info().misses == 1
+
+
+class _PhoneSleepModel:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def predict(self, frame: pd.DataFrame) -> np.ndarray:
+        self.calls += 1
+        return 50 - 2 * frame['phone_usage_hours'].to_numpy() + frame['sleep_hours'].to_numpy()
+
+
+def test_simulation_grid_scores_every_scenario_in_one_pass(
+    client: TestClient,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    headers, user_id = register_and_get_auth(client, REGISTRATION_PAYLOAD)
+    select_software_developer_career(client, headers)
+    assert client.post(f'/api/habits/{user_id}/assessment', json=ASSESSMENT_PAYLOAD, headers=headers).status_code == 201
+
+    model = _PhoneSleepModel()
+    handle = ModelHandle(
+        name=PRODUCTIVITY_MODEL,
+        path=Path('unused.pkl'),
+        predictor=model,
+        checksum='grid',
+        generation=1,
+        loaded_at=datetime.now(timezone.utc),
+        load_seconds=0.0,
+        file_signature=(0, 0),
+    )
+    monkeypatch.setattr(productivity_model, '_load_model', lambda: handle)
+
+    response = client.post(
+        f'/api/users/{user_id}/recommendations/career-aligned/simulations',
+        json={
+            'grid': {
+                'phone_usage_hours': {'start': 0, 'stop': 8, 'step': 0.5},
+                'sleep_hours': {'values': [5, 6, 7, 8, 9]},
+            },
+            'limit': 3,
+        },
+        headers=headers,
+    )
+    assert response.status_code == 200
+    payload = response.json()
+    assert model.calls == 1
+    assert payload['career']['name'] == 'Software Developer'
+    assert payload['baseline_productivity_score'] == 50 - 2 * 8 + 5
+
+    scenarios = payload['scenarios']
+    assert len(scenarios) == 17 * 5
+    assert scenarios[0]['metrics'] == {'phone_usage_hours': 0.0, 'sleep_hours': 5.0}
+    assert scenarios[-1]['metrics'] == {'phone_usage_hours': 8.0, 'sleep_hours': 9.0}
+    for scenario in scenarios:
+        metrics = scenario['metrics']
+        expected_score = 50 - 2 * metrics['phone_usage_hours'] + metrics['sleep_hours']
+        assert scenario['predicted_productivity_score'] == expected_score
+        assert 1 <= len(scenario['items']) <= 3
+
+    # Each scenario matches the single-scenario endpoint with the same overrides.
+    single = client.get(
+        f'/api/users/{user_id}/recommendations/career-aligned?phone_usage_hours=1.5&sleep_hours=8',
+        headers=headers,
+    ).json()['items']
+    scenario = next(item for item in scenarios if item['metrics'] == {'phone_usage_hours': 1.5, 'sleep_hours': 8.0})
+    assert [(item['weakness_score'], item['gap_closure_percent']) for item in scenario['items']] == [
+        (item['weakness_score'], item['gap_closure_percent']) for item in single
+    ]
+
+
+def test_simulation_grid_validates_scenarios(client: TestClient) -> None:
+    headers, user_id = register_and_get_auth(client, REGISTRATION_PAYLOAD)
+    url = f'/api/users/{user_id}/recommendations/career-aligned/simulations'
+
+    invalid_payloads = [
+        {},
+        {'grid': {'sleep_hours': {'values': [7]}}, 'scenarios': [{'sleep_hours': 7}]},
+        {'scenarios': [{'unknown_metric': 1}]},
+        {'scenarios': [{'stress_level': 11}]},
+        {'grid': {'sleep_hours': {'start': 5, 'stop': 4, 'step': 1}}},
+        {
+            'grid': {
+                'study_hours': {'start': 0, 'stop': 100, 'step': 0.1},
+                'sleep_hours': {'values': [5, 6, 7]},
+            }
+        },
+    ]
+    for payload in invalid_payloads:
+        assert client.post(url, json=payload, headers=headers).status_code == 422
+
+    # Non-finite numbers and ranges whose length overflows are rejected, not passed on to the model.
+    raw_invalid_payloads = [
+        '{"grid": {"study_hours": {"start": 0, "stop": Infinity, "step": 1}}}',
+        '{"grid": {"study_hours": {"start": 0, "stop": 1e300, "step": 1e-300}}}',
+        '{"grid": {"study_hours": {"values": [Infinity]}}}',
+        '{"grid": {"study_hours": {"values": [NaN]}}}',
+        '{"scenarios": [{"study_hours": NaN}]}',
+        '{"scenarios": [{"study_hours": -Infinity}]}',
+    ]
+    json_headers = {**headers, 'Content-Type': 'application/json'}
+    for body in raw_invalid_payloads:
+        assert client.post(url, content=body, headers=json_headers).status_code == 422
+
+    response = client.post(url, json={'scenarios': [{'sleep_hours': 8}, {}]}, headers=headers)
+    assert response.status_code == 200
+    # No assessment yet: scenarios are echoed without scores.
+    assert [scenario['metrics'] for scenario in response.json()['scenarios']] == [{'sleep_hours': 8.0}, {}]
+    assert all(not scenario['items'] for scenario in response.json()['scenarios'])
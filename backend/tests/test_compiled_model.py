@@ -0,0 +1,44 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.compiled_model import compile_linear_pipeline, compile_or_keep
+from train_productivity_models import fit_pipeline, load_dataset
+
+DATASET_PATH = Path(__file__).resolve().parents[1] / 'dataset' / 'productivity_dataset.csv'
+
+
+@pytest.fixture(scope='module')
+def trained():
+    x, y = load_dataset(DATASET_PATH)
+    return fit_pipeline(x, y), x
+
+
+def test_compiled_model_matches_pipeline_on_dataset(trained) -> None:
+    pipeline, x = trained
+    compiled = compile_linear_pipeline(pipeline)
+
+    np.testing.assert_allclose(compiled.predict(x), pipeline.predict(x), rtol=0, atol=1e-9)
+
+
+def test_compiled_model_matches_pipeline_on_missing_and_unknown_values(trained) -> None:
+    pipeline, x = trained
+    compiled = compile_linear_pipeline(pipeline)
+    sample = x.head(60).astype({'gender': object})
+    sample.loc[sample.index[::3], 'sleep_hours'] = np.nan
+    sample.loc[sample.index[::4], 'gender'] = 'Nonbinary'
+    sample.loc[sample.index[::5], 'gender'] = np.nan
+    sample.loc[sample.index[::7], 'gender'] = None
+
+    np.testing.assert_allclose(compiled.predict(sample), pipeline.predict(sample), rtol=0, atol=1e-9)
+
+
+def test_unsupported_models_are_kept_as_is() -> None:
+    class _Opaque:
+        def predict(self, frame):
+            return np.zeros(len(frame))
+
+    opaque = _Opaque()
+
+    assert compile_or_keep(opaque) is opaque
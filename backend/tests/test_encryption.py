@@ -0,0 +1,149 @@
+from collections.abc import Callable
+from secrets import token_bytes
+
+import numpy as np
+import pytest
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from sqlalchemy import LargeBinary, select, type_coerce
+from sqlalchemy.orm import Session
+
+from app.encryption import _build_key_bytes, decrypt_number, encrypt_number, get_keyring
+from app.habits_storage import convert_assessment_storage, load_assessment_columns, reencrypt_assessments
+from app.models import SEALED_PLACEHOLDER, HabitsAssessment, User
+
+ROTATION_KEYRING = '1:rotation-test-key'
+
+
+def _create_assessments(db: Session, count: int) -> list[HabitsAssessment]:
+    user = User(
+        email='storage@example.com',
+        hashed_password='unused',
+        name='Storage User',
+        course='Computer Science',
+        year_level='Junior',
+    )
+    db.add(user)
+    db.commit()
+    return _create_assessments_for_user(db, user.id, count)
+
+
+def _create_assessments_for_user(db: Session, user_id: int, count: int) -> list[HabitsAssessment]:
+    assessments = [
+        HabitsAssessment(
+            user_id=user_id,
+            study_hours=index + 0.5,
+            sleep_hours=7,
+            phone_usage_hours=3,
+            social_media_hours=2,
+            gaming_hours=1,
+            breaks_per_day=4,
+            coffee_intake=1,
+            exercise_minutes=30,
+            stress_level=5,
+            focus_score=70,
+            attendance_percentage=90,
+            assignments_completed_per_week=5,
+            final_grade=80 if index % 2 else None,
+        )
+        for index in range(count)
+    ]
+    db.add_all(assessments)
+    db.commit()
+    return assessments
+
+
+def _study_hours_and_grades(db: Session) -> list[tuple[float, float | None]]:
+    db.expire_all()
+    return sorted((item.study_hours, item.final_grade) for item in db.scalars(select(HabitsAssessment)).all())
+
+
+def test_legacy_ciphertext_still_decrypts() -> None:
+    nonce = token_bytes(12)
+    legacy = nonce + AESGCM(_build_key_bytes()).encrypt(nonce, b'7.25000000', None)
+
+    assert decrypt_number(legacy) == 7.25
+    assert decrypt_number(encrypt_number(7.25)) == 7.25
+
+    # A legacy nonce that happens to look like a keyed header naming an unconfigured key id.
+    nonce = b'SPK1' + bytes([9]) + token_bytes(7)
+    legacy = nonce + AESGCM(_build_key_bytes()).encrypt(nonce, b'7.25000000', None)
+    assert decrypt_number(legacy) == 7.25
+
+
+def test_unknown_key_id_is_reported_instead_of_legacy_fallback(settings_env: Callable[..., None]) -> None:
+    settings_env(habits_encryption_keyring=ROTATION_KEYRING, habits_encryption_active_key_id=1)
+    ciphertext = encrypt_number(7.25)
+
+    settings_env(habits_encryption_keyring='', habits_encryption_active_key_id=0)
+    with pytest.raises(ValueError, match='key id 1 is not configured'):
+        decrypt_number(ciphertext)
+
+
+def test_reencrypt_moves_rows_to_active_key(db_session: Session, settings_env: Callable[..., None]) -> None:
+    settings_env(habits_encryption_keyring=ROTATION_KEYRING, habits_encryption_active_key_id=0)
+    _create_assessments(db_session, 5)
+
+    settings_env(habits_encryption_keyring=ROTATION_KEYRING, habits_encryption_active_key_id=1)
+    assert reencrypt_assessments(db_session, chunk_size=2) == 5
+    assert reencrypt_assessments(db_session, chunk_size=2) == 0
+
+    keyring = get_keyring()
+    raw_values = db_session.scalars(select(type_coerce(HabitsAssessment.study_hours, LargeBinary))).all()
+    assert {keyring.key_id_of(value) for value in raw_values} == {1}
+    assert [hours for hours, _ in _study_hours_and_grades(db_session)] == [0.5, 1.5, 2.5, 3.5, 4.5]
+
+
+def test_sealed_storage_mode_round_trips_through_orm(db_session: Session, settings_env: Callable[..., None]) -> None:
+    settings_env(habits_storage_mode='sealed')
+    _create_assessments(db_session, 2)
+
+    raw = db_session.execute(
+        select(
+            type_coerce(HabitsAssessment.study_hours, LargeBinary),
+            type_coerce(HabitsAssessment.sealed_metrics, LargeBinary),
+        )
+    ).all()
+    assert all(study_hours == SEALED_PLACEHOLDER and sealed for study_hours, sealed in raw)
+    assert _study_hours_and_grades(db_session) == [(0.5, None), (1.5, 80.0)]
+
+
+def test_convert_storage_between_modes(db_session: Session, settings_env: Callable[..., None]) -> None:
+    _create_assessments(db_session, 5)
+    expected = _study_hours_and_grades(db_session)
+
+    settings_env(habits_storage_mode='sealed')
+    assert convert_assessment_storage(db_session, 'sealed', chunk_size=2) == 5
+    assert convert_assessment_storage(db_session, 'sealed', chunk_size=2) == 0
+    assert _study_hours_and_grades(db_session) == expected
+
+    settings_env(habits_storage_mode='columns')
+    assert convert_assessment_storage(db_session, 'columns', chunk_size=2) == 5
+    sealed = db_session.scalars(select(type_coerce(HabitsAssessment.sealed_metrics, LargeBinary))).all()
+    assert sealed == [None] * 5
+    assert _study_hours_and_grades(db_session) == expected
+
+
+@pytest.mark.parametrize('processes', [None, 2])
+def test_load_assessment_columns_reads_mixed_storage(
+    db_session: Session,
+    settings_env: Callable[..., None],
+    processes: int | None,
+) -> None:
+    assessments = _create_assessments(db_session, 3)
+    settings_env(habits_storage_mode='sealed')
+    more = _create_assessments_for_user(db_session, assessments[0].user_id, 2)
+
+    columns = load_assessment_columns(
+        db_session,
+        ('study_hours', 'final_grade'),
+        chunk_size=2,
+        processes=processes,
+    )
+
+    expected_ids = [item.assessment_id for item in [*assessments, *more]]
+    assert columns.assessment_ids.tolist() == expected_ids
+    assert columns.values['study_hours'].tolist() == [0.5, 1.5, 2.5, 0.5, 1.5]
+    np.testing.assert_array_equal(columns.values['final_grade'], [np.nan, 80.0, np.nan, np.nan, 80.0])
+
+    tail = load_assessment_columns(db_session, ('study_hours',), min_assessment_id=expected_ids[2])
+    assert tail.assessment_ids.tolist() == expected_ids[3:]
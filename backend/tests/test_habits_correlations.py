@@ -0,0 +1,400 @@
+import random
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from scipy import stats
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.habits_engine import (
+    METRIC_NAMES,
+    NORMALIZED_EXPORT_WATERMARK,
+    PARTIAL_STUDY_HOURS,
+    SNAPSHOT_RETENTION,
+    SPEARMAN,
+    PartialCorrelationCalculator,
+    PearsonCorrelationCalculator,
+    SpearmanCorrelationCalculator,
+    cohort_correlations,
+    export_normalized_assessments,
+    latest_correlations_query,
+    latest_correlations,
+    rebuild_correlation_accumulators,
+    recompute_correlations,
+    record_assessment_statistics,
+    run_correlation_batch,
+)
+from app.models import (
+    HabitsAssessment,
+    HabitsCorrelation,
+    HabitsCorrelationAccumulator,
+    HabitsCorrelationSnapshot,
+    HabitsDailyAccumulator,
+    HabitsNormalizedExport,
+    HabitsSegmentAccumulator,
+    PipelineWatermark,
+    User,
+)
+
+
+def test_matrix_mode_matches_scalar_path_with_missing_values() -> None:
+    rng = np.random.default_rng(3)
+    x = rng.normal(size=(200, 4))
+    y = np.column_stack([x[:, 0] * 0.5 + rng.normal(size=200), rng.normal(size=200)])
+    x[rng.random(200) < 0.1, 1] = np.nan
+    y[rng.random(200) < 0.3, 0] = np.nan
+    x[:, 3] = 2.5
+
+    calculator = PearsonCorrelationCalculator()
+    matrix = calculator.calculate_matrix(x, y)
+
+    for metric_index in range(x.shape[1]):
+        for performance_index in range(y.shape[1]):
+            present = ~np.isnan(x[:, metric_index]) & ~np.isnan(y[:, performance_index])
+            expected = calculator.calculate(
+                x[present, metric_index].tolist(),
+                y[present, performance_index].tolist(),
+            )
+            actual = matrix.stat((metric_index, performance_index))
+            if expected is None:
+                assert actual is None
+                continue
+            assert actual is not None
+            assert actual.sample_size == expected.sample_size
+            assert actual.correlation_coefficient == pytest.approx(expected.correlation_coefficient, abs=1e-9)
+            assert actual.p_value == pytest.approx(expected.p_value, abs=1e-9)
+            assert actual.confidence_interval_low == pytest.approx(expected.confidence_interval_low, abs=1e-9)
+            assert actual.confidence_interval_high == pytest.approx(expected.confidence_interval_high, abs=1e-9)
+
+
+def test_grouped_sums_match_per_group_matrix_sums() -> None:
+    rng = np.random.default_rng(9)
+    x = rng.normal(size=(60, 3))
+    y = rng.normal(size=(60, 2))
+    x[rng.random(60) < 0.2, 0] = np.nan
+    groups = rng.integers(0, 4, size=60)
+    groups[groups == 2] = 3
+
+    grouped = PearsonCorrelationCalculator.grouped_matrix_sums(x, y, groups, 4)
+
+    for group in range(4):
+        expected = PearsonCorrelationCalculator.matrix_sums(x[groups == group], y[groups == group])
+        for field in ('sample_size', 'sum_x', 'sum_y', 'sum_x_squared', 'sum_y_squared', 'sum_xy'):
+            np.testing.assert_allclose(getattr(grouped, field)[group], getattr(expected, field), atol=1e-9)
+
+
+def test_spearman_and_partial_match_reference_formulas() -> None:
+    rng = np.random.default_rng(21)
+    x = np.column_stack([rng.integers(0, 6, size=120), rng.exponential(size=120), rng.normal(size=120)]).astype(float)
+    y = np.column_stack([np.exp(x[:, 1]) + x[:, 2] + rng.normal(size=120), rng.normal(size=120)])
+    y[rng.random(120) < 0.25, 1] = np.nan
+
+    spearman = SpearmanCorrelationCalculator().calculate_matrix(x, y)
+    partial = PartialCorrelationCalculator().calculate_matrix(x, y, control_index=2)
+
+    for performance_index in range(y.shape[1]):
+        rows = ~np.isnan(y[:, performance_index])
+        target = y[rows, performance_index]
+        for metric_index in range(x.shape[1]):
+            expected = stats.spearmanr(x[rows, metric_index], target).statistic
+            actual = spearman.stat((metric_index, performance_index))
+            assert actual is not None
+            assert actual.sample_size == rows.sum()
+            assert actual.correlation_coefficient == pytest.approx(expected, abs=1e-9)
+
+        control = x[rows, 2]
+        r_yz = np.corrcoef(target, control)[0, 1]
+        for metric_index in range(2):
+            r_xy = np.corrcoef(x[rows, metric_index], target)[0, 1]
+            r_xz = np.corrcoef(x[rows, metric_index], control)[0, 1]
+            expected = (r_xy - r_xz * r_yz) / np.sqrt((1 - r_xz**2) * (1 - r_yz**2))
+            actual = partial.stat((metric_index, performance_index))
+            assert actual is not None
+            assert actual.correlation_coefficient == pytest.approx(expected, abs=1e-9)
+        # The control variable has no partial correlation with itself.
+        assert partial.stat((2, performance_index)) is None
+
+
+def test_spearman_ranks_both_sides_over_pairwise_complete_rows() -> None:
+    rng = np.random.default_rng(34)
+    x = np.column_stack([rng.integers(0, 6, size=150), rng.exponential(size=150), rng.normal(size=150)]).astype(float)
+    y = np.column_stack([x[:, 0] ** 2 + x[:, 1] + rng.normal(size=150), rng.normal(size=150)])
+    x[rng.random(150) < 0.3, 0] = np.nan
+    x[rng.random(150) < 0.2, 1] = np.nan
+    y[rng.random(150) < 0.25, 1] = np.nan
+
+    spearman = SpearmanCorrelationCalculator().calculate_matrix(x, y)
+
+    for performance_index in range(y.shape[1]):
+        for metric_index in range(x.shape[1]):
+            rows = ~np.isnan(x[:, metric_index]) & ~np.isnan(y[:, performance_index])
+            expected = stats.spearmanr(x[rows, metric_index], y[rows, performance_index]).statistic
+            actual = spearman.stat((metric_index, performance_index))
+            assert actual is not None
+            assert actual.sample_size == rows.sum()
+            assert actual.correlation_coefficient == pytest.approx(expected, abs=1e-9)
+
+
+def _create_user(db: Session, email: str = 'habits-stats@example.com', course: str = 'Computer Science') -> User:
+    user = User(
+        email=email,
+        hashed_password='unused',
+        name='Stats User',
+        course=course,
+        year_level='Junior',
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _random_assessment(rng: random.Random, user_id: int) -> HabitsAssessment:
+    values = {metric_name: round(rng.uniform(1, 10), 2) for metric_name in METRIC_NAMES}
+    values['final_grade'] = round(rng.uniform(40, 100), 2) if rng.random() > 0.3 else None
+    return HabitsAssessment(user_id=user_id, grade_opt_in=values['final_grade'] is not None, **values)
+
+
+def _submit(db: Session, assessment: HabitsAssessment) -> None:
+    db.add(assessment)
+    db.commit()
+    record_assessment_statistics(db, assessment)
+
+
+def test_incremental_accumulators_match_scalar_pearson(db_session: Session) -> None:
+    rng = random.Random(7)
+    user = _create_user(db_session)
+    assessments = [_random_assessment(rng, user.id) for _ in range(25)]
+    for assessment in assessments:
+        _submit(db_session, assessment)
+
+    correlations = recompute_correlations(db_session, force=True)
+    assert correlations
+
+    calculator = PearsonCorrelationCalculator()
+    for correlation in correlations:
+        pairs = [
+            (getattr(item, correlation.metric_name), getattr(item, correlation.performance_metric))
+            for item in assessments
+            if getattr(item, correlation.performance_metric) is not None
+        ]
+        expected = calculator.calculate([x for x, _ in pairs], [y for _, y in pairs])
+        assert expected is not None
+        assert correlation.sample_size == expected.sample_size
+        assert correlation.correlation_coefficient == pytest.approx(expected.correlation_coefficient, abs=1e-9)
+        assert correlation.p_value == pytest.approx(expected.p_value, abs=1e-9)
+
+
+def test_rebuild_reconciles_drifted_accumulators(db_session: Session) -> None:
+    rng = random.Random(11)
+    user = _create_user(db_session)
+    for _ in range(6):
+        _submit(db_session, _random_assessment(rng, user.id))
+
+    accumulator = db_session.scalar(
+        select(HabitsCorrelationAccumulator).where(
+            HabitsCorrelationAccumulator.metric_name == 'sleep_hours',
+            HabitsCorrelationAccumulator.performance_metric == 'assignments_completed_per_week',
+        )
+    )
+    assert accumulator is not None
+    expected_sum = accumulator.sum_xy
+    accumulator.sample_size = 999
+    accumulator.sum_xy = -1.0
+    db_session.commit()
+
+    assert rebuild_correlation_accumulators(db_session) == 6
+    db_session.refresh(accumulator)
+    assert accumulator.sample_size == 6
+    assert accumulator.sum_xy == pytest.approx(expected_sum)
+
+
+def test_recompute_publishes_snapshots_and_skips_unchanged_inputs(db_session: Session) -> None:
+    rng = random.Random(5)
+    user = _create_user(db_session)
+    for _ in range(5):
+        _submit(db_session, _random_assessment(rng, user.id))
+
+    first = recompute_correlations(db_session)
+    assert first
+    first_snapshot = first[0].snapshot_id
+    assert {row.snapshot_id for row in first} == {first_snapshot}
+
+    # Same accumulator state: another worker reuses the published snapshot.
+    assert {row.snapshot_id for row in recompute_correlations(db_session)} == {first_snapshot}
+    assert db_session.scalar(select(func.count()).select_from(HabitsCorrelationSnapshot)) == 1
+
+    for _ in range(SNAPSHOT_RETENTION + 1):
+        _submit(db_session, _random_assessment(rng, user.id))
+        recompute_correlations(db_session)
+
+    latest = latest_correlations(db_session)
+    newest = db_session.scalar(select(HabitsCorrelationSnapshot).order_by(HabitsCorrelationSnapshot.id.desc()))
+    assert newest is not None
+    assert len(newest.source_signature) <= HabitsCorrelationSnapshot.source_signature.type.length
+    assert {row.snapshot_id for row in latest} == {newest.id}
+    # The count covers every row of the snapshot, including the rolling-window ones.
+    published = select(func.count()).select_from(HabitsCorrelation).where(HabitsCorrelation.snapshot_id == newest.id)
+    assert db_session.scalar(published) == newest.correlation_count
+    kept = db_session.scalars(select(HabitsCorrelation.snapshot_id).distinct()).all()
+    assert len(kept) == SNAPSHOT_RETENTION
+    assert first_snapshot not in kept
+
+
+def test_normalized_export_only_processes_rows_changed_since_watermark(db_session: Session) -> None:
+    rng = random.Random(13)
+    user = _create_user(db_session)
+    assessments = [_random_assessment(rng, user.id) for _ in range(5)]
+    db_session.add_all(assessments)
+    db_session.commit()
+
+    # Just written: a submit stamped a moment earlier might still be committing, so nothing is read yet.
+    assert export_normalized_assessments(db_session, chunk_size=2).rows == 0
+
+    first = export_normalized_assessments(db_session, chunk_size=2, settle_seconds=0)
+    assert (first.rows, first.chunks) == (5, 3)
+    assert db_session.scalar(select(func.count()).select_from(HabitsNormalizedExport)) == 5
+    assert export_normalized_assessments(db_session, chunk_size=2, settle_seconds=0).rows == 0
+
+    assessments[1].study_hours = 6.0
+    db_session.commit()
+    second = export_normalized_assessments(db_session, chunk_size=2, settle_seconds=0)
+    assert second.rows == 1
+    exported = db_session.scalar(
+        select(HabitsNormalizedExport).where(HabitsNormalizedExport.assessment_id == assessments[1].assessment_id)
+    )
+    assert exported is not None
+    assert exported.study_hours == pytest.approx(0.5)
+    assert db_session.scalar(select(func.count()).select_from(HabitsNormalizedExport)) == 5
+
+    watermark = db_session.get(PipelineWatermark, NORMALIZED_EXPORT_WATERMARK)
+    assert watermark is not None
+    assert (watermark.last_assessment_id, watermark.rows_processed) == (assessments[1].assessment_id, 6)
+    assert export_normalized_assessments(db_session, full=True, settle_seconds=0).rows == 5
+
+
+def test_cohort_correlations_follow_the_users_segment(
+    db_session: Session,
+    settings_env: Callable[..., None],
+) -> None:
+    settings_env(habits_segment_min_sample_size=5)
+    rng = random.Random(19)
+    science = _create_user(db_session)
+    nursing = _create_user(db_session, 'nursing@example.com', 'Nursing')
+    for _ in range(8):
+        _submit(db_session, _random_assessment(rng, science.id))
+    for _ in range(3):
+        _submit(db_session, _random_assessment(rng, nursing.id))
+
+    def _segment_sums() -> dict[tuple[str, ...], tuple[int, float]]:
+        rows = db_session.scalars(select(HabitsSegmentAccumulator)).all()
+        return {
+            (row.segment_type, row.segment_value, row.metric_name, row.performance_metric): (
+                row.sample_size,
+                row.sum_xy,
+            )
+            for row in rows
+        }
+
+    incremental = _segment_sums()
+    rebuild_correlation_accumulators(db_session)
+    rebuilt = _segment_sums()
+    assert incremental.keys() == rebuilt.keys()
+    for key, (sample_size, sum_xy) in rebuilt.items():
+        assert incremental[key][0] == sample_size
+        assert incremental[key][1] == pytest.approx(sum_xy)
+    assert rebuilt[('year_level', 'Junior', 'sleep_hours', 'assignments_completed_per_week')][0] == 11
+
+    recompute_correlations(db_session, force=True)
+    science_rows = db_session.scalars(latest_correlations_query('course', 'Computer Science')).all()
+    assert science_rows
+    assert {row.sample_size for row in science_rows} <= set(range(5, 9))
+    # Nursing has too few assessments to publish a cohort.
+    assert not db_session.scalars(latest_correlations_query('course', 'Nursing')).all()
+
+    merged = cohort_correlations(db_session, science)
+    assert len(merged) == len(latest_correlations(db_session))
+    assert sum(row.segment_value == 'Computer Science' for row in merged) == len(science_rows)
+    assert {row.segment_type for row in cohort_correlations(db_session, nursing)} == {'all'}
+
+
+def test_batch_publishes_rank_correlations_and_recomputes_carry_them_forward(db_session: Session) -> None:
+    rng = random.Random(23)
+    user = _create_user(db_session)
+    for _ in range(12):
+        _submit(db_session, _random_assessment(rng, user.id))
+
+    run_correlation_batch(db_session)
+    spearman = db_session.scalars(latest_correlations_query(method=SPEARMAN)).all()
+    partial = db_session.scalars(latest_correlations_query(method=PARTIAL_STUDY_HOURS)).all()
+    assert spearman
+    assert partial
+    assert 'study_hours' not in {row.metric_name for row in partial}
+    assert all(row.method == 'pearson' for row in latest_correlations(db_session))
+
+    _submit(db_session, _random_assessment(rng, user.id))
+    recompute_correlations(db_session)
+    carried = db_session.scalars(latest_correlations_query(method=SPEARMAN)).all()
+    assert carried[0].snapshot_id != spearman[0].snapshot_id
+    assert sorted((row.metric_name, row.performance_metric, row.correlation_coefficient) for row in carried) == sorted(
+        (row.metric_name, row.performance_metric, row.correlation_coefficient) for row in spearman
+    )
+
+
+def test_window_correlations_come_from_daily_buckets(
+    db_session: Session,
+    settings_env: Callable[..., None],
+) -> None:
+    settings_env(habits_correlation_window_days='30,90', habits_correlation_half_life_days=20)
+    rng = random.Random(29)
+    user = _create_user(db_session)
+    now = datetime.now(timezone.utc)
+    assessments = []
+    for age_days in [0, 1, 3, 10, 20, 29, 45, 60, 80, 120, 200, 300] * 2:
+        assessment = _random_assessment(rng, user.id)
+        assessment.created_at = now - timedelta(days=age_days)
+        _submit(db_session, assessment)
+        assessments.append((age_days, assessment))
+
+    def _buckets() -> dict[tuple, tuple[int, float]]:
+        rows = db_session.scalars(select(HabitsDailyAccumulator)).all()
+        return {
+            (row.bucket_date, row.metric_name, row.performance_metric): (row.sample_size, row.sum_xy) for row in rows
+        }
+
+    incremental = _buckets()
+    rebuild_correlation_accumulators(db_session)
+    rebuilt = _buckets()
+    assert incremental.keys() == rebuilt.keys()
+    for key, (sample_size, sum_xy) in rebuilt.items():
+        assert incremental[key] == (sample_size, pytest.approx(sum_xy))
+
+    recompute_correlations(db_session, force=True)
+    calculator = PearsonCorrelationCalculator()
+    for time_window, max_age in (('30d', 29), ('90d', 89)):
+        rows = db_session.scalars(latest_correlations_query(time_window=time_window)).all()
+        assert rows
+        for row in rows:
+            pairs = [
+                (getattr(item, row.metric_name), getattr(item, row.performance_metric))
+                for age_days, item in assessments
+                if age_days <= max_age and getattr(item, row.performance_metric) is not None
+            ]
+            expected = calculator.calculate([x for x, _ in pairs], [y for _, y in pairs])
+            assert expected is not None
+            assert row.sample_size == expected.sample_size
+            assert row.correlation_coefficient == pytest.approx(expected.correlation_coefficient, abs=1e-9)
+
+    decayed = db_session.scalars(latest_correlations_query(time_window='decayed')).all()
+    assert decayed
+    for row in decayed:
+        observed = [
+            (0.5 ** (age_days / 20), getattr(item, row.metric_name), getattr(item, row.performance_metric))
+            for age_days, item in assessments
+            if getattr(item, row.performance_metric) is not None
+        ]
+        weights, x, y = (np.array(values, dtype=float) for values in zip(*observed, strict=True))
+        covariance = np.cov(x, y, aweights=weights)
+        expected = covariance[0, 1] / np.sqrt(covariance[0, 0] * covariance[1, 1])
+        assert row.correlation_coefficient == pytest.approx(expected, abs=1e-9)
@@ -0,0 +1,122 @@
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app import productivity_model
+from app.jobs import run_pending_jobs
+from app.model_registry import PRODUCTIVITY_MODEL, ModelHandle
+from app.models import BackgroundJob, HabitsAssessment
+
+ASSESSMENT = {
+    'study_hours': 3,
+    'sleep_hours': 7,
+    'phone_usage_hours': 3,
+    'social_media_hours': 2,
+    'gaming_hours': 1,
+    'breaks_per_day': 4,
+    'coffee_intake': 1,
+    'exercise_minutes': 30,
+    'stress_level': 5,
+    'focus_score': 70,
+    'attendance_percentage': 90,
+    'assignments_completed_per_week': 5,
+}
+
+
+class _CountingModel:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def predict(self, frame: pd.DataFrame) -> np.ndarray:
+        self.calls += 1
+        return frame['study_hours_per_day'].to_numpy() * 10
+
+
+@pytest.fixture
+def model(monkeypatch: pytest.MonkeyPatch) -> _CountingModel:
+    counting = _CountingModel()
+    handle = ModelHandle(
+        name=PRODUCTIVITY_MODEL,
+        path=Path('unused.pkl'),
+        predictor=counting,
+        checksum='v1',
+        generation=1,
+        loaded_at=datetime.now(timezone.utc),
+        load_seconds=0.0,
+        file_signature=(0, 0),
+    )
+    monkeypatch.setattr(productivity_model, '_load_model', lambda: handle)
+    return counting
+
+
+def _login(client: TestClient) -> tuple[int, dict[str, str]]:
+    credentials = {'email': 'habits-api@example.com', 'password': 'StrongPass1'}
+    register = client.post(
+        '/api/auth/register',
+        json={**credentials, 'name': 'Habits Api', 'course': 'Computer Science', 'year_level': 'Junior'},
+    )
+    assert register.status_code == 201
+    token = client.post('/api/auth/login', json=credentials).json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    return client.get('/api/profile/me', headers=headers).json()['id'], headers
+
+
+def test_history_serves_stored_scores_and_batches_the_rest(
+    client: TestClient,
+    db_session: Session,
+    model: _CountingModel,
+) -> None:
+    user_id, headers = _login(client)
+    for hours in (1, 2, 3):
+        response = client.post(
+            f'/api/habits/{user_id}/assessment',
+            json={**ASSESSMENT, 'study_hours': hours},
+            headers=headers,
+        )
+        assert response.status_code == 201
+        assert response.json()['productivity_score'] == hours * 10
+    calls_after_submit = model.calls
+    queued = db_session.scalars(select(BackgroundJob)).all()
+    assert [(job.job_type, job.status) for job in queued] == [('habits.recompute_correlations', 'pending')]
+
+    history = client.get(f'/api/habits/{user_id}/history', headers=headers)
+    assert history.status_code == 200
+    body = history.json()
+    assert body['total'] == 3
+    assert sorted(item['productivity_score'] for item in body['items']) == [10, 20, 30]
+    assert model.calls == calls_after_submit
+
+    db_session.execute(update(HabitsAssessment).values(productivity_model_version=None))
+    db_session.commit()
+    history = client.get(f'/api/habits/{user_id}/history', headers=headers)
+    assert sorted(item['productivity_score'] for item in history.json()['items']) == [10, 20, 30]
+    assert model.calls == calls_after_submit + 1
+
+
+def test_profile_change_queues_a_score_backfill(
+    client: TestClient,
+    db_session: Session,
+    model: _CountingModel,
+) -> None:
+    user_id, headers = _login(client)
+    client.post(f'/api/habits/{user_id}/assessment', json=ASSESSMENT, headers=headers)
+    db_session.execute(update(BackgroundJob).values(status='succeeded'))
+    db_session.commit()
+
+    profile = {'name': 'Habits Api', 'course': 'Computer Science', 'year_level': 'Senior'}
+    assert client.put('/api/profile/me', json=profile, headers=headers).status_code == 200
+    assert db_session.scalar(select(HabitsAssessment.productivity_model_version)) is None
+    job = db_session.scalar(select(BackgroundJob).where(BackgroundJob.status == 'pending'))
+    assert job.job_type == productivity_model.BACKFILL_SCORES_JOB
+
+    job.run_after = datetime.now(timezone.utc)
+    db_session.commit()
+    assert run_pending_jobs(db_session, 'test-worker') == 1
+    db_session.expire_all()
+    assert db_session.scalar(select(HabitsAssessment.productivity_model_version)) == 'v1'
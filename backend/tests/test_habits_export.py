@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+import random
+from collections.abc import Callable
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.habits_engine import METRIC_NAMES, export_normalized_assessments
+from app.habits_export import EXPORT_COLUMNS, stream_normalized_exports
+from app.models import HabitsAssessment, User
+
+
+def _seed_exports(db: Session, count: int) -> None:
+    user = User(
+        email='export-owner@example.com',
+        hashed_password='unused',
+        name='Export Owner',
+        course='Computer Science',
+        year_level='Junior',
+    )
+    db.add(user)
+    db.commit()
+    rng = random.Random(17)
+    db.add_all(
+        HabitsAssessment(
+            user_id=user.id,
+            final_grade=round(rng.uniform(40, 100), 2),
+            **{metric_name: round(rng.uniform(1, 10), 2) for metric_name in METRIC_NAMES},
+        )
+        for _ in range(count)
+    )
+    db.commit()
+    export_normalized_assessments(db, settle_seconds=0)
+
+
+def test_text_formats_stream_one_chunk_per_partition(db_session: Session) -> None:
+    _seed_exports(db_session, 5)
+
+    chunks = list(stream_normalized_exports(db_session, 'csv', chunk_size=2))
+    assert len(chunks) == 3
+    rows = list(csv.DictReader(io.StringIO(b''.join(chunks).decode())))
+    assert tuple(rows[0]) == EXPORT_COLUMNS
+    assert len(rows) == 5
+
+    lines = b''.join(stream_normalized_exports(db_session, 'jsonl', chunk_size=2)).decode().splitlines()
+    records = [json.loads(line) for line in lines]
+    assert [record['assessment_id'] for record in records] == [int(row['assessment_id']) for row in rows]
+    assert all(0.0 <= record['study_hours'] <= 1.0 for record in records)
+
+
+def test_parquet_stream_writes_a_row_group_per_partition(db_session: Session) -> None:
+    pq = pytest.importorskip('pyarrow.parquet')
+    _seed_exports(db_session, 5)
+
+    table = pq.ParquetFile(io.BytesIO(b''.join(stream_normalized_exports(db_session, 'parquet', chunk_size=2))))
+    assert table.metadata.num_rows == 5
+    assert table.metadata.num_row_groups == 3
+    assert tuple(table.schema_arrow.names) == EXPORT_COLUMNS
+
+
+def test_admin_export_endpoint_requires_admin(
+    client: TestClient,
+    db_session: Session,
+    settings_env: Callable[..., None],
+) -> None:
+    _seed_exports(db_session, 3)
+    credentials = {'email': 'admin@example.com', 'password': 'StrongPass1'}
+    client.post(
+        '/api/auth/register',
+        json={**credentials, 'name': 'Admin', 'course': 'Computer Science', 'year_level': 'Junior'},
+    )
+    token = client.post('/api/auth/login', json=credentials).json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+
+    assert client.get('/api/admin/exports/habits-normalized', headers=headers).status_code == 403
+
+    settings_env(admin_emails='Admin@example.com')
+    response = client.get('/api/admin/exports/habits-normalized?format=jsonl', headers=headers)
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    assert len(response.text.splitlines()) == 3
@@ -0,0 +1,101 @@
+import time
+from collections.abc import Callable
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.habits_engine import RECOMPUTE_CORRELATIONS_JOB, enqueue_correlation_recompute
+from app.jobs import (
+    JOB_FAILED,
+    JOB_PENDING,
+    JOB_SUCCEEDED,
+    enqueue_job,
+    register_job_handler,
+    release_stale_jobs,
+    run_pending_jobs,
+)
+from app.models import BackgroundJob
+
+calls: list[dict] = []
+
+
+@register_job_handler('test.flaky')
+def _flaky_job(db: Session, payload: dict) -> None:
+    calls.append(payload)
+    if len(calls) == 1:
+        raise RuntimeError('first attempt fails')
+
+
+@register_job_handler('test.broken')
+def _broken_job(db: Session, payload: dict) -> None:
+    raise RuntimeError('always fails')
+
+
+TEST_LEASE_SECONDS = 0.3
+released_while_running: list[int] = []
+
+
+@register_job_handler('test.slow')
+def _slow_job(db: Session, payload: dict) -> None:
+    # Outlive the lease several times over, then let another worker look for expired leases.
+    time.sleep(TEST_LEASE_SECONDS * 3)
+    with Session(db.get_bind()) as other_worker:
+        released_while_running.append(release_stale_jobs(other_worker, TEST_LEASE_SECONDS))
+
+
+def _make_due(db: Session, job: BackgroundJob) -> None:
+    job.run_after = datetime.now(timezone.utc)
+    db.commit()
+
+
+def test_burst_of_submits_coalesces_into_one_recompute(
+    db_session: Session,
+    settings_env: Callable[..., None],
+) -> None:
+    settings_env(jobs_coalesce_seconds=60)
+    jobs = [enqueue_correlation_recompute(db_session) for _ in range(5)]
+
+    assert len({job.id for job in jobs}) == 1
+    assert run_pending_jobs(db_session, 'test-worker') == 0
+
+    _make_due(db_session, jobs[0])
+    assert run_pending_jobs(db_session, 'test-worker') == 1
+    assert jobs[0].status == JOB_SUCCEEDED
+
+    follow_up = enqueue_correlation_recompute(db_session)
+    assert follow_up.id != jobs[0].id
+    assert follow_up.job_type == RECOMPUTE_CORRELATIONS_JOB
+
+
+def test_failed_jobs_retry_with_backoff_then_give_up(db_session: Session) -> None:
+    calls.clear()
+    flaky = enqueue_job(db_session, 'test.flaky', {'n': 1})
+    broken = enqueue_job(db_session, 'test.broken', max_attempts=2)
+
+    assert run_pending_jobs(db_session, 'test-worker') == 2
+    db_session.refresh(flaky)
+    assert flaky.status == JOB_PENDING
+    assert flaky.attempts == 1
+    assert flaky.last_error == 'RuntimeError: first attempt fails'
+    assert flaky.run_after.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc)
+
+    _make_due(db_session, flaky)
+    _make_due(db_session, broken)
+    assert run_pending_jobs(db_session, 'test-worker') == 2
+
+    statuses = dict(db_session.execute(select(BackgroundJob.job_type, BackgroundJob.status)).all())
+    assert statuses == {'test.flaky': JOB_SUCCEEDED, 'test.broken': JOB_FAILED}
+    assert calls == [{'n': 1}, {'n': 1}]
+
+
+def test_running_job_keeps_its_lease_past_the_lease_period(db_session: Session) -> None:
+    released_while_running.clear()
+    job = enqueue_job(db_session, 'test.slow')
+
+    assert run_pending_jobs(db_session, 'test-worker', lease_seconds=TEST_LEASE_SECONDS) == 1
+
+    db_session.refresh(job)
+    assert released_while_running == [0]
+    assert job.status == JOB_SUCCEEDED
+    assert job.attempts == 1
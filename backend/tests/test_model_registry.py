@@ -0,0 +1,70 @@
+import os
+from collections.abc import Callable
+from pathlib import Path
+
+import joblib
+from fastapi.testclient import TestClient
+
+from app.compiled_model import CompiledLinearModel
+from app.model_registry import ModelRegistry
+from train_productivity_models import fit_pipeline, load_dataset
+
+DATASET_PATH = Path(__file__).resolve().parents[1] / 'dataset' / 'productivity_dataset.csv'
+
+
+def _write_artifact(path: Path, rows: int, mtime_ns: int) -> None:
+    x, y = load_dataset(DATASET_PATH)
+    joblib.dump(fit_pipeline(x.head(rows), y.head(rows)), path)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_registry_hot_swaps_retrained_artifact(tmp_path: Path, settings_env: Callable[..., None]) -> None:
+    settings_env(model_reload_interval_seconds=0)
+    artifact = tmp_path / 'model.pkl'
+    registry = ModelRegistry()
+    registry.register('productivity', artifact)
+
+    assert registry.get('productivity') is None
+
+    _write_artifact(artifact, 500, 1_000_000_000)
+    registry.warm_up()
+    first = registry.get('productivity')
+    assert first is not None
+    assert first.generation == 1
+    assert isinstance(first.predictor, CompiledLinearModel)
+
+    os.utime(artifact, ns=(2_000_000_000, 2_000_000_000))
+    touched = registry.get('productivity')
+    assert touched is not None
+    assert touched.predictor is first.predictor
+    assert touched.generation == 1
+
+    _write_artifact(artifact, 800, 3_000_000_000)
+    retrained = registry.get('productivity')
+    assert retrained is not None
+    assert retrained.generation == 2
+    assert retrained.checksum != first.checksum
+
+    registry.record_inference('productivity', rows=10, seconds=0.002)
+    stats = registry.stats()['productivity']
+    assert stats['version'] == retrained.checksum
+    assert stats['compiled'] is True
+    assert stats['inference']['rows'] == 10
+
+
+def test_model_health_requires_admin(client: TestClient, settings_env: Callable[..., None]) -> None:
+    assert client.get('/health/models').status_code == 401
+
+    credentials = {'email': 'ops@example.com', 'password': 'StrongPass1'}
+    client.post(
+        '/api/auth/register',
+        json={**credentials, 'name': 'Ops', 'course': 'Computer Science', 'year_level': 'Junior'},
+    )
+    token = client.post('/api/auth/login', json=credentials).json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    assert client.get('/health/models', headers=headers).status_code == 403
+
+    settings_env(admin_emails='ops@example.com')
+    response = client.get('/health/models', headers=headers)
+    assert response.status_code == 200
+    assert 'productivity' in response.json()
@@ -0,0 +1,156 @@
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import productivity_model
+from app.habits_storage import load_assessment_columns
+from app.model_registry import PRODUCTIVITY_MODEL, ModelHandle
+from app.models import HabitsAssessment, User
+
+
+class _StudyHoursModel:
+    """Stand-in pipeline that refuses to score negative study hours."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def predict(self, frame: pd.DataFrame) -> np.ndarray:
+        self.calls += 1
+        if (frame['study_hours_per_day'] < 0).any():
+            raise ValueError('negative study hours')
+        return frame['study_hours_per_day'].to_numpy() * 10
+
+
+def _handle(model: _StudyHoursModel, checksum: str) -> ModelHandle:
+    return ModelHandle(
+        name=PRODUCTIVITY_MODEL,
+        path=Path('unused.pkl'),
+        predictor=model,
+        checksum=checksum,
+        generation=1,
+        loaded_at=datetime.now(timezone.utc),
+        load_seconds=0.0,
+        file_signature=(0, 0),
+    )
+
+
+def _assessment(assessment_id: int, study_hours: float | None) -> HabitsAssessment:
+    return HabitsAssessment(
+        assessment_id=assessment_id,
+        user_id=1,
+        study_hours=study_hours,
+        sleep_hours=7,
+        phone_usage_hours=3,
+        social_media_hours=2,
+        gaming_hours=1,
+        breaks_per_day=4,
+        coffee_intake=1,
+        exercise_minutes=30,
+        stress_level=5,
+        focus_score=70,
+        attendance_percentage=90,
+        assignments_completed_per_week=5,
+    )
+
+
+def test_batch_scoring_uses_one_predict_call(monkeypatch: pytest.MonkeyPatch) -> None:
+    model = _StudyHoursModel()
+    monkeypatch.setattr(productivity_model, '_load_model', lambda: _handle(model, 'v1'))
+    user = User(id=1, email='batch@example.com', hashed_password='unused', name='Batch', year_level='Junior')
+
+    scores = productivity_model.predict_productivity_scores([_assessment(1, 1.5), _assessment(2, 2.0)], user)
+
+    assert scores == [15.0, 20.0]
+    assert model.calls == 1
+
+
+def test_batch_scoring_isolates_failing_rows(monkeypatch: pytest.MonkeyPatch) -> None:
+    model = _StudyHoursModel()
+    monkeypatch.setattr(productivity_model, '_load_model', lambda: _handle(model, 'v1'))
+    user = User(id=1, email='batch@example.com', hashed_password='unused', name='Batch', year_level='Junior')
+    assessments = [_assessment(1, 1.5), _assessment(2, -1.0), _assessment(3, None), _assessment(4, 3.0)]
+
+    scores = productivity_model.predict_productivity_scores(assessments, user)
+
+    assert scores == [15.0, None, None, 30.0]
+
+
+def test_backfill_rescores_only_rows_from_other_model_versions(
+    db_session: Session,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    user = User(
+        email='backfill@example.com',
+        hashed_password='unused',
+        name='Backfill',
+        course='Computer Science',
+        year_level='Junior',
+    )
+    db_session.add(user)
+    db_session.commit()
+    first_model = _handle(_StudyHoursModel(), 'v1')
+    monkeypatch.setattr(productivity_model, '_load_model', lambda: first_model)
+    assessments = [_assessment(index + 1, index + 1.0) for index in range(3)]
+    for assessment in assessments:
+        assessment.user_id = user.id
+        productivity_model.store_productivity_score(assessment, user)
+    db_session.add_all(assessments)
+    db_session.commit()
+    updated_at = [assessment.updated_at for assessment in assessments]
+
+    assert productivity_model.backfill_productivity_scores(db_session) == 0
+    assert productivity_model.stored_productivity_scores(assessments, user) == [10.0, 20.0, 30.0]
+
+    class _DoubledModel(_StudyHoursModel):
+        def predict(self, frame: pd.DataFrame) -> np.ndarray:
+            return super().predict(frame) * 2
+
+    second_model = _handle(_DoubledModel(), 'v2')
+    monkeypatch.setattr(productivity_model, '_load_model', lambda: second_model)
+    assert productivity_model.backfill_productivity_scores(db_session, chunk_size=2) == 3
+    assert productivity_model.backfill_productivity_scores(db_session) == 0
+
+    stored = db_session.scalars(select(HabitsAssessment).order_by(HabitsAssessment.assessment_id)).all()
+    assert [item.productivity_score for item in stored] == [20.0, 40.0, 60.0]
+    assert {item.productivity_model_version for item in stored} == {'v2'}
+    assert [item.updated_at.replace(tzinfo=None) for item in stored] == [
+        value.replace(tzinfo=None) for value in updated_at
+    ]
+
+
+def test_column_scores_serve_stored_values_and_rescore_only_stale_rows(
+    db_session: Session,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    user = User(
+        email='columns@example.com',
+        hashed_password='unused',
+        name='Columns',
+        course='Computer Science',
+        year_level='Junior',
+    )
+    db_session.add(user)
+    db_session.commit()
+    model = _StudyHoursModel()
+    monkeypatch.setattr(productivity_model, '_load_model', lambda: _handle(model, 'v1'))
+    assessments = [_assessment(index + 1, index + 1.0) for index in range(3)]
+    for assessment in assessments:
+        assessment.user_id = user.id
+        productivity_model.store_productivity_score(assessment, user)
+    # A stored score is served as is, even when the model would now produce something else.
+    assessments[0].productivity_score = 99.0
+    assessments[2].productivity_model_version = None
+    db_session.add_all(assessments)
+    db_session.commit()
+    model.calls = 0
+
+    columns = load_assessment_columns(db_session)
+    scores = productivity_model.productivity_scores_for_columns(db_session, columns)
+
+    assert scores.tolist() == [99.0, 20.0, 30.0]
+    assert model.calls == 1
@@ -0,0 +1,118 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.habits_engine import (
+    METRIC_NAMES,
+    RECOMMENDATION_REFRESH_JOB,
+    recompute_correlations,
+    record_assessment_statistics,
+)
+from app.models import BackgroundJob, HabitsAssessment, HabitsRecommendation, User
+from app.recommendation_refresh import latest_assessment_ids, refresh_recommendations
+
+CALM = {
+    'study_hours': 3.0,
+    'sleep_hours': 8.0,
+    'phone_usage_hours': 1.0,
+    'social_media_hours': 1.0,
+    'gaming_hours': 0.0,
+    'breaks_per_day': 3.0,
+    'coffee_intake': 1.0,
+    'exercise_minutes': 45.0,
+    'stress_level': 4.0,
+    'focus_score': 7.0,
+    'attendance_percentage': 95.0,
+    'assignments_completed_per_week': 6.0,
+}
+
+
+def _user(db: Session, email: str) -> User:
+    user = User(email=email, hashed_password='unused', name='Refresh User', course='Nursing', year_level='Senior')
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _assessment(db: Session, user: User, age_days: int, **values: float) -> HabitsAssessment:
+    assessment = HabitsAssessment(
+        user_id=user.id,
+        created_at=datetime.now(timezone.utc) - timedelta(days=age_days),
+        **{**CALM, **values},
+    )
+    db.add(assessment)
+    db.commit()
+    return assessment
+
+
+def _recommendation(db: Session, assessment: HabitsAssessment, text: str, metric: str, status: str) -> int:
+    recommendation = HabitsRecommendation(
+        assessment_id=assessment.assessment_id,
+        user_id=assessment.user_id,
+        recommendation_text=text,
+        supporting_metric=metric,
+        correlation_strength=0.0,
+        priority_rank=1,
+        status=status,
+    )
+    db.add(recommendation)
+    db.commit()
+    return recommendation.id
+
+
+def test_refresh_reconciles_latest_recommendations_and_keeps_feedback(db_session: Session) -> None:
+    stressed = _user(db_session, 'stressed@example.com')
+    calm = _user(db_session, 'calm@example.com')
+    older = _assessment(db_session, stressed, 10, stress_level=9)
+    latest = _assessment(db_session, stressed, 1, stress_level=9, attendance_percentage=60)
+    calm_latest = _assessment(db_session, calm, 2)
+    stress_text = 'Your stress level is 9/10 - follow a stress management plan and a structured revision schedule'
+    kept_id = _recommendation(db_session, latest, stress_text, 'stress_level', 'completed')
+    obsolete_id = _recommendation(db_session, latest, 'Old advice', 'sleep_hours', 'attempted')
+    untouched_id = _recommendation(db_session, older, 'Old advice', 'sleep_hours', 'attempted')
+    calm_obsolete_id = _recommendation(db_session, calm_latest, 'Old advice', 'sleep_hours', 'pending')
+
+    assert latest_assessment_ids(db_session) == [
+        (latest.assessment_id, stressed.id),
+        (calm_latest.assessment_id, calm.id),
+    ]
+    progress: list[tuple[int, int]] = []
+    report = refresh_recommendations(db_session, chunk_size=1, progress=lambda *step: progress.append(step))
+
+    assert progress == [(1, 2), (2, 2)]
+    assert (report.assessments, report.inserted, report.updated, report.deleted) == (2, 1, 1, 2)
+    rows = db_session.scalars(
+        select(HabitsRecommendation)
+        .where(HabitsRecommendation.assessment_id == latest.assessment_id)
+        .order_by(HabitsRecommendation.priority_rank)
+    ).all()
+    assert [(row.supporting_metric, row.priority_rank) for row in rows] == [
+        ('attendance_percentage', 1),
+        ('stress_level', 2),
+    ]
+    assert (rows[1].id, rows[1].status) == (kept_id, 'completed')
+    assert rows[0].status == 'pending'
+    assert db_session.get(HabitsRecommendation, obsolete_id) is None
+    assert db_session.get(HabitsRecommendation, calm_obsolete_id) is None
+    assert db_session.get(HabitsRecommendation, untouched_id) is not None
+
+    # A second run with the same correlations changes nothing.
+    again = refresh_recommendations(db_session)
+    assert (again.inserted, again.updated, again.deleted, again.unchanged) == (0, 0, 0, 2)
+
+
+def test_new_correlation_snapshot_queues_a_refresh(db_session: Session) -> None:
+    rng = random.Random(3)
+    user = _user(db_session, 'snapshot@example.com')
+    for age_days in range(5):
+        assessment = _assessment(db_session, user, age_days, **{name: rng.uniform(1, 10) for name in METRIC_NAMES})
+        record_assessment_statistics(db_session, assessment)
+
+    recompute_correlations(db_session, force=True)
+    recompute_correlations(db_session, force=True)
+
+    # Both snapshots coalesce into one pending refresh.
+    queued = select(BackgroundJob.status).where(BackgroundJob.job_type == RECOMMENDATION_REFRESH_JOB)
+    assert db_session.scalars(queued).all() == ['pending']
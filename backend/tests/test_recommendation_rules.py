@@ -0,0 +1,107 @@
+import json
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.habits_engine import METRIC_NAMES, RecommendationGenerator
+from app.models import HabitsAssessment, HabitsCorrelation
+from app.recommendation_rules import RuleSet, load_recommendation_rules
+
+BASELINE = {
+    'study_hours': 3.0,
+    'sleep_hours': 8.0,
+    'phone_usage_hours': 1.0,
+    'social_media_hours': 1.0,
+    'gaming_hours': 0.0,
+    'breaks_per_day': 3.0,
+    'coffee_intake': 1.0,
+    'exercise_minutes': 45.0,
+    'stress_level': 4.0,
+    'focus_score': 7.0,
+    'attendance_percentage': 95.0,
+    'assignments_completed_per_week': 6.0,
+}
+
+
+def _correlations(**coefficients: float) -> list[HabitsCorrelation]:
+    return [
+        HabitsCorrelation(
+            metric_name=metric_name,
+            performance_metric='predicted_productivity_score',
+            correlation_coefficient=coefficient,
+        )
+        for metric_name, coefficient in coefficients.items()
+    ]
+
+
+def test_batch_ranking_matches_single_assessment_generation() -> None:
+    rng = np.random.default_rng(4)
+    rows = [
+        {
+            **BASELINE,
+            'sleep_hours': rng.uniform(4, 9),
+            'stress_level': rng.uniform(1, 10),
+            'phone_usage_hours': rng.uniform(0, 9),
+            'attendance_percentage': rng.uniform(50, 100),
+            'assignments_completed_per_week': rng.uniform(0, 8),
+        }
+        for _ in range(40)
+    ]
+    correlations = _correlations(sleep_hours=0.5, phone_usage_hours=-0.45, stress_level=-0.35, focus_score=0.2)
+    generator = RecommendationGenerator()
+
+    batch = generator.rank({name: np.array([row[name] for row in rows]) for name in METRIC_NAMES}, correlations)
+
+    for row, ranked in zip(rows, batch, strict=True):
+        single = generator.generate(HabitsAssessment(assessment_id=1, user_id=1, **row), correlations)
+        assert [(item.recommendation_text, item.supporting_metric) for item in single] == [
+            (text, metric) for text, metric, _ in ranked
+        ]
+        assert [item.priority_rank for item in single] == list(range(1, len(single) + 1))
+        if row['attendance_percentage'] < 75:
+            assert ranked[0][1] == 'attendance_percentage'
+            assert f'{row["attendance_percentage"]:g}%' in ranked[0][0]
+        if row['stress_level'] > 7 and len(ranked) < 5:
+            assert 'stress_level' in {metric for _, metric, _ in ranked}
+
+
+def test_correlation_gate_and_fallback() -> None:
+    generator = RecommendationGenerator()
+    values = {name: np.array([value]) for name, value in {**BASELINE, 'sleep_hours': 6.5}.items()}
+
+    # The low-sleep rule only fires when sleep is positively correlated with performance.
+    assert generator.rank(values, _correlations(sleep_hours=0.2))[0] == []
+    gated = generator.rank(values, _correlations(sleep_hours=0.6, exercise_minutes=0.35))[0]
+    # Fewer than three rule hits: the strongest correlations fill in generic advice.
+    assert [metric for _, metric, _ in gated] == ['sleep_hours', 'sleep_hours', 'exercise_minutes']
+    assert gated[2][0].startswith('Consider adjusting exercise minutes')
+
+
+def test_rules_file_replaces_the_built_in_table(tmp_path: Path, settings_env: Callable[..., None]) -> None:
+    rules_file = tmp_path / 'rules.json'
+    rules_file.write_text(
+        json.dumps(
+            [
+                {
+                    'name': 'gaming',
+                    'metric': 'gaming_hours',
+                    'comparator': '>=',
+                    'threshold': 3,
+                    'text': 'Cap gaming at {threshold:g} hours (you logged {value:g})',
+                }
+            ]
+        )
+    )
+    settings_env(habits_recommendation_rules_path=str(rules_file))
+
+    rules = load_recommendation_rules()
+    assert [rule.name for rule in rules.rules] == ['gaming']
+    ranked = RecommendationGenerator().rank({'gaming_hours': np.array([2.0, 3.0, np.nan])}, [])
+    assert ranked == [[], [('Cap gaming at 3 hours (you logged 3)', 'gaming_hours', 0.0)], []]
+
+    with pytest.raises(ValueError, match='comparator'):
+        RuleSet.from_definitions(
+            [{'name': 'bad', 'metric': 'gaming_hours', 'comparator': '!=', 'threshold': 1, 'text': ''}]
+        )
@@ -16,7 +16,6 @@ from sklearn.preprocessing import OneHotEncoder, StandardScaler
 DATASET_PATH = Path('dataset/productivity_dataset.csv')
 ARTIFACTS_DIR = Path('artifacts')
 LINEAR_MODEL_PATH = ARTIFACTS_DIR / 'linear_regression_best_model.pkl'
-DETECTION_MODEL_PATH = ARTIFACTS_DIR / 'productivity_detection_model.pkl'
 
 
 def create_preprocessor(x: pd.DataFrame) -> ColumnTransformer:
@@ -44,40 +43,43 @@ def create_preprocessor(x: pd.DataFrame) -> ColumnTransformer:
     )
 
 
-def main() -> None:
-    ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
-
-    df = pd.read_csv(DATASET_PATH)
+def load_dataset(path: Path = DATASET_PATH) -> tuple[pd.DataFrame, pd.Series]:
+    df = pd.read_csv(path)
     df = df.drop(columns=['student_id'])
 
     target_col = 'productivity_score'
-    x = df.drop(columns=[target_col])
-    y = df[target_col]
+    return df.drop(columns=[target_col]), df[target_col]
 
-    x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=0.2, random_state=42)
 
+def fit_pipeline(x: pd.DataFrame, y: pd.Series) -> Pipeline:
     pipeline = Pipeline(
         steps=[
-            ('preprocessor', create_preprocessor(x_train)),
+            ('preprocessor', create_preprocessor(x)),
             ('model', LinearRegression()),
         ]
     )
+    return pipeline.fit(x, y)
+
+
+def main() -> None:
+    ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
+
+    x, y = load_dataset()
+    x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=0.2, random_state=42)
 
     print('Training linear regression model for productivity detection...')
-    pipeline.fit(x_train, y_train)
+    pipeline = fit_pipeline(x_train, y_train)
 
     predictions = pipeline.predict(x_test)
     mae = mean_absolute_error(y_test, predictions)
     r2 = r2_score(y_test, predictions)
 
     joblib.dump(pipeline, LINEAR_MODEL_PATH)
-    joblib.dump(pipeline, DETECTION_MODEL_PATH)
 
     print('Training complete.')
     print(f'MAE: {mae:.4f}')
     print(f'R2:  {r2:.4f}')
     print(f'Saved model to: {LINEAR_MODEL_PATH}')
-    print(f'Saved detection model to: {DETECTION_MODEL_PATH}')
 
 
 if __name__ == '__main__':